@@ -5,6 +5,7 @@ import logging
 from chrome_connector import ChromeConnector
 from data_extractor import DataExtractor
 from csv_exporter import CSVExporter
+from process_pool import without_parallel_keys
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -89,7 +90,7 @@ def extract_data():
     try:
         data = request.json
         field_mappings = data.get('field_mappings', {})
-        extraction_config = data.get('extraction_config', {})
+        extraction_config = without_parallel_keys(data.get('extraction_config', {}))
         
         if not chrome_connector.is_connected():
             return jsonify({
@@ -132,7 +133,7 @@ def export_csv():
     try:
         data = request.json
         field_mappings = data.get('field_mappings', {})
-        extraction_config = data.get('extraction_config', {})
+        extraction_config = without_parallel_keys(data.get('extraction_config', {}))
         export_config = data.get('export_config', {})
         
         if not chrome_connector.is_connected():
@@ -1,111 +1,252 @@
-import pandas as pd
+import io
+import os
+import csv
+import json
+import hashlib
 import logging
-from typing import Dict, List, Generator
-from bs4 import BeautifulSoup
-import gc
+from typing import Any, Callable, Dict, Iterator, List, Generator, Optional, Tuple
+from contextlib import ExitStack
+from parser_engine import get_parser_engine
+from extraction_plan import ExtractionPlan, plan_cache
+from process_pool import PoolUnavailable, SharedStatePool, fork_safe, parallel_workers, shard_ranges
+from html_reducer import reduce_for_extraction
+from batch_sizing import BatchSizer
+from lead_scrubber import LeadScrubber
+from lead_dedup import LeadDeduplicator
 
 logger = logging.getLogger(__name__)
 
+# Below this many containers, forking workers costs more than it saves
+PARALLEL_THRESHOLD = 20000
+
+# Write buffer of the export file; rows reach the disk in large blocks
+CSV_BUFFER_SIZE = 1024 * 1024
+
+# Export column order and display names
+PREFERRED_ORDER = ['first_name', 'last_name', 'number', 'city', 'state', 'zip_code']
+DISPLAY_NAMES = {
+    'first_name': 'First Name',
+    'last_name': 'Last Name',
+    'number': 'Number',
+    'city': 'City',
+    'state': 'State',
+    'zip_code': 'Zip Code'
+}
+
+
+def _extract_shard(shared, bounds):
+    """Worker entry point: extract one index range of the containers inherited from the parent"""
+    processor, plan, containers = shared
+    return processor._extract_containers(plan, containers, *bounds)
+
+
 class BatchProcessor:
     """Handles large-scale data extraction with memory optimization"""
     
     def __init__(self, batch_size: int = 5000):
         self.batch_size = batch_size
+        self.lead_scrubber = LeadScrubber()
     
     def process_large_dataset(self, html_content: str, field_mappings: Dict, 
-                            extraction_config: Dict = None) -> Generator[List[Dict], None, None]:
+                            extraction_config: Dict = None, start_index: int = 0,
+                            metrics: Optional[Dict] = None) -> Generator[List[Dict], None, None]:
         """
         Process large datasets in batches to manage memory efficiently
         
         Args:
             html_content: HTML content of the CRM page
             field_mappings: Dictionary mapping field names to CSS selectors
-            extraction_config: Additional configuration for extraction
+            extraction_config: Additional configuration for extraction; ``memory_target_mb``
+                turns on adaptive batch sizing (bounded by ``min_batch_size``/``max_batch_size``)
+            start_index: Number of leading containers to skip, to resume after the lead
+                whose ``_extraction_index`` it is; skipped containers are parsed but not extracted
+            metrics: If given, filled with the batch sizes, timings and memory of the run
+                (see ``BatchSizer.summary``) once the last batch has been yielded. One
+                processor serves concurrent exports, so results are handed back per call
             
         Yields:
             Batches of extracted lead data
+        
+        Raises:
+            Any error raised while parsing or extracting, after the batches before it were
+            yielded, so a failed export is never mistaken for a shorter complete one
         """
         try:
             if not html_content or not field_mappings:
                 logger.warning("Missing HTML content or field mappings")
                 return
             
-            soup = BeautifulSoup(html_content, 'html.parser')
             extraction_config = extraction_config or {}
             container_selector = extraction_config.get('container_selector')
-            max_leads = extraction_config.get('max_leads', 500000)
             
             if not container_selector:
                 logger.warning("Container selector required for large dataset processing")
                 return
             
-            # Find all lead containers
-            lead_containers = soup.select(container_selector)
-            total_containers = min(len(lead_containers), max_leads)
+            # Sizes batches and collects garbage from measured memory growth
+            memory_target_mb = extraction_config.get('memory_target_mb')
+            sizer = BatchSizer(
+                self.batch_size,
+                memory_target_bytes=int(memory_target_mb * 1024 * 1024) if memory_target_mb else None,
+                min_size=extraction_config.get('min_batch_size', 500),
+                max_size=extraction_config.get('max_batch_size', 100000)
+            )
             
-            logger.info(f"Processing {total_containers} lead containers in batches of {self.batch_size}")
+            engine = get_parser_engine(extraction_config.get('parser'))
+            try:
+                batches = self._open_batches(engine, html_content, field_mappings, extraction_config, sizer,
+                                             start_index)
+            except ValueError as e:
+                if engine.name == 'bs4':
+                    raise
+                logger.info(f"Falling back to BeautifulSoup parser: {str(e)}")
+                engine = get_parser_engine('bs4')
+                batches = self._open_batches(engine, html_content, field_mappings, extraction_config, sizer,
+                                             start_index)
             
-            # Process in batches
-            for batch_start in range(0, total_containers, self.batch_size):
-                batch_end = min(batch_start + self.batch_size, total_containers)
-                batch_containers = lead_containers[batch_start:batch_end]
-                
-                batch_leads = []
-                for i, container in enumerate(batch_containers):
-                    lead_data = self._extract_single_lead(container, field_mappings)
-                    if lead_data and self._is_valid_lead(lead_data):
-                        lead_data['_extraction_index'] = batch_start + i + 1
-                        batch_leads.append(lead_data)
-                
-                logger.info(f"Processed batch {batch_start//self.batch_size + 1}: {len(batch_leads)} valid leads")
+            for batch_number, batch_leads in enumerate(batches, 1):
+                logger.info(f"Processed batch {batch_number}: {len(batch_leads)} valid leads")
                 
-                # Yield the batch and clean up memory
+                # Yield the batch; memory is measured once the consumer is done with it
                 yield batch_leads
-                
-                # Force garbage collection for large datasets
-                if batch_start > 0 and batch_start % (self.batch_size * 10) == 0:
-                    gc.collect()
+            
+            summary = sizer.summary()
+            if metrics is not None:
+                metrics.update(summary)
+            if sizer.adaptive:
+                logger.info(
+                    f"Adaptive batching: {summary['batches']} batches of "
+                    f"{summary['min_size']}-{summary['max_size']} containers, "
+                    f"peak RSS {summary['peak_rss_mb']} MB, {summary['gc_runs']} collections"
+                )
                     
         except Exception as e:
             logger.error(f"Error in batch processing: {str(e)}")
-            return
+            raise
+    
+    def _open_batches(self, engine, html_content: str, field_mappings: Dict, extraction_config: Dict,
+                      sizer: BatchSizer, start_index: int = 0):
+        """
+        Compile the extraction plan and start reading containers from the reduced document
+        
+        Parse errors surface here, before the first batch is yielded, so the caller can
+        still switch engines. Serial runs stream containers and release each batch once
+        it is extracted; parallel runs need every container up front for the workers.
+        
+        Returns:
+            Iterator over batches of extracted lead data
+        """
+        container_selector = extraction_config.get('container_selector')
+        max_leads = extraction_config.get('max_leads', 500000)
+        plan = plan_cache.get_plan(field_mappings, engine, self._clean_field_value, 'BatchProcessor', container_selector)
+        html_content = reduce_for_extraction(html_content, extraction_config, plan)
+        
+        if extraction_config.get('parallel') and fork_safe():
+            lead_containers = engine.select_from_html(html_content, plan.container, max_leads)
+            # The full tree is a fixed cost here, not something batch sizes can change
+            sizer.rebase()
+            return self._pooled_batches(plan, lead_containers, extraction_config, sizer, start_index)
+        
+        sizer.rebase()
+        container_batches = engine.iter_select_batches(
+            html_content, plan.container, sizer.size, max_leads, related=plan.selectors
+        )
+        first_batch = next(container_batches, None)
+        return self._streamed_batches(plan, first_batch, container_batches, sizer, start_index)
+    
+    def _streamed_batches(self, plan: ExtractionPlan, first_batch: Optional[List[Any]],
+                          container_batches: Generator[List[Any], int, None],
+                          sizer: BatchSizer, start_index: int = 0) -> Generator[List[Dict], None, None]:
+        """Extract each container batch while it is still attached to the partial tree"""
+        logger.info(f"Streaming lead containers in batches of {sizer.size}")
+        extracted = 0
+        containers = first_batch
+        while containers is not None:
+            if extracted + len(containers) > start_index:
+                batch_leads = self._extract_containers(plan, containers, max(start_index - extracted, 0),
+                                                       len(containers), offset=extracted)
+                extracted += len(containers)
+                yield batch_leads
+                sizer.record(len(containers))
+                sizer.start()
+            else:
+                # Already exported by an earlier run
+                extracted += len(containers)
+            # Asking for the next batch releases this one from the tree
+            try:
+                containers = container_batches.send(sizer.size)
+            except StopIteration:
+                containers = None
     
-    def _extract_single_lead(self, container: BeautifulSoup, field_mappings: Dict) -> Dict:
+    def _pooled_batches(self, plan: ExtractionPlan, lead_containers: List[Any], extraction_config: Dict,
+                        sizer: BatchSizer, start_index: int = 0) -> Generator[List[Dict], None, None]:
+        """Extract batches from the full container list, sharded across workers when worthwhile"""
+        total_containers = len(lead_containers)
+        workers = parallel_workers(extraction_config, total_containers, PARALLEL_THRESHOLD)
+        
+        logger.info(f"Processing {total_containers} lead containers in batches of {sizer.size}")
+        
+        with ExitStack() as stack:
+            pool = None
+            if workers:
+                # Workers fork once and inherit the parsed document for every batch
+                try:
+                    pool = stack.enter_context(SharedStatePool((self, plan, lead_containers), workers))
+                    logger.info(f"Extracting batches with {workers} workers")
+                except PoolUnavailable as e:
+                    logger.warning(f"Parallel processing unavailable, running serially: {str(e)}")
+            
+            batch_start = min(start_index, total_containers)
+            while batch_start < total_containers:
+                batch_end = min(batch_start + sizer.size, total_containers)
+                
+                batch_leads = None
+                if pool is not None:
+                    try:
+                        shards = pool.map(_extract_shard, shard_ranges(batch_start, batch_end, workers))
+                        batch_leads = [lead for shard in shards for lead in shard]
+                    except PoolUnavailable as e:
+                        # Stop the workers and extract this batch and the rest in this process
+                        logger.warning(f"Parallel processing unavailable from container {batch_start}, "
+                                       f"running serially: {str(e)}")
+                        stack.close()
+                        pool = None
+                if batch_leads is None:
+                    batch_leads = self._extract_containers(plan, lead_containers, batch_start, batch_end)
+                yield batch_leads
+                
+                sizer.record(batch_end - batch_start)
+                sizer.start()
+                batch_start = batch_end
+    
+    def _extract_containers(self, plan: ExtractionPlan, containers: List[Any], start: int, end: int,
+                            offset: int = 0) -> List[Dict]:
+        """Extract valid leads from ``containers[start:end]``, numbered by container position plus ``offset``"""
+        leads = []
+        for i in range(start, end):
+            lead_data = self._extract_single_lead(containers[i], plan)
+            if lead_data and self._is_valid_lead(lead_data):
+                lead_data['_extraction_index'] = offset + i + 1
+                leads.append(lead_data)
+        return leads
+    
+    def _extract_single_lead(self, container: Any, plan: ExtractionPlan) -> Dict:
         """Extract data for a single lead from a container element"""
         lead_data = {}
         
         try:
-            for field_name, selector_config in field_mappings.items():
-                if isinstance(selector_config, str):
-                    selector = selector_config
-                    attribute = 'text'
-                elif isinstance(selector_config, dict):
-                    selector = selector_config.get('selector', '')
-                    attribute = selector_config.get('attribute', 'text')
-                else:
-                    continue
-                
-                if not selector:
+            # One walk of the container finds the first match of every field
+            elements = plan.engine.first_matches(container, plan.selectors, plan.matcher)
+            for field, element in zip(plan.fields, elements):
+                if element is None:
                     continue
-                
                 try:
-                    elements = container.select(selector)
-                    if elements:
-                        element = elements[0]
-                        
-                        if attribute == 'text':
-                            value = element.get_text(strip=True)
-                        elif attribute == 'html':
-                            value = str(element)
-                        else:
-                            value = element.get(attribute, '')
+                    cleaned_value = field.clean(field.read(element))
+                    if cleaned_value:
+                        lead_data[field.name] = cleaned_value
                         
-                        cleaned_value = self._clean_field_value(value, field_name)
-                        if cleaned_value:
-                            lead_data[field_name] = cleaned_value
-                            
                 except Exception as e:
-                    logger.debug(f"Error extracting field {field_name}: {str(e)}")
+                    logger.debug(f"Error extracting field {field.name}: {str(e)}")
                     continue
             
             return lead_data
@@ -146,44 +287,85 @@ class BatchProcessor:
     
     def export_large_csv(self, html_content: str, field_mappings: Dict, 
                         extraction_config: Dict, export_config: Dict, 
-                        output_path: str) -> int:
+                        output_path: str, progress_callback: Optional[Callable[[int], None]] = None,
+                        checkpoint_path: Optional[str] = None) -> int:
         """
         Export large datasets directly to CSV without loading everything into memory
         
+        Args:
+            progress_callback: Called with the running count of extracted records after
+                each batch is written (before scrubbing, so it tracks the expected total)
+            checkpoint_path: Where to record progress after each written batch. When it
+                holds a checkpoint of this same export, the partial file at ``output_path``
+                is cut back to the last completed batch and extended from there
+        
         Returns:
             Number of records exported
         """
         try:
-            total_records = 0
-            first_batch = True
+            columns, header = self._export_columns(field_mappings, export_config)
+            fingerprint = self._checkpoint_fingerprint(html_content, field_mappings, extraction_config, export_config)
+            checkpoint = self._load_checkpoint(checkpoint_path, output_path, fingerprint)
+            total_records = checkpoint['records']
+            scrub_stats = checkpoint['scrub_stats'] or self.lead_scrubber.new_stats()
+            output = None
             
-            for batch_data in self.process_large_dataset(html_content, field_mappings, extraction_config):
-                if not batch_data:
-                    continue
-                
-                # Convert batch to DataFrame
-                df = pd.DataFrame(batch_data)
-                
-                # Apply column ordering and display names
-                df = self._format_dataframe(df, export_config)
-                
-                # Write to CSV (header only on first batch)
-                mode = 'w' if first_batch else 'a'
-                header = first_batch
-                
-                df.to_csv(
-                    output_path,
-                    mode=mode,
-                    header=header,
-                    index=False,
-                    encoding='utf-8-sig'
-                )
-                
-                total_records += len(batch_data)
-                first_batch = False
-                
-                logger.info(f"Exported batch: {len(batch_data)} records (Total: {total_records})")
+            # Leads kept so far are checkpointed alongside, so a resumed export still drops repeats of them
+            scrub_config = export_config.get('scrub_config', {})
+            deduplicator = None
+            if scrub_config.get('enable_scrubbing', False):
+                deduplicator = self.lead_scrubber.deduplicator(scrub_config)
+            keys_path = f"{checkpoint_path}.keys" if checkpoint_path and deduplicator else None
+            if keys_path and not checkpoint['position'] and os.path.exists(keys_path):
+                os.unlink(keys_path)
+            
+            if checkpoint['position']:
+                # Drop whatever was written after the checkpoint, then append
+                with open(output_path, 'r+b') as partial:
+                    partial.truncate(checkpoint['bytes'])
+                output = open(output_path, 'a', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE)
+                writer = csv.writer(output, lineterminator='\n')
+                logger.info(f"Resuming export after lead {checkpoint['position']} ({total_records} records written)")
+                if keys_path:
+                    deduplicator.restore(keys_path, checkpoint.get('keys_bytes', 0))
+                if progress_callback:
+                    progress_callback(checkpoint['extracted'])
             
+            try:
+                for batch_data, extracted_count, position in self.export_batches(
+                    html_content, field_mappings, extraction_config, export_config,
+                    start_index=checkpoint['position'], extracted_count=checkpoint['extracted'],
+                    scrub_stats=scrub_stats, deduplicator=deduplicator
+                ):
+                    if batch_data:
+                        # Opened on the first batch so an empty export leaves no file behind
+                        if output is None:
+                            output = open(output_path, 'w', encoding='utf-8-sig', newline='', buffering=CSV_BUFFER_SIZE)
+                            writer = csv.writer(output, lineterminator='\n')
+                            writer.writerow(header)
+                        writer.writerows(self._csv_rows(batch_data, columns))
+                        
+                        total_records += len(batch_data)
+                        logger.info(f"Exported batch: {len(batch_data)} records (Total: {total_records})")
+                    if checkpoint_path and output is not None:
+                        self._save_checkpoint(checkpoint_path, output, {
+                            'fingerprint': fingerprint,
+                            'position': position,
+                            'records': total_records,
+                            'extracted': extracted_count,
+                            'scrub_stats': scrub_stats,
+                            'keys_bytes': deduplicator.persist(keys_path) if keys_path else 0
+                        })
+                    if progress_callback:
+                        progress_callback(extracted_count)
+            finally:
+                if output is not None:
+                    output.close()
+            
+            if checkpoint_path and os.path.exists(checkpoint_path):
+                os.unlink(checkpoint_path)
+            if keys_path and os.path.exists(keys_path):
+                os.unlink(keys_path)
             logger.info(f"Successfully exported {total_records} records to {output_path}")
             return total_records
             
@@ -191,50 +373,158 @@ class BatchProcessor:
             logger.error(f"Error exporting large CSV: {str(e)}")
             raise
     
-    def _format_dataframe(self, df: pd.DataFrame, export_config: Dict) -> pd.DataFrame:
-        """Format DataFrame with proper column order and names"""
+    @staticmethod
+    def _checkpoint_fingerprint(html_content: str, field_mappings: Dict, extraction_config: Dict,
+                                export_config: Dict) -> str:
+        """Hash of the export inputs, so a checkpoint is only resumed by the export that wrote it"""
+        # Mapping order sets the CSV column order, so it is part of the fingerprint
+        payload = json.dumps(
+            {'document': hashlib.sha256(html_content.encode('utf-8')).hexdigest(),
+             'mappings': list(field_mappings.items()), 'extraction': extraction_config, 'export': export_config},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _load_checkpoint(checkpoint_path: Optional[str], output_path: str, fingerprint: str) -> Dict:
+        """Progress recorded by an interrupted run of this export, or a fresh start"""
+        fresh = {'position': 0, 'records': 0, 'extracted': 0, 'bytes': 0, 'scrub_stats': None}
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return fresh
+        
         try:
-            # Define preferred column order
-            preferred_order = ['first_name', 'last_name', 'number', 'city', 'state', 'zip_code']
-            
-            # Reorder columns
-            available_columns = []
-            for col in preferred_order:
-                if col in df.columns:
-                    available_columns.append(col)
-            
-            # Add any remaining columns
-            for col in df.columns:
-                if col not in available_columns and not col.startswith('_'):
-                    available_columns.append(col)
-            
-            df = df[available_columns]
-            
-            # Apply display names
-            if export_config.get('use_display_names', True):
-                display_names = {
-                    'first_name': 'First Name',
-                    'last_name': 'Last Name',
-                    'number': 'Number',
-                    'city': 'City',
-                    'state': 'State',
-                    'zip_code': 'Zip Code'
-                }
-                
-                rename_map = {}
-                for col in df.columns:
-                    if col in display_names:
-                        rename_map[col] = display_names[col]
-                    else:
-                        rename_map[col] = col.replace('_', ' ').title()
-                
-                df = df.rename(columns=rename_map)
-            
-            # Clean data
-            df = df.fillna('')
-            
-            return df
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('fingerprint') != fingerprint:
+                logger.warning(f"Checkpoint {checkpoint_path} belongs to a different export, starting over")
+                return fresh
+            if os.path.getsize(output_path) < checkpoint['bytes']:
+                logger.warning(f"Partial export {output_path} is shorter than its checkpoint, starting over")
+                return fresh
+            return checkpoint
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not resume from checkpoint {checkpoint_path}: {str(e)}")
+            return fresh
+    
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: str, output, checkpoint: Dict):
+        """Make the written rows durable, then atomically record how far they go"""
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint['bytes'] = output.tell()
+        temp_path = f"{checkpoint_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, checkpoint_path)
+    
+    def stream_csv(self, html_content: str, field_mappings: Dict, 
+                   extraction_config: Dict, export_config: Dict) -> Generator[bytes, None, None]:
+        """
+        Yield the export CSV as UTF-8 bytes, one piece per extracted batch
+        
+        Suitable as a chunked HTTP response body: nothing is buffered beyond the
+        current batch and no file is written.
+        """
+        total_records = 0
+        for csv_text, record_count in self.iter_csv_batches(html_content, field_mappings,
+                                                            extraction_config, export_config):
+            total_records += record_count
+            yield csv_text.encode('utf-8')
+        logger.info(f"Streamed {total_records} records")
+    
+    def iter_csv_batches(self, html_content: str, field_mappings: Dict, 
+                         extraction_config: Dict, export_config: Dict) -> Generator[Tuple[str, int], None, None]:
+        """
+        Render the export CSV batch by batch
+        
+        The first piece starts with a UTF-8 byte order mark (so Excel detects the
+        encoding) and the header row.
+        
+        Yields:
+            Tuples of (CSV text, number of records in it)
+        """
+        columns, header = self._export_columns(field_mappings, export_config)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        buffer.write('\ufeff')
+        writer.writerow(header)
+        
+        for batch_data, _, _ in self.export_batches(html_content, field_mappings, extraction_config, export_config):
+            if not batch_data:
+                continue
             
-        except Exception as e:
-            logger.error(f"Error formatting DataFrame: {str(e)}")
-            return df
\ No newline at end of file
+            writer.writerows(self._csv_rows(batch_data, columns))
+            yield buffer.getvalue(), len(batch_data)
+            buffer.seek(0)
+            buffer.truncate()
+    
+    def export_batches(self, html_content: str, field_mappings: Dict, extraction_config: Dict,
+                       export_config: Dict, start_index: int = 0, extracted_count: int = 0,
+                       scrub_stats: Optional[Dict] = None, deduplicator: Optional[LeadDeduplicator] = None,
+                       metrics: Optional[Dict] = None) -> Generator[Tuple[List[Dict], int, int], None, None]:
+        """
+        Extracted batches ready for export, scrubbed when ``export_config['scrub_config']`` enables it
+        
+        Scrubbing runs per batch, so it holds no more than extraction does. Its running
+        statistics accumulate into ``scrub_stats``; pass one in to read them.
+        
+        Args:
+            start_index: ``_extraction_index`` of the last lead already exported, to resume after it
+            extracted_count: Records extracted before ``start_index``, to continue the count
+            scrub_stats: Scrubbing statistics to accumulate into (see ``LeadScrubber.new_stats``),
+                possibly continuing those of an interrupted run
+            deduplicator: Deduplication state to continue from; by default a new one when
+                the scrub config enables deduplication. Its keys are recorded as delivered
+                once the last batch has been yielded
+            metrics: Passed on to ``process_large_dataset``
+        
+        Yields:
+            Tuples of (leads to export, records extracted so far, ``_extraction_index`` of the
+            last extracted lead); a batch may be empty when scrubbing removed every lead in it
+        """
+        scrub_config = (export_config or {}).get('scrub_config', {})
+        scrub_enabled = scrub_config.get('enable_scrubbing', False)
+        stats = scrub_stats if scrub_stats is not None else self.lead_scrubber.new_stats()
+        position = start_index
+        if scrub_enabled and deduplicator is None:
+            deduplicator = self.lead_scrubber.deduplicator(scrub_config)
+        
+        for batch_data in self.process_large_dataset(html_content, field_mappings, extraction_config, start_index,
+                                                     metrics=metrics):
+            if batch_data:
+                position = batch_data[-1]['_extraction_index']
+            extracted_count += len(batch_data)
+            if scrub_enabled:
+                batch_data = self.lead_scrubber.scrub_batch(batch_data, scrub_config, stats,
+                                                            deduplicator=deduplicator)
+            yield batch_data, extracted_count, position
+        
+        if scrub_enabled and deduplicator:
+            deduplicator.commit()
+        if scrub_enabled and stats['original_count']:
+            logger.info(f"Lead scrubbing results:\n{self.lead_scrubber.get_scrubbing_summary(stats)}")
+    
+    def _export_columns(self, field_mappings: Dict, export_config: Dict) -> Tuple[List[str], List[str]]:
+        """
+        Fix the CSV schema from the field mappings: preferred fields first, the rest in mapping order
+        
+        Every batch is written against this schema, so a field missing from a row
+        (or from a whole batch) leaves an empty cell instead of shifting columns.
+        
+        Returns:
+            Tuple of (field names, header row)
+        """
+        fields = [field for field in field_mappings if not field.startswith('_')]
+        columns = [field for field in PREFERRED_ORDER if field in fields]
+        columns += [field for field in fields if field not in columns]
+        
+        if export_config.get('use_display_names', True):
+            header = [DISPLAY_NAMES.get(field) or field.replace('_', ' ').title() for field in columns]
+        else:
+            header = list(columns)
+        return columns, header
+    
+    @staticmethod
+    def _csv_rows(batch_data: List[Dict], columns: List[str]) -> Iterator[List]:
+        """Rows of the batch in schema order; csv writes missing (None) values as empty cells"""
+        return ([lead.get(column) for column in columns] for lead in batch_data)
@@ -0,0 +1,148 @@
+import gc
+import os
+import time
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):  # pragma: no cover - non-POSIX
+    PAGE_SIZE = 4096
+
+# Without RSS readings, fall back to collecting every this many batches
+GC_EVERY_BATCHES = 10
+
+
+def current_rss() -> Optional[int]:
+    """
+    Resident set size of this process in bytes, or None where ``/proc`` is unavailable
+
+    RSS is used rather than tracemalloc because most of a batch's memory is the
+    libxml2 tree, which tracemalloc does not see.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class BatchSizer:
+    """
+    Chooses the size of each batch and when to collect garbage, from measured RSS
+
+    With a ``memory_target_bytes``, the size adapts so that memory above the level
+    at the start of the run stays near the target. Freed memory is rarely returned
+    to the OS, so RSS reflects the largest batch seen so far; bytes per container
+    are therefore estimated against that batch, which keeps the estimate stable
+    when batches shrink. Growth is limited to doubling per batch and to what fits
+    in ``max_batch_seconds`` at the measured rate. Garbage is collected when RSS has
+    grown by ``gc_growth_bytes`` since the last collection; when a collection frees
+    little, the growth was not garbage (libxml2 keeps the input it has been fed until
+    the parse ends) and the threshold doubles.
+    """
+
+    def __init__(self, batch_size: int, memory_target_bytes: Optional[int] = None, min_size: int = 500,
+                 max_size: int = 100000, max_batch_seconds: float = 10.0, gc_growth_bytes: Optional[int] = None):
+        self.size = batch_size
+        self.memory_target_bytes = memory_target_bytes
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_batch_seconds = max_batch_seconds
+        self.base_rss = current_rss()
+        self.adaptive = bool(memory_target_bytes) and self.base_rss is not None
+        if memory_target_bytes and self.base_rss is None:
+            logger.warning("Process memory cannot be measured here, using a fixed batch size")
+        self.gc_growth_bytes = gc_growth_bytes or (memory_target_bytes // 4 if self.adaptive else 64 * 1024 * 1024)
+        self._last_gc_rss = self.base_rss
+        self._largest = 0
+        self._started = time.perf_counter()
+        self.batches: List[Dict] = []
+
+    def rebase(self):
+        """Measure the baseline again once fixed costs (such as the reduced page copy) are paid"""
+        rss = current_rss()
+        if rss is not None and self.base_rss is not None:
+            self.base_rss = rss
+            self._last_gc_rss = rss
+
+    def start(self):
+        """Mark the start of the next batch"""
+        self._started = time.perf_counter()
+
+    def record(self, containers: int) -> int:
+        """
+        Observe a finished batch, collect garbage if memory grew, and pick the next size
+
+        Args:
+            containers: Number of containers in the batch
+
+        Returns:
+            Size for the next batch
+        """
+        seconds = time.perf_counter() - self._started
+        rss = current_rss()
+        collected = False
+
+        if rss is None:
+            if len(self.batches) % GC_EVERY_BATCHES == GC_EVERY_BATCHES - 1:
+                gc.collect()
+                collected = True
+        elif rss - self._last_gc_rss > self.gc_growth_bytes:
+            gc.collect()
+            collected = True
+            collected_rss = current_rss()
+            if collected_rss is None:
+                # /proc went away mid-batch; measure growth from the reading before the collection
+                self._last_gc_rss = rss
+            else:
+                if rss - collected_rss < self.gc_growth_bytes // 4:
+                    self.gc_growth_bytes *= 2
+                rss = self._last_gc_rss = collected_rss
+
+        # Without a reading there is nothing to size against; keep the last size
+        if self.adaptive and containers and rss is not None:
+            self.size = self._next_size(containers, rss, seconds)
+
+        self.batches.append({
+            'size': containers,
+            'seconds': round(seconds, 3),
+            'rss_mb': round(rss / 1048576, 1) if rss is not None else None,
+            'gc': collected,
+            'next_size': self.size
+        })
+        logger.info(
+            f"Batch {len(self.batches)}: {containers} containers in {seconds:.2f}s"
+            + (f", RSS {rss / 1048576:.0f} MB" if rss is not None else "")
+            + (", collected garbage" if collected else "")
+            + (f", next batch {self.size}" if self.adaptive else "")
+        )
+        return self.size
+
+    def summary(self) -> Dict:
+        """Batch sizes, timings and memory of the run so far"""
+        sizes = [batch['size'] for batch in self.batches]
+        peaks = [batch['rss_mb'] for batch in self.batches if batch['rss_mb'] is not None]
+        return {
+            'adaptive': self.adaptive,
+            'batches': len(self.batches),
+            'min_size': min(sizes) if sizes else 0,
+            'max_size': max(sizes) if sizes else 0,
+            'gc_runs': sum(1 for batch in self.batches if batch['gc']),
+            'base_rss_mb': round(self.base_rss / 1048576, 1) if self.base_rss is not None else None,
+            'peak_rss_mb': max(peaks) if peaks else None,
+            'sizes': sizes
+        }
+
+    def _next_size(self, containers: int, rss: int, seconds: float) -> int:
+        self._largest = max(self._largest, containers)
+        growth = rss - self.base_rss
+        if growth > 0:
+            by_memory = int(self.memory_target_bytes * self._largest / growth)
+        else:
+            by_memory = self.max_size
+        by_time = int(self.max_batch_seconds * containers / seconds) if seconds > 0 else self.max_size
+        size = min(by_memory, by_time, containers * 2, self.max_size)
+        return max(size, self.min_size)
@@ -0,0 +1,68 @@
+"""
+Write side of export_large_csv: one csv.writer against the per-batch pandas path it replaced
+
+Extraction is left out; both writers get the same pre-extracted batches.
+
+    python benchmarks/bench_csv_writer.py --rows 500000 --batch-size 5000
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+
+from bench_utils import best_of  # first: puts the repository on sys.path
+from batch_processor import DISPLAY_NAMES, PREFERRED_ORDER, BatchProcessor
+
+FIELDS = ['first_name', 'last_name', 'number', 'city', 'state', 'zip_code']
+
+
+def pandas_export(batches, output_path: str) -> int:
+    """The previous writer: a DataFrame per batch, reordered and renamed, appended with to_csv"""
+    total_records = 0
+    with open(output_path, 'w', encoding='utf-8', newline='') as output:
+        for index, batch_data in enumerate(batches):
+            df = pd.DataFrame(batch_data)
+            columns = [column for column in PREFERRED_ORDER if column in df.columns]
+            columns += [column for column in df.columns if column not in columns and not column.startswith('_')]
+            df = df[columns].rename(columns=lambda column: DISPLAY_NAMES.get(column) or column.replace('_', ' ').title())
+            csv_text = df.fillna('').to_csv(header=index == 0, index=False)
+            output.write('\ufeff' + csv_text if index == 0 else csv_text)
+            total_records += len(batch_data)
+    return total_records
+
+
+def writer_export(batches, output_path: str) -> int:
+    """The current writer, fed the batches in place of extraction"""
+    processor = BatchProcessor()
+    processor.process_large_dataset = lambda *args, **kwargs: iter(batches)
+    return processor.export_large_csv('', {field: '' for field in FIELDS}, {}, {}, output_path)
+
+
+def _md5(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    leads = [{'first_name': f'Name{i}', 'last_name': 'Smith, Jr.' if i % 7 == 0 else f'Last{i}',
+              'number': f'(555) 555-{i % 10000:04d}', 'city': 'Springfield', 'state': 'IL',
+              'zip_code': f'{60000 + i % 999}', '_extraction_index': i + 1} for i in range(args.rows)]
+    batches = [leads[start:start + args.batch_size] for start in range(0, args.rows, args.batch_size)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, export in (('pandas', pandas_export), ('csv.writer', writer_export)):
+            path = os.path.join(directory, f'{name}.csv')
+            seconds, records = best_of(lambda: export(batches, path), args.repeat)
+            print(f"{name:10s} {records} rows: {seconds:.2f}s ({records / seconds / 1000:.0f}k rows/s), md5 {_md5(path)}")
+
+
+if __name__ == '__main__':
+    main()
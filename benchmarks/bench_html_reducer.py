@@ -0,0 +1,58 @@
+"""
+Parse time with and without HTML pre-reduction
+
+Two synthetic pages: one carrying a large inline JSON state blob and a comment,
+as single-page CRM views do, and a Salesforce list with a comment, inline script
+and svg icon in every row.
+
+    python benchmarks/bench_html_reducer.py --rows 10000 --blob-mb 25
+"""
+import argparse
+import json
+
+from bench_utils import best_of
+from conftest import _profile_page
+from html_reducer import HTMLReducer
+from parser_engine import get_parser_engine
+
+
+def blob_page(rows: int, blob_mb: int) -> str:
+    """Lead list preceded by an inline JSON state blob and a commented-out copy of it"""
+    state = json.dumps([{'id': i, 'name': f'record {i}', 'tags': ['a', 'b']} for i in range(blob_mb * 20000)])
+    page = _profile_page('salesforce', rows)
+    return page.replace('<body>', f'<body><script>window.__STATE__ = {state};</script><!-- {state[:len(state) // 10]} -->', 1)
+
+
+def noisy_page(rows: int) -> str:
+    """Salesforce list whose every row carries a comment, an inline script and an svg icon"""
+    return _profile_page('salesforce', rows).replace('</tr>', '<!-- row --></tr>')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--blob-mb', type=int, default=25)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = {'blob': blob_page(1000, args.blob_mb), 'noisy rows': noisy_page(args.rows)}
+    reducers = {'default': HTMLReducer(), 'strip_svg': HTMLReducer(strip_svg=True)}
+    engines = [get_parser_engine(name) for name in ('lxml', 'bs4')]
+
+    for page_name, html in pages.items():
+        print(f"{page_name}: {len(html):,} chars")
+        documents = {'unreduced': html}
+        for reducer_name, reducer in reducers.items():
+            seconds, (reduced, stats) = best_of(lambda: reducer.reduce(html), args.repeat)
+            documents[reducer_name] = reduced
+            print(f"  {reducer_name:9s} reduced to {len(reduced):,} chars in {seconds:.3f}s")
+        for engine in engines:
+            timings = []
+            for document_name, document in documents.items():
+                seconds, _ = best_of(lambda: engine.parse(document), args.repeat)
+                timings.append(f"{document_name} {seconds:.3f}s")
+            print(f"  parse {engine.name:4s}: " + ', '.join(timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Litigation keyword check: the compiled trie matcher against the previous per-keyword regex loop
+
+    python benchmarks/bench_litigation.py --leads 1000000 --large-list-leads 2000
+"""
+import argparse
+import random
+import re
+import string
+
+from bench_utils import best_of  # first: puts the repository on sys.path
+from lead_scrubber import LeadScrubber
+
+FILLER = ['acme', 'sales', 'springfield', 'manager', 'north', 'open', 'new', 'lead', 'warm', 'call back']
+
+
+def regex_loop_check(lead_data, patterns):
+    """The previous check: all fields joined into one string, then one re.search per keyword"""
+    text_content = ""
+    for value in lead_data.values():
+        if value and isinstance(value, str):
+            text_content += f" {value.lower()}"
+    for pattern in patterns:
+        if re.search(pattern, text_content, re.IGNORECASE):
+            return True, f"Contains litigation keyword: {pattern}"
+    return False, "No litigation risk detected"
+
+
+def make_leads(count: int, keywords, risky_share: float = 0.25, seed: int = 3):
+    """Seven-field leads; ``risky_share`` of them mention one keyword in their notes"""
+    rng = random.Random(seed)
+    leads = []
+    for i in range(count):
+        notes = ' '.join(rng.choice(FILLER) for _ in range(6))
+        if rng.random() < risky_share:
+            notes += f" {rng.choice(keywords).upper() if i % 2 else rng.choice(keywords)} pending"
+        leads.append({'first_name': f'Name{i}', 'last_name': f'Last{i}', 'number': f'(212) 555-{i % 10000:04d}',
+                      'company': f'{rng.choice(FILLER).title()} Co', 'city': 'Springfield', 'state': 'IL',
+                      'notes': notes})
+    return leads
+
+
+def keyword_list(count: int, seed: int = 5):
+    """``count`` lowercase terms, many of them prefixes of others as real lists have"""
+    rng = random.Random(seed)
+    terms = set()
+    while len(terms) < count:
+        term = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        terms.add(term)
+        if len(terms) < count:
+            terms.add(term + 's')
+    return sorted(terms)
+
+
+def compare(scrubber: LeadScrubber, leads, keywords, repeat: int, label: str):
+    matcher = scrubber.litigation_matcher(keywords)
+    old_seconds, expected = best_of(lambda: [regex_loop_check(lead, keywords) for lead in leads], repeat)
+    new_seconds, results = best_of(lambda: [scrubber.check_litigation_risk(lead, matcher) for lead in leads], repeat)
+    print(f"{label}: regex loop {old_seconds:.2f}s, matcher {new_seconds:.2f}s, identical: {results == expected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--leads', type=int, default=1000000)
+    parser.add_argument('--large-list-leads', type=int, default=2000)
+    parser.add_argument('--large-list-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    scrubber = LeadScrubber()
+    default = list(scrubber.LITIGATION_PATTERNS)
+    compare(scrubber, make_leads(args.leads, default), default, args.repeat,
+            f"{args.leads:,} leads, {len(default)} keywords")
+
+    keywords = keyword_list(args.large_list_size) + default
+    compare(scrubber, make_leads(args.large_list_leads, keywords), keywords, args.repeat,
+            f"{args.large_list_leads:,} leads, {len(keywords):,} keywords")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Wall-clock time of container extraction serially and in pools of 2 and 4 forked workers
+
+Parsing and container selection stay in the parent, so they are timed once and
+added to each figure. DataExtractor caps its pool at the CPU count, so this script
+calls the sharded path directly with exactly the requested workers; on a host with
+fewer cores than workers the figures measure oversubscription, not scaling.
+
+    python benchmarks/bench_parallel_extract.py --profile salesforce --rows 100000 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+
+from bench_utils import ROOT, best_of  # first: puts the repository on sys.path
+from conftest import _profile_page
+from data_extractor import DataExtractor, _extract_shard
+from extraction_plan import plan_cache
+from html_reducer import reduce_for_extraction
+from parser_engine import get_parser_engine
+from process_pool import map_shards
+
+
+def select_containers(extractor: DataExtractor, engine, html, profile, rows: int):
+    """Extraction plan and lead containers, as ``DataExtractor._extract_with_engine`` finds them"""
+    plan = plan_cache.get_plan(profile['mappings'], engine, extractor._clean_field_value, 'DataExtractor',
+                               profile['container_selector'])
+    html = reduce_for_extraction(html, {}, plan)
+    return plan, engine.select_from_html(html, plan.container, rows)
+
+
+def extract(extractor: DataExtractor, plan, containers, workers: int):
+    """Leads of every container, in ``workers`` processes when more than one"""
+    if workers <= 1:
+        return extractor._extract_containers(plan, containers, 0, len(containers))
+    leads = map_shards(_extract_shard, (extractor, plan, containers), len(containers), workers)
+    if leads is None:
+        raise RuntimeError("The worker pool could not be used")
+    return leads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', default='salesforce', choices=['salesforce', 'hubspot', 'pipedrive'])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--engine', default='lxml', choices=['lxml', 'bs4'])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'config', 'field_mappings.json'), 'r', encoding='utf-8') as f:
+        profile = json.load(f)[args.profile]
+    html = _profile_page(args.profile, args.rows)
+    extractor = DataExtractor()
+    engine = get_parser_engine(args.engine)
+
+    select_seconds, (plan, containers) = best_of(
+        lambda: select_containers(extractor, engine, html, profile, args.rows), args.repeat)
+    print(f"{args.profile} {args.rows:,} rows on {os.cpu_count()} CPUs ({engine.name}): "
+          f"parse and select {select_seconds:.2f}s")
+
+    reference = None
+    for workers in args.workers:
+        seconds, leads = best_of(lambda: extract(extractor, plan, containers, workers), args.repeat)
+        if reference is None:
+            reference = leads
+        elif leads != reference:
+            raise AssertionError(f"{workers} workers gave different leads")
+        print(f"  {workers} worker{'s' if workers > 1 else ' '}: extract {seconds:.2f}s, "
+              f"total {select_seconds + seconds:.2f}s ({len(leads)} leads)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Wall-clock time of scrub_leads serially and in pools of 2 and 4 forked workers
+
+scrub_leads caps its pool at the CPU count, so this script calls the parallel path
+directly with exactly the requested workers; on a host with fewer cores than
+workers the figures measure oversubscription, not scaling.
+
+    python benchmarks/bench_parallel_scrub.py --leads 1000000 --workers 1 2 4
+"""
+import argparse
+import os
+import random
+
+from bench_utils import best_of  # first: puts the repository on sys.path
+from lead_scrubber import LeadScrubber
+from phone_utils import normalize_phone
+
+SCENARIOS = {
+    'litigation + dedupe': {'filter_litigation': True, 'dedupe': True},
+    'phone only': {},
+    'phone + dedupe': {'dedupe': True},
+}
+
+
+def make_leads(count: int, seed: int = 11):
+    """Leads with repeated numbers, some landline prefixes and litigation keywords in a few notes"""
+    rng = random.Random(seed)
+    notes = ['call back', 'warm lead', 'no answer', 'pending lawsuit', 'spoke to attorney', 'interested']
+    return [{'first_name': f'Name{i}', 'number': f'({rng.randint(200, 999)}) {rng.randint(200, 999)}-{i % 9000:04d}',
+             'company': 'Acme', 'city': 'Springfield', 'notes': rng.choice(notes)} for i in range(count)]
+
+
+def scrub(scrubber: LeadScrubber, leads, config, workers: int):
+    """Clean leads and stats of one scrub, in ``workers`` processes when more than one"""
+    normalize_phone.cache_clear()
+    if workers <= 1:
+        result = scrubber.scrub_leads(leads, config)
+        return result['clean_leads'], result['stats']
+    stats = scrubber.new_stats()
+    clean_leads = scrubber._scrub_parallel(leads, config, stats, scrubber.deduplicator(config), workers)
+    if clean_leads is None:
+        raise RuntimeError("The worker pool could not be used")
+    return clean_leads, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--leads', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.leads:,} leads on {os.cpu_count()} CPUs")
+    scrubber = LeadScrubber()
+    leads = make_leads(args.leads)
+    for name, config in SCENARIOS.items():
+        config = dict(config, filter_suppressed=False)
+        timings = []
+        reference = None
+        for workers in args.workers:
+            seconds, (clean_leads, stats) = best_of(lambda: scrub(scrubber, leads, config, workers), args.repeat)
+            clean_ids = [id(lead) for lead in clean_leads]
+            if reference is None:
+                reference = clean_ids, stats
+            elif (clean_ids, stats) != reference:
+                raise AssertionError(f"{workers} workers gave a different result for {name}")
+            timings.append(f"{workers} worker{'s' if workers > 1 else ''} {seconds:.2f}s")
+        print(f"  {name:20s} " + ', '.join(timings))
+
+
+if __name__ == '__main__':
+    main()
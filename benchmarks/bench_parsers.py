@@ -0,0 +1,37 @@
+"""
+Extraction time of the lxml and bs4 parser engines on a synthetic CRM page
+
+    python benchmarks/bench_parsers.py --profile salesforce --rows 20000
+"""
+import argparse
+import json
+import os
+
+from bench_utils import ROOT, best_of
+from conftest import _profile_page
+from data_extractor import DataExtractor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', default='salesforce', choices=['salesforce', 'hubspot', 'pipedrive'])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'config', 'field_mappings.json'), 'r', encoding='utf-8') as f:
+        profile = json.load(f)[args.profile]
+    html = _profile_page(args.profile, args.rows)
+    extractor = DataExtractor()
+
+    results = {}
+    for engine in ('bs4', 'lxml'):
+        config = {'container_selector': profile['container_selector'], 'max_leads': args.rows, 'parser': engine}
+        seconds, leads = best_of(lambda: extractor.extract_leads(html, profile['mappings'], config), args.repeat)
+        results[engine] = leads
+        print(f"{args.profile} {args.rows} rows, {engine:4s}: {seconds:.2f}s ({len(leads)} leads)")
+    print(f"identical output: {results['lxml'] == results['bs4']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Vectorised phone classification against the per-number path, at 1M and 10M numbers
+
+    python benchmarks/bench_phone_scrub.py --rows 1000000 10000000
+"""
+import argparse
+import random
+
+import numpy as np
+
+from bench_utils import best_of  # first: puts the repository on sys.path
+from lead_scrubber import PHONE_REASONS, LeadScrubber
+from phone_utils import normalize_phone
+
+FORMATS = ['(%03d) %03d-%04d', '%03d.%03d.%04d', '1%03d%03d%04d', '%03d-%03d-%04d', '+1 %03d %03d %04d x12']
+
+
+def phone_numbers(count: int, seed: int = 1):
+    """Mostly distinct numbers in common formats, with a few empty and malformed values"""
+    rng = random.Random(seed)
+    numbers = [rng.choice(FORMATS) % (rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999))
+               for _ in range(count)]
+    for position in range(0, count, 97):
+        numbers[position] = rng.choice(['', None, '555-01', 'n/a'])
+    return numbers
+
+
+def per_number(scrubber: LeadScrubber, numbers) -> np.ndarray:
+    """Reason codes from ``is_landline_or_unwanted``, one call per number as scrubbing used to do"""
+    codes = {reason: code for code, reason in enumerate(PHONE_REASONS)}
+    normalize_phone.cache_clear()
+    return np.array([codes[scrubber.is_landline_or_unwanted(number)[1]] for number in numbers], dtype=np.int8)
+
+
+def per_lead_scrub(scrubber: LeadScrubber, leads):
+    """Clean leads of a per-lead landline scrub"""
+    normalize_phone.cache_clear()
+    return [lead for lead in leads if not scrubber.is_landline_or_unwanted(lead.get('number'))[0]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    scrubber = LeadScrubber()
+    config = {'filter_suppressed': False}
+    for rows in args.rows:
+        numbers = phone_numbers(rows)
+        scalar_seconds, expected = best_of(lambda: per_number(scrubber, numbers), args.repeat)
+        vector_seconds, codes = best_of(lambda: scrubber.classify_phones(numbers), args.repeat)
+        print(f"classify {rows:,} numbers: per number {scalar_seconds:.2f}s, classify_phones {vector_seconds:.2f}s, "
+              f"identical: {np.array_equal(codes, expected)}")
+
+        leads = [{'first_name': 'Lead', 'number': number} for number in numbers]
+        numbers = None
+        scalar_seconds, expected = best_of(lambda: per_lead_scrub(scrubber, leads), args.repeat)
+        vector_seconds, result = best_of(lambda: scrubber.scrub_leads(leads, config), args.repeat)
+        identical = [id(lead) for lead in result['clean_leads']] == [id(lead) for lead in expected]
+        print(f"scrub {rows:,} leads: per lead {scalar_seconds:.2f}s, scrub_leads {vector_seconds:.2f}s, "
+              f"identical: {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Shared setup for the benchmark scripts in this directory
+
+Each script is run directly, e.g. ``python benchmarks/bench_parsers.py``, and
+prints its timings; none of them is part of the test suite.
+"""
+import os
+import sys
+import time
+import logging
+from typing import Any, Callable, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules live at the repository root; synthetic CRM pages come from tests/conftest.py
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+# Per-batch log lines would be timed along with the work
+logging.disable(logging.CRITICAL)
+
+
+def best_of(func: Callable[[], Any], repeat: int = 3) -> Tuple[float, Any]:
+    """
+    Time ``func`` several times
+
+    Returns:
+        Tuple of (fastest wall-clock seconds, result of the last call)
+    """
+    best = float('inf')
+    result = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
@@ -0,0 +1,150 @@
+import re
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Class names that can be written in a selector without escaping
+_PLAIN_CLASS = re.compile(r'^-?[_a-zA-Z][_a-zA-Z0-9-]*$')
+
+
+class _Group:
+    """Statistics for one structural signature"""
+
+    __slots__ = ('count', 'classes', 'parent_classes', 'parents', 'parent_children', 'sample')
+
+    def __init__(self, classes: frozenset, parent_classes: frozenset, sample: Any):
+        self.count = 0
+        self.classes = classes
+        self.parent_classes = parent_classes
+        self.parents = 0
+        self.parent_children = 0
+        self.sample = sample
+
+
+class ContainerDetector:
+    """
+    Proposes a container selector from repeated sibling structure
+
+    Elements are fed in document order. Each element's signature is its tag, the
+    tag of its parent and the distinct tags of its children; elements sharing a
+    signature are structurally similar siblings. Class sets are intersected within
+    a group rather than hashed into the signature, so alternating row classes
+    (``odd``/``even``, ``selected``) do not split a table into pieces. Only an
+    open-ancestor stack is kept, so memory is bounded by depth and group count.
+    """
+
+    def __init__(self, nav):
+        self.nav = nav
+        self._groups: Dict[tuple, _Group] = {}
+        # Open ancestors: [element, signature, distinct child tags, child count, child group counts]
+        self._stack: List[list] = []
+
+    def add(self, element):
+        """Feed the next element in document order"""
+        nav = self.nav
+        parent = nav.parent(element)
+        stack = self._stack
+        while stack and stack[-1][0] is not parent:
+            self._finish(stack.pop())
+
+        tag = nav.tag(element)
+        if stack:
+            entry = stack[-1]
+            if tag not in entry[2]:
+                entry[2].append(tag)
+            entry[3] += 1
+        stack.append([element, tag, [], 0, {}])
+
+    def candidates(self, engine, document, limit: int = 3) -> List[Dict]:
+        """
+        Rank the detected groups as container selectors
+
+        Args:
+            engine: Parser engine the document was parsed with
+            document: Parsed document the elements came from
+            limit: Maximum number of candidates to return
+
+        Returns:
+            List of {'selector', 'count', 'confidence', 'sample_text'} dicts, best first
+        """
+        while self._stack:
+            self._finish(self._stack.pop())
+
+        # Longest sibling runs first: rows of a table beat the cells repeated in every row
+        ranked = sorted(
+            ((key, group) for key, group in self._groups.items() if group.count > 1),
+            key=lambda item: (item[1].count / item[1].parents, item[1].count, len(item[0][2])),
+            reverse=True
+        )
+
+        results = []
+        seen = set()
+        for key, group in ranked:
+            if len(results) >= limit:
+                break
+            candidate = self._describe(engine, document, key, group)
+            if candidate and candidate['selector'] not in seen:
+                seen.add(candidate['selector'])
+                results.append(candidate)
+        return results
+
+    def _finish(self, entry: list):
+        """Record a closed element under its signature and settle its children's groups"""
+        element, tag, child_tags, child_count, child_groups = entry
+        for key in child_groups:
+            group = self._groups[key]
+            group.parents += 1
+            group.parent_children += child_count
+
+        if not child_count:
+            # Leaf elements carry no fields, so they are never containers
+            return
+        parent_entry = self._stack[-1] if self._stack else None
+        if parent_entry is None:
+            return
+
+        nav = self.nav
+        parent = parent_entry[0]
+        key = (parent_entry[1], tag, tuple(child_tags))
+        classes = frozenset(nav.class_tokens(element))
+        group = self._groups.get(key)
+        if group is None:
+            group = _Group(classes, frozenset(nav.class_tokens(parent)), element)
+            self._groups[key] = group
+        else:
+            group.classes &= classes
+            group.parent_classes &= frozenset(nav.class_tokens(parent))
+        group.count += 1
+        parent_entry[4][key] = parent_entry[4].get(key, 0) + 1
+
+    def _describe(self, engine, document, key: tuple, group: _Group) -> Optional[Dict]:
+        parent_tag, tag, _ = key
+        base = tag + ''.join(f'.{name}' for name in sorted(group.classes) if _PLAIN_CLASS.match(name))
+        parent = parent_tag + ''.join(f'.{name}' for name in sorted(group.parent_classes) if _PLAIN_CLASS.match(name))
+
+        best = None
+        for selector in (base, f'{parent} > {base}'):
+            try:
+                matched = engine.count(document, engine.compile(selector))
+            except Exception as e:
+                logger.debug(f"Skipping candidate selector {selector}: {str(e)}")
+                continue
+            if matched and (best is None or matched < best[1]):
+                best = (selector, matched)
+            if matched == group.count:
+                break
+        if best is None:
+            return None
+
+        selector, matched = best
+        # Precision: how much of what the selector matches is the group.
+        # Coverage: how much of the parents' content the group makes up.
+        precision = min(1.0, group.count / matched)
+        coverage = group.count / group.parent_children if group.parent_children else 0.0
+        return {
+            'selector': selector,
+            'count': group.count,
+            'confidence': round(precision * coverage, 2),
+            'sample_text': engine.text(group.sample)[:100]
+        }
@@ -0,0 +1,653 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is a declared dependency
+    etree = None
+
+from bs4 import BeautifulSoup, Tag, Comment, Declaration, Doctype, CData, ProcessingInstruction
+
+
+class UnsupportedSelector(ValueError):
+    """Raised when a CSS selector is outside the subset handled here"""
+
+
+class AttributeTest(NamedTuple):
+    name: str
+    op: Optional[str]
+    value: str
+    ignore_case: bool
+
+
+class Compound(NamedTuple):
+    tag: str
+    ids: Tuple[str, ...]
+    classes: Tuple[str, ...]
+    attributes: Tuple[AttributeTest, ...]
+    pseudos: Tuple[Tuple, ...]
+
+
+class ComplexSelector(NamedTuple):
+    """Compound selectors left to right; ``combinators[i]`` joins compounds i and i+1"""
+    compounds: Tuple[Compound, ...]
+    combinators: Tuple[str, ...]
+
+
+_IDENT = r'-?(?:[_a-zA-Z]|[^\x00-\x7f])(?:[_a-zA-Z0-9-]|[^\x00-\x7f])*'
+_TOKEN = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comb>[>+~])
+  | (?P<comma>,)
+  | (?P<star>\*)
+  | (?P<hash>\#(?P<hash_name>(?:[_a-zA-Z0-9-]|[^\x00-\x7f])+))
+  | (?P<cls>\.(?P<cls_name>%(ident)s))
+  | (?P<attr>\[\s*(?P<attr_name>%(ident)s)\s*
+        (?:(?P<attr_op>[~|^$*]?=)\s*
+           (?:(?P<attr_str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(?P<attr_ident>%(ident)s))
+           \s*(?P<attr_flag>[iIsS])?\s*)?\])
+  | (?P<pseudo>:(?P<pseudo_name>%(ident)s)(?P<pseudo_open>\()?)
+  | (?P<close>\))
+  | (?P<tag>%(ident)s)
+''' % {'ident': _IDENT}, re.VERBOSE)
+_KINDS = ('ws', 'comb', 'comma', 'star', 'hash', 'cls', 'attr', 'pseudo', 'close', 'tag')
+_NTH = re.compile(r'^\s*(?:(?P<odd>odd)|(?P<even>even)|(?P<a>[+-]?\d*)n\s*(?:(?P<sign>[+-])\s*(?P<b>\d+))?|(?P<only_b>[+-]?\d+))\s*$', re.I)
+_SIMPLE_PSEUDOS = ('first-child', 'last-child', 'only-child', 'empty')
+
+# Whitespace as defined by CSS/HTML, used for token lists and :empty
+_HTML_SPACE = ' \t\r\n\f'
+
+
+@lru_cache(maxsize=1024)
+def parse_selector(selector: str) -> Tuple[ComplexSelector, ...]:
+    """
+    Parse a selector list into complex selectors
+
+    Supports type, universal, id, class and attribute selectors (all operators
+    and the ``i``/``s`` flags), the four combinators, ``:first-child``,
+    ``:last-child``, ``:only-child``, ``:empty``, ``:nth-child()`` and ``:not()``.
+
+    Raises:
+        UnsupportedSelector: for anything else
+    """
+    tokens = _tokenize(selector)
+    selectors, pos = _parse_list(tokens, 0)
+    if pos != len(tokens):
+        raise UnsupportedSelector(f"Unexpected token in selector: {selector}")
+    return tuple(selectors)
+
+
+def _tokenize(selector: str) -> List[Tuple[str, Any]]:
+    tokens = []
+    pos = 0
+    selector = selector.strip()
+    while pos < len(selector):
+        match = _TOKEN.match(selector, pos)
+        if not match:
+            raise UnsupportedSelector(f"Unsupported selector syntax: {selector[pos:]!r}")
+        kind = next(k for k in _KINDS if match.group(k) is not None)
+        tokens.append((kind, match))
+        pos = match.end()
+        if kind == 'pseudo' and match.group('pseudo_open') and match.group('pseudo_name').lower() == 'nth-child':
+            close = selector.find(')', pos)
+            if close < 0:
+                raise UnsupportedSelector("Unterminated :nth-child()")
+            tokens.append(('nth', selector[pos:close]))
+            pos = close
+    return tokens
+
+
+def _skip_ws(tokens, pos) -> int:
+    while pos < len(tokens) and tokens[pos][0] == 'ws':
+        pos += 1
+    return pos
+
+
+def _parse_list(tokens, pos) -> Tuple[List[ComplexSelector], int]:
+    selectors = []
+    while True:
+        selector, pos = _parse_complex(tokens, pos)
+        selectors.append(selector)
+        if pos < len(tokens) and tokens[pos][0] == 'comma':
+            pos += 1
+            continue
+        return selectors, pos
+
+
+def _parse_complex(tokens, pos) -> Tuple[ComplexSelector, int]:
+    pos = _skip_ws(tokens, pos)
+    compounds = []
+    combinators = []
+    while True:
+        compound, pos = _parse_compound(tokens, pos)
+        compounds.append(compound)
+        start = pos
+        pos = _skip_ws(tokens, pos)
+        if pos < len(tokens) and tokens[pos][0] == 'comb':
+            combinators.append(tokens[pos][1].group(0))
+            pos = _skip_ws(tokens, pos + 1)
+            continue
+        if pos > start and pos < len(tokens) and tokens[pos][0] not in ('comma', 'close'):
+            combinators.append(' ')
+            continue
+        return ComplexSelector(tuple(compounds), tuple(combinators)), pos
+
+
+def _parse_compound(tokens, pos) -> Tuple[Compound, int]:
+    tag = '*'
+    ids, classes, attributes, pseudos = [], [], [], []
+    consumed = False
+    if pos < len(tokens) and tokens[pos][0] in ('tag', 'star'):
+        if tokens[pos][0] == 'tag':
+            tag = tokens[pos][1].group(0).lower()
+        pos += 1
+        consumed = True
+    while pos < len(tokens):
+        kind, match = tokens[pos]
+        if kind == 'hash':
+            ids.append(match.group('hash_name'))
+        elif kind == 'cls':
+            classes.append(match.group('cls_name'))
+        elif kind == 'attr':
+            attributes.append(_parse_attribute(match))
+        elif kind == 'pseudo':
+            pseudo, pos = _parse_pseudo(tokens, pos)
+            pseudos.append(pseudo)
+            consumed = True
+            continue
+        else:
+            break
+        consumed = True
+        pos += 1
+    if not consumed:
+        raise UnsupportedSelector("Empty compound selector")
+    return Compound(tag, tuple(ids), tuple(classes), tuple(attributes), tuple(pseudos)), pos
+
+
+def _parse_attribute(match) -> AttributeTest:
+    name = match.group('attr_name').lower()
+    op = match.group('attr_op')
+    if not op:
+        return AttributeTest(name, None, '', False)
+    raw = match.group('attr_str')
+    value = re.sub(r'\\(.)', r'\1', raw[1:-1]) if raw is not None else match.group('attr_ident')
+    flag = (match.group('attr_flag') or '').lower()
+    # soupsieve treats the HTML ``type`` attribute value case-insensitively
+    ignore_case = flag == 'i' or (name == 'type' and flag != 's')
+    return AttributeTest(name, op, value.lower() if ignore_case else value, ignore_case)
+
+
+def _parse_pseudo(tokens, pos) -> Tuple[Tuple, int]:
+    match = tokens[pos][1]
+    name = match.group('pseudo_name').lower()
+    pos += 1
+    if not match.group('pseudo_open'):
+        if name not in _SIMPLE_PSEUDOS:
+            raise UnsupportedSelector(f"Unsupported pseudo-class :{name}")
+        return (name,), pos
+
+    if name == 'not':
+        selectors, pos = _parse_list(tokens, pos)
+        if pos >= len(tokens) or tokens[pos][0] != 'close':
+            raise UnsupportedSelector("Unterminated :not()")
+        return ('not', tuple(selectors)), pos + 1
+
+    if name == 'nth-child':
+        nth = _NTH.match(tokens[pos][1])
+        if not nth:
+            raise UnsupportedSelector(f"Unsupported :nth-child argument: {tokens[pos][1]}")
+        if nth.group('odd'):
+            a, b = 2, 1
+        elif nth.group('even'):
+            a, b = 2, 0
+        elif nth.group('only_b') is not None:
+            a, b = 0, int(nth.group('only_b'))
+        else:
+            raw_a = nth.group('a')
+            a = -1 if raw_a == '-' else 1 if raw_a in ('', '+') else int(raw_a)
+            b = int(nth.group('b') or 0) * (-1 if nth.group('sign') == '-' else 1)
+        return ('nth-child', a, b), pos + 2
+
+    raise UnsupportedSelector(f"Unsupported pseudo-class :{name}()")
+
+
+def selector_features(selectors: Tuple[ComplexSelector, ...]) -> Set[str]:
+    """Combinators and pseudo-class names used anywhere in a selector list, including inside ``:not()``"""
+    features = set()
+    for selector in selectors:
+        features.update(selector.combinators)
+        for compound in selector.compounds:
+            for pseudo in compound.pseudos:
+                features.add(pseudo[0])
+                if pseudo[0] == 'not':
+                    features |= selector_features(pseudo[1])
+    return features
+
+
+def needs_following_siblings(selectors: Tuple[ComplexSelector, ...]) -> bool:
+    """Whether matching depends on siblings after an element (``:last-child``, ``:only-child``)"""
+    return bool(selector_features(selectors) & {'last-child', 'only-child'})
+
+
+def depends_on_siblings(selectors: Tuple[ComplexSelector, ...]) -> bool:
+    """Whether matching can depend on an element's siblings (positions or sibling combinators)"""
+    return bool(selector_features(selectors) & {'+', '~', 'first-child', 'last-child', 'only-child', 'nth-child'})
+
+
+# --- XPath rendering -------------------------------------------------------
+#
+# Each complex selector is rendered in "match form": the subject element test
+# followed by predicates that walk *backwards* through the combinators
+# (ancestor::, parent::, preceding-sibling::). This keeps soupsieve semantics,
+# where ancestors may live outside the element being searched, and lets the same
+# step be used to select descendants or to test a single node.
+
+def to_xpath(selectors: Tuple[ComplexSelector, ...], axis: str = 'descendant::') -> str:
+    """Render a parsed selector list as a single XPath step along ``axis``"""
+    if len(selectors) == 1:
+        return axis + _xpath_step(selectors[0])
+    # One step with self:: alternatives instead of a '|' union: libxml2 merges
+    # union node-sets pairwise, which goes quadratic on large documents
+    return axis + '*[' + ' or '.join('self::' + _xpath_step(selector) for selector in selectors) + ']'
+
+
+def _xpath_step(selector: ComplexSelector) -> str:
+    compounds = selector.compounds
+    nested = ''
+    for index in range(len(compounds) - 1):
+        tag, predicates = _xpath_compound(compounds[index])
+        combinator = selector.combinators[index]
+        if combinator == ' ':
+            part = f'ancestor::{tag}{predicates}'
+        elif combinator == '>':
+            part = f'parent::{tag}{predicates}'
+        elif combinator == '~':
+            part = f'preceding-sibling::{tag}{predicates}'
+        else:
+            part = f'preceding-sibling::*[1][self::{tag}]{predicates}'
+        nested = f'[{part}{nested}]'
+    tag, predicates = _xpath_compound(compounds[-1])
+    return tag + predicates + nested
+
+
+def _xpath_compound(compound: Compound) -> Tuple[str, str]:
+    conditions = [f'@id={_literal(value)}' for value in compound.ids]
+    for name in compound.classes:
+        # The cheap substring test short-circuits the token test on most nodes
+        conditions.append(
+            f"contains(@class, {_literal(name)}) and "
+            f"contains(concat(' ', normalize-space(@class), ' '), {_literal(' ' + name + ' ')})"
+        )
+    conditions.extend(_xpath_attribute(test) for test in compound.attributes)
+    conditions.extend(_xpath_pseudo(pseudo) for pseudo in compound.pseudos)
+    return compound.tag, ''.join(f'[{c}]' for c in conditions)
+
+
+def _xpath_attribute(test: AttributeTest) -> str:
+    attr = f'@{test.name}'
+    if not test.op:
+        return attr
+    if test.ignore_case:
+        attr = f"translate(@{test.name}, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+    value = test.value
+    literal = _literal(value)
+    if test.op == '=':
+        return f'{attr}={literal}'
+    if test.op == '~=':
+        if not value or re.search(r'\s', value):
+            return 'false()'
+        return f"@{test.name} and contains(concat(' ', normalize-space({attr}), ' '), {_literal(' ' + value + ' ')})"
+    if test.op == '|=':
+        return f'({attr}={literal} or starts-with({attr}, {_literal(value + "-")}))'
+    if not value:
+        return 'false()'
+    if test.op == '^=':
+        return f'starts-with({attr}, {literal})'
+    if test.op == '*=':
+        return f'contains({attr}, {literal})'
+    return f'substring({attr}, string-length({attr}) - {len(value) - 1})={literal}'
+
+
+def _xpath_pseudo(pseudo: Tuple) -> str:
+    name = pseudo[0]
+    if name == 'first-child':
+        return 'not(preceding-sibling::*)'
+    if name == 'last-child':
+        return 'not(following-sibling::*)'
+    if name == 'only-child':
+        return 'not(preceding-sibling::*) and not(following-sibling::*)'
+    if name == 'empty':
+        return 'not(*) and not(text()[normalize-space()])'
+    if name == 'not':
+        return 'not(' + ' | '.join('self::' + _xpath_step(selector) for selector in pseudo[1]) + ')'
+    # nth-child: position = a*n + b for some n >= 0
+    a, b = pseudo[1], pseudo[2]
+    position = 'count(preceding-sibling::*) + 1'
+    if a == 0:
+        return f'{position} = {b}'
+    if a > 0:
+        return f'{position} >= {b} and ({position} - {b}) mod {a} = 0'
+    return f'{position} <= {b} and ({b} - {position}) mod {-a} = 0'
+
+
+def _literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return 'concat(' + ", \"'\", ".join(f"'{part}'" for part in value.split("'")) + ')'
+
+
+# --- Python node predicates ------------------------------------------------
+
+class LxmlNav:
+    """Tree navigation for lxml elements"""
+
+    @staticmethod
+    def tag(element) -> str:
+        return element.tag
+
+    @staticmethod
+    def attribute(element, name: str) -> Optional[str]:
+        return element.get(name)
+
+    @staticmethod
+    def attribute_names(element) -> List[str]:
+        return element.keys()
+
+    @staticmethod
+    def class_tokens(element) -> List[str]:
+        value = element.get('class')
+        return value.split() if value else []
+
+    @staticmethod
+    def parent(element):
+        return element.getparent()
+
+    @staticmethod
+    def preceding_siblings(element) -> Iterable:
+        return element.itersiblings(etree.Element, preceding=True)
+
+    @staticmethod
+    def has_following_sibling(element) -> bool:
+        return next(element.itersiblings(etree.Element), None) is not None
+
+    @staticmethod
+    def is_empty(element) -> bool:
+        if (element.text or '').strip(_HTML_SPACE):
+            return False
+        for child in element:
+            if isinstance(child.tag, str) or (child.tail or '').strip(_HTML_SPACE):
+                return False
+        return True
+
+    @staticmethod
+    def descendants(node) -> Iterable:
+        if isinstance(node, etree._ElementTree):
+            return node.getroot().iter(etree.Element)
+        return node.iterdescendants(etree.Element)
+
+
+class Bs4Nav:
+    """Tree navigation for BeautifulSoup tags"""
+
+    _SPECIAL_STRINGS = (Comment, Declaration, Doctype, CData, ProcessingInstruction)
+
+    @staticmethod
+    def tag(element) -> str:
+        return element.name
+
+    @staticmethod
+    def attribute(element, name: str) -> Optional[str]:
+        value = element.get(name)
+        if isinstance(value, list):
+            return ' '.join(value)
+        return value
+
+    @staticmethod
+    def attribute_names(element) -> List[str]:
+        return list(element.attrs)
+
+    @staticmethod
+    def class_tokens(element) -> List[str]:
+        value = element.get('class')
+        if isinstance(value, str):
+            return value.split()
+        return value or []
+
+    @staticmethod
+    def parent(element):
+        parent = element.parent
+        if parent is None or isinstance(parent, BeautifulSoup):
+            return None
+        return parent
+
+    @staticmethod
+    def preceding_siblings(element) -> Iterable:
+        return (sibling for sibling in element.previous_siblings if isinstance(sibling, Tag))
+
+    @staticmethod
+    def has_following_sibling(element) -> bool:
+        return any(isinstance(sibling, Tag) for sibling in element.next_siblings)
+
+    @classmethod
+    def is_empty(cls, element) -> bool:
+        for child in element.contents:
+            if isinstance(child, Tag):
+                return False
+            if not isinstance(child, cls._SPECIAL_STRINGS) and child.strip(_HTML_SPACE):
+                return False
+        return True
+
+    @staticmethod
+    def descendants(node) -> Iterable:
+        return (element for element in node.descendants if isinstance(element, Tag))
+
+
+def compile_matcher(selectors: Tuple[ComplexSelector, ...], nav) -> Callable[[Any], bool]:
+    """Compile a parsed selector list into a predicate testing a single element"""
+    tests = [_complex_test(selector, nav) for selector in selectors]
+    if len(tests) == 1:
+        return tests[0]
+    return lambda element: any(test(element) for test in tests)
+
+
+def _complex_test(selector: ComplexSelector, nav) -> Callable[[Any], bool]:
+    tests = [_compound_test(compound, nav) for compound in selector.compounds]
+    combinators = selector.combinators
+    parent = nav.parent
+    preceding_siblings = nav.preceding_siblings
+
+    def match_at(element, index):
+        if not tests[index](element):
+            return False
+        if index == 0:
+            return True
+        combinator = combinators[index - 1]
+        if combinator == ' ':
+            ancestor = parent(element)
+            while ancestor is not None:
+                if match_at(ancestor, index - 1):
+                    return True
+                ancestor = parent(ancestor)
+            return False
+        if combinator == '>':
+            ancestor = parent(element)
+            return ancestor is not None and match_at(ancestor, index - 1)
+        if combinator == '~':
+            return any(match_at(sibling, index - 1) for sibling in preceding_siblings(element))
+        sibling = next(iter(preceding_siblings(element)), None)
+        return sibling is not None and match_at(sibling, index - 1)
+
+    last = len(tests) - 1
+    return lambda element: match_at(element, last)
+
+
+def _compound_test(compound: Compound, nav) -> Callable[[Any], bool]:
+    tag = compound.tag
+    classes = compound.classes
+    ids = compound.ids
+    attribute_tests = [(test.name, _attribute_check(test)) for test in compound.attributes]
+    pseudo_tests = [_pseudo_check(pseudo, nav) for pseudo in compound.pseudos]
+    get_tag = nav.tag
+    get_attribute = nav.attribute
+
+    def test(element):
+        if tag != '*' and get_tag(element) != tag:
+            return False
+        if classes:
+            value = get_attribute(element, 'class')
+            if not value:
+                return False
+            tokens = value.split()
+            for name in classes:
+                if name not in tokens:
+                    return False
+        for value in ids:
+            if get_attribute(element, 'id') != value:
+                return False
+        for name, check in attribute_tests:
+            if not check(get_attribute(element, name)):
+                return False
+        for check in pseudo_tests:
+            if not check(element):
+                return False
+        return True
+
+    return test
+
+
+def _attribute_check(test: AttributeTest) -> Callable[[Optional[str]], bool]:
+    op, value, ignore_case = test.op, test.value, test.ignore_case
+    if not op:
+        return lambda actual: actual is not None
+    if op == '~=' and (not value or any(c in value for c in _HTML_SPACE)):
+        return lambda actual: False
+    if op in ('^=', '$=', '*=') and not value:
+        return lambda actual: False
+
+    def check(actual):
+        if actual is None:
+            return False
+        if ignore_case:
+            actual = actual.lower()
+        if op == '=':
+            return actual == value
+        if op == '~=':
+            return value in actual.split()
+        if op == '|=':
+            return actual == value or actual.startswith(value + '-')
+        if op == '^=':
+            return actual.startswith(value)
+        if op == '$=':
+            return actual.endswith(value)
+        return value in actual
+
+    return check
+
+
+def _pseudo_check(pseudo: Tuple, nav) -> Callable[[Any], bool]:
+    name = pseudo[0]
+    preceding_siblings = nav.preceding_siblings
+    if name == 'first-child':
+        return lambda element: next(iter(preceding_siblings(element)), None) is None
+    if name == 'last-child':
+        return lambda element: not nav.has_following_sibling(element)
+    if name == 'only-child':
+        return lambda element: (next(iter(preceding_siblings(element)), None) is None
+                                and not nav.has_following_sibling(element))
+    if name == 'empty':
+        return nav.is_empty
+    if name == 'not':
+        inner = compile_matcher(pseudo[1], nav)
+        return lambda element: not inner(element)
+
+    a, b = pseudo[1], pseudo[2]
+
+    def nth_child(element):
+        position = 1 + sum(1 for _ in preceding_siblings(element))
+        if a == 0:
+            return position == b
+        steps, remainder = divmod(position - b, a)
+        return remainder == 0 and steps >= 0
+
+    return nth_child
+
+
+class FieldMatcher:
+    """
+    Matches several selector lists against elements in a single pass
+
+    Every alternative is indexed by the cheapest required feature of its subject
+    (id, then class, then tag, then attribute name) so that most elements are
+    rejected with a few dictionary lookups instead of a full selector test.
+    """
+
+    def __init__(self, parsed_lists: List[Tuple[ComplexSelector, ...]], nav):
+        self.nav = nav
+        self.count = len(parsed_lists)
+        self.by_id, self.by_class, self.by_tag, self.by_attribute = {}, {}, {}, {}
+        self.anywhere = []
+        for index, parsed in enumerate(parsed_lists):
+            for selector in parsed:
+                entry = (index, _complex_test(selector, nav))
+                subject = selector.compounds[-1]
+                if subject.ids:
+                    self.by_id.setdefault(subject.ids[0], []).append(entry)
+                elif subject.classes:
+                    self.by_class.setdefault(subject.classes[0], []).append(entry)
+                elif subject.tag != '*':
+                    self.by_tag.setdefault(subject.tag, []).append(entry)
+                elif subject.attributes:
+                    self.by_attribute.setdefault(subject.attributes[0].name, []).append(entry)
+                else:
+                    self.anywhere.append(entry)
+
+    def first_matches(self, elements: Iterable) -> List:
+        """
+        Find the first element matching each selector list
+
+        Args:
+            elements: Candidate elements in document order
+
+        Returns:
+            List with the first matching element (or None) for each selector list
+        """
+        results = [None] * self.count
+        remaining = self.count
+        candidates_for = self._candidates
+
+        for element in elements:
+            for index, test in candidates_for(element):
+                if results[index] is None and test(element):
+                    results[index] = element
+                    remaining -= 1
+            if not remaining:
+                break
+        return results
+
+    def matching(self, element) -> Set[int]:
+        """Indices of the selector lists that ``element`` matches"""
+        return {index for index, test in self._candidates(element) if test(element)}
+
+    def _candidates(self, element) -> List[Tuple[int, Callable[[Any], bool]]]:
+        """Alternatives whose indexed subject feature ``element`` has"""
+        nav = self.nav
+        candidates = self.by_tag.get(nav.tag(element))
+        candidates = list(candidates) if candidates else []
+        if self.by_class:
+            for name in nav.class_tokens(element):
+                entries = self.by_class.get(name)
+                if entries:
+                    candidates.extend(entries)
+        if self.by_id:
+            entries = self.by_id.get(nav.attribute(element, 'id'))
+            if entries:
+                candidates.extend(entries)
+        for name, entries in self.by_attribute.items():
+            if nav.attribute(element, name) is not None:
+                candidates.extend(entries)
+        if self.anywhere:
+            candidates.extend(self.anywhere)
+        return candidates
@@ -4,6 +4,7 @@ import logging
 from typing import Dict, List, Optional
 from datetime import datetime
 import re
+from phone_utils import normalize_phone
 
 logger = logging.getLogger(__name__)
 
@@ -166,16 +167,8 @@ class CSVExporter:
             return ''
         
         try:
-            # Remove all non-digit characters except + for international
-            digits_only = re.sub(r'[^\d\+]', '', str(phone))
-            
-            # Basic formatting for US numbers
-            if len(digits_only) == 10 and digits_only.isdigit():
-                return f"({digits_only[:3]}) {digits_only[3:6]}-{digits_only[6:]}"
-            elif len(digits_only) == 11 and digits_only.startswith('1'):
-                return f"+1 ({digits_only[1:4]}) {digits_only[4:7]}-{digits_only[7:]}"
-            else:
-                return phone  # Return original if can't format
+            # US numbers get one format; anything else is kept as written
+            return normalize_phone(str(phone)).display or phone
                 
         except Exception:
             return phone
@@ -1,21 +1,56 @@
-from bs4 import BeautifulSoup
 import re
 import logging
 from typing import Dict, List, Optional, Any
 import json
+from parser_engine import get_parser_engine
+from extraction_plan import ExtractionPlan, plan_cache
+from process_pool import map_shards, parallel_workers
+from container_detector import ContainerDetector
+from html_reducer import reduce_for_extraction
+from phone_utils import PHONE_TEXT_PATTERN, normalize_phone
 
 logger = logging.getLogger(__name__)
 
+# Below this many containers, forking workers costs more than it saves
+PARALLEL_THRESHOLD = 20000
+
+# Common container patterns checked by analyze_page_structure
+CONTAINER_PATTERNS = [
+    'tr',  # Table rows
+    '.lead', '.contact', '.record',  # Common CSS classes
+    '[data-lead]', '[data-contact]',  # Data attributes
+    '.row', '.item', '.entry'  # Generic container classes
+]
+
+# Common field patterns checked by analyze_page_structure
+FIELD_PATTERNS = {
+    'email': ['input[type="email"]', '[data-field="email"]', '.email', 'a[href^="mailto:"]'],
+    'phone': ['input[type="tel"]', '[data-field="phone"]', '.phone', 'a[href^="tel:"]'],
+    'name': ['[data-field="name"]', '.name', '.contact-name', 'h1, h2, h3'],
+    'company': ['[data-field="company"]', '.company', '.organization', '.company-name']
+}
+
+# Container patterns first, then field patterns in order; indexes into the analysis matcher
+ANALYSIS_PATTERNS = CONTAINER_PATTERNS + [pattern for patterns in FIELD_PATTERNS.values() for pattern in patterns]
+
+
+def _extract_shard(shared, bounds):
+    """Worker entry point: extract one index range of the containers inherited from the parent"""
+    extractor, plan, containers = shared
+    return extractor._extract_containers(plan, containers, *bounds)
+
+
 class DataExtractor:
     """Extracts lead data from CRM pages using configurable field mappings"""
     
     def __init__(self):
         self.validation_patterns = {
             'email': r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$',
-            'phone': r'^[\+]?[1-9][\d\s\-\(\)]{7,15}$',
+            'phone': PHONE_TEXT_PATTERN,
             'name': r'^[a-zA-Z\s\-\'\.]{2,50}$',
             'company': r'^[a-zA-Z0-9\s\-\&\.\,\(\)]{1,100}$'
         }
+        self._analysis_matchers = {}
     
     def extract_leads(self, html_content: str, field_mappings: Dict, extraction_config: Dict = None) -> List[Dict]:
         """
@@ -34,29 +69,18 @@ class DataExtractor:
                 logger.warning("Missing HTML content or field mappings")
                 return []
             
-            soup = BeautifulSoup(html_content, 'html.parser')
-            leads = []
-            
             extraction_config = extraction_config or {}
-            container_selector = extraction_config.get('container_selector')
-            max_leads = extraction_config.get('max_leads', 500000)
+            engine = get_parser_engine(extraction_config.get('parser'))
             
-            # If container selector is provided, find all lead containers
-            if container_selector:
-                lead_containers = soup.select(container_selector)
-                logger.info(f"Found {len(lead_containers)} lead containers using selector: {container_selector}")
-                
-                for i, container in enumerate(lead_containers[:max_leads]):
-                    lead_data = self._extract_single_lead(container, field_mappings)
-                    if lead_data and self._is_valid_lead(lead_data):
-                        lead_data['_extraction_index'] = i + 1
-                        leads.append(lead_data)
-            else:
-                # Extract single lead from entire page
-                lead_data = self._extract_single_lead(soup, field_mappings)
-                if lead_data and self._is_valid_lead(lead_data):
-                    lead_data['_extraction_index'] = 1
-                    leads.append(lead_data)
+            try:
+                leads = self._extract_with_engine(engine, html_content, field_mappings, extraction_config)
+            except ValueError as e:
+                if engine.name == 'bs4':
+                    raise
+                # Selectors or markup lxml cannot handle go through BeautifulSoup instead
+                logger.info(f"Falling back to BeautifulSoup parser: {str(e)}")
+                engine = get_parser_engine('bs4')
+                leads = self._extract_with_engine(engine, html_content, field_mappings, extraction_config)
             
             logger.info(f"Successfully extracted {len(leads)} valid leads")
             return leads
@@ -65,45 +89,131 @@ class DataExtractor:
             logger.error(f"Error extracting leads: {str(e)}")
             return []
     
-    def _extract_single_lead(self, container: BeautifulSoup, field_mappings: Dict) -> Dict:
+    def preview_leads(self, html_content: str, field_mappings: Dict, extraction_config: Dict = None,
+                      sample_size: int = 10) -> Dict:
+        """
+        Extract the first few leads and count lead containers without extracting the rest
+        
+        Args:
+            html_content: HTML content of the CRM page
+            field_mappings: Dictionary mapping field names to CSS selectors
+            extraction_config: Additional configuration for extraction
+            sample_size: Number of valid leads to extract for the preview
+        
+        Returns:
+            Dictionary with 'leads' (up to sample_size valid leads) and 'total_count'
+            (lead containers found, capped at max_leads)
+        """
+        try:
+            if not html_content or not field_mappings:
+                logger.warning("Missing HTML content or field mappings")
+                return {'leads': [], 'total_count': 0}
+            
+            extraction_config = extraction_config or {}
+            engine = get_parser_engine(extraction_config.get('parser'))
+            
+            try:
+                return self._preview_with_engine(engine, html_content, field_mappings, extraction_config, sample_size)
+            except ValueError as e:
+                if engine.name == 'bs4':
+                    raise
+                logger.info(f"Falling back to BeautifulSoup parser: {str(e)}")
+                engine = get_parser_engine('bs4')
+                return self._preview_with_engine(engine, html_content, field_mappings, extraction_config, sample_size)
+            
+        except Exception as e:
+            logger.error(f"Error previewing leads: {str(e)}")
+            return {'leads': [], 'total_count': 0}
+    
+    def _preview_with_engine(self, engine, html_content: str, field_mappings: Dict, extraction_config: Dict,
+                             sample_size: int) -> Dict:
+        """Extract a preview sample with the given engine; containers past the sample are only counted"""
+        container_selector = extraction_config.get('container_selector')
+        if not container_selector:
+            # A single page-level lead is already cheap
+            leads = self._extract_with_engine(engine, html_content, field_mappings, extraction_config)
+            return {'leads': leads, 'total_count': len(leads)}
+        
+        plan = plan_cache.get_plan(field_mappings, engine, self._clean_field_value, 'DataExtractor', container_selector)
+        document = engine.parse(reduce_for_extraction(html_content, extraction_config, plan))
+        total_count = min(engine.count(document, plan.container), extraction_config.get('max_leads', 500000))
+        
+        leads = []
+        for i, container in enumerate(engine.iter_select(document, plan.container)):
+            if i >= total_count or len(leads) >= sample_size:
+                break
+            lead_data = self._extract_single_lead(container, plan)
+            if lead_data and self._is_valid_lead(lead_data):
+                lead_data['_extraction_index'] = i + 1
+                leads.append(lead_data)
+        
+        logger.info(f"Previewed {len(leads)} leads from {total_count} lead containers ({engine.name})")
+        return {'leads': leads, 'total_count': total_count}
+    
+    def _extract_with_engine(self, engine, html_content: str, field_mappings: Dict, extraction_config: Dict) -> List[Dict]:
+        """Parse the document with the given engine and extract leads from it"""
+        container_selector = extraction_config.get('container_selector')
+        # Compiled plans are cached across requests, so repeated profiles skip setup
+        plan = plan_cache.get_plan(field_mappings, engine, self._clean_field_value, 'DataExtractor', container_selector)
+        # Drop script/style/comment content before parsing; no field can target it
+        html_content = reduce_for_extraction(html_content, extraction_config, plan)
+        
+        leads = []
+        max_leads = extraction_config.get('max_leads', 500000)
+        
+        # If container selector is provided, find lead containers, parsing only as far as max_leads needs
+        if container_selector:
+            lead_containers = engine.select_from_html(html_content, plan.container, max_leads)
+            logger.info(f"Found {len(lead_containers)} lead containers using selector: {container_selector} ({engine.name})")
+            
+            workers = parallel_workers(extraction_config, len(lead_containers), PARALLEL_THRESHOLD)
+            parallel_leads = None
+            if workers:
+                # Forked workers inherit the parsed document; only leads are sent back
+                logger.info(f"Extracting {len(lead_containers)} containers with {workers} workers")
+                parallel_leads = map_shards(_extract_shard, (self, plan, lead_containers), len(lead_containers), workers)
+            if parallel_leads is not None:
+                leads = parallel_leads
+            else:
+                leads = self._extract_containers(plan, lead_containers, 0, len(lead_containers))
+        else:
+            # Extract single lead from entire page
+            document = engine.parse(html_content)
+            lead_data = self._extract_single_lead(document, plan)
+            if lead_data and self._is_valid_lead(lead_data):
+                lead_data['_extraction_index'] = 1
+                leads.append(lead_data)
+        
+        return leads
+    
+    def _extract_containers(self, plan: ExtractionPlan, containers: List[Any], start: int, end: int) -> List[Dict]:
+        """Extract valid leads from ``containers[start:end]``, numbered by container position"""
+        leads = []
+        for i in range(start, end):
+            lead_data = self._extract_single_lead(containers[i], plan)
+            if lead_data and self._is_valid_lead(lead_data):
+                lead_data['_extraction_index'] = i + 1
+                leads.append(lead_data)
+        return leads
+    
+    def _extract_single_lead(self, container: Any, plan: ExtractionPlan) -> Dict:
         """Extract data for a single lead from a container element"""
         lead_data = {}
         
         try:
-            for field_name, selector_config in field_mappings.items():
-                if isinstance(selector_config, str):
-                    # Simple CSS selector
-                    selector = selector_config
-                    attribute = 'text'
-                elif isinstance(selector_config, dict):
-                    # Advanced configuration
-                    selector = selector_config.get('selector', '')
-                    attribute = selector_config.get('attribute', 'text')
-                else:
-                    continue
-                
-                if not selector:
+            # One walk of the container finds the first match of every field
+            elements = plan.engine.first_matches(container, plan.selectors, plan.matcher)
+            for field, element in zip(plan.fields, elements):
+                if element is None:
                     continue
-                
                 try:
-                    elements = container.select(selector)
-                    if elements:
-                        element = elements[0]  # Take first match
+                    # Take first match, then clean and validate the extracted value
+                    cleaned_value = field.clean(field.read(element))
+                    if cleaned_value:
+                        lead_data[field.name] = cleaned_value
                         
-                        if attribute == 'text':
-                            value = element.get_text(strip=True)
-                        elif attribute == 'html':
-                            value = str(element)
-                        else:
-                            value = element.get(attribute, '')
-                        
-                        # Clean and validate the extracted value
-                        cleaned_value = self._clean_field_value(value, field_name)
-                        if cleaned_value:
-                            lead_data[field_name] = cleaned_value
-                            
                 except Exception as e:
-                    logger.debug(f"Error extracting field {field_name} with selector {selector}: {str(e)}")
+                    logger.debug(f"Error extracting field {field.name} with selector {field.selector}: {str(e)}")
                     continue
             
             return lead_data
@@ -133,12 +243,8 @@ class DataExtractor:
             return None
             
         elif field_type == 'phone':
-            # Clean phone number
-            phone = re.sub(r'[^\d\+\-\(\)\s]', '', value)
-            phone = re.sub(r'\s+', ' ', phone).strip()
-            if re.match(self.validation_patterns['phone'], phone):
-                return phone
-            return None
+            # Clean phone number (parsed once per distinct number)
+            return normalize_phone(value).cleaned
             
         elif field_type == 'name':
             # Clean name field
@@ -170,66 +276,83 @@ class DataExtractor:
         
         return has_required_field
     
-    def analyze_page_structure(self, html_content: str) -> Dict:
+    def analyze_page_structure(self, html_content: str, parser: str = None) -> Dict:
         """
         Analyze page structure to suggest field mappings
         
-        Returns suggestions for CSS selectors based on common patterns
+        Returns suggestions for CSS selectors based on common patterns, plus a container
+        selector detected from repeated sibling structure with a confidence score. All
+        patterns, tag counts, data attributes and structural signatures are gathered
+        in one traversal of the page.
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
+            engine = get_parser_engine(parser)
+            document = engine.parse(reduce_for_extraction(html_content, {}))
+            matcher = self._analysis_matcher(engine)
+            nav = engine.nav
+            detector = ContainerDetector(nav)
             suggestions = {
                 'potential_containers': [],
                 'field_suggestions': {},
                 'analysis': {}
             }
             
-            # Look for common container patterns
-            container_patterns = [
-                'tr',  # Table rows
-                '.lead', '.contact', '.record',  # Common CSS classes
-                '[data-lead]', '[data-contact]',  # Data attributes
-                '.row', '.item', '.entry'  # Generic container classes
-            ]
-            
-            for pattern in container_patterns:
-                elements = soup.select(pattern)
-                if len(elements) > 1:  # Multiple similar elements suggest containers
+            counts = [0] * len(ANALYSIS_PATTERNS)
+            first_elements = [None] * len(ANALYSIS_PATTERNS)
+            tag_counts = {}
+            total_elements = 0
+            has_data_attributes = False
+            
+            for element in nav.descendants(document):
+                total_elements += 1
+                detector.add(element)
+                tag = nav.tag(element)
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+                if not has_data_attributes:
+                    has_data_attributes = any(name.startswith('data-') for name in nav.attribute_names(element))
+                for index in matcher.matching(element):
+                    counts[index] += 1
+                    if first_elements[index] is None:
+                        first_elements[index] = element
+            
+            # Repeated sibling structure is the strongest container hint, so it is listed first
+            detected = detector.candidates(engine, document)
+            suggestions['detected_container'] = detected[0] if detected else None
+            suggestions['potential_containers'].extend(detected[:1])
+            
+            # Multiple similar elements suggest containers
+            for index, pattern in enumerate(CONTAINER_PATTERNS):
+                if detected and pattern == detected[0]['selector']:
+                    continue
+                if counts[index] > 1:
                     suggestions['potential_containers'].append({
                         'selector': pattern,
-                        'count': len(elements),
-                        'sample_text': elements[0].get_text(strip=True)[:100] if elements else ''
+                        'count': counts[index],
+                        'sample_text': engine.text(first_elements[index])[:100]
                     })
             
-            # Look for common field patterns
-            field_patterns = {
-                'email': ['input[type="email"]', '[data-field="email"]', '.email', 'a[href^="mailto:"]'],
-                'phone': ['input[type="tel"]', '[data-field="phone"]', '.phone', 'a[href^="tel:"]'],
-                'name': ['[data-field="name"]', '.name', '.contact-name', 'h1, h2, h3'],
-                'company': ['[data-field="company"]', '.company', '.organization', '.company-name']
-            }
-            
-            for field_type, patterns in field_patterns.items():
+            index = len(CONTAINER_PATTERNS)
+            for field_type, patterns in FIELD_PATTERNS.items():
                 field_suggestions = []
                 for pattern in patterns:
-                    elements = soup.select(pattern)
-                    if elements:
+                    if counts[index]:
                         field_suggestions.append({
                             'selector': pattern,
-                            'count': len(elements),
-                            'sample_value': elements[0].get_text(strip=True)[:50] if elements else ''
+                            'count': counts[index],
+                            'sample_value': engine.text(first_elements[index])[:50]
                         })
+                    index += 1
                 
                 if field_suggestions:
                     suggestions['field_suggestions'][field_type] = field_suggestions
             
             # General analysis
             suggestions['analysis'] = {
-                'total_elements': len(soup.find_all()),
-                'forms': len(soup.find_all('form')),
-                'tables': len(soup.find_all('table')),
-                'lists': len(soup.find_all(['ul', 'ol'])),
-                'has_data_attributes': len(soup.select('[data-*]')) > 0
+                'total_elements': total_elements,
+                'forms': tag_counts.get('form', 0),
+                'tables': tag_counts.get('table', 0),
+                'lists': tag_counts.get('ul', 0) + tag_counts.get('ol', 0),
+                'has_data_attributes': has_data_attributes
             }
             
             return suggestions
@@ -242,3 +365,11 @@ class DataExtractor:
                 'field_suggestions': {},
                 'analysis': {}
             }
+    
+    def _analysis_matcher(self, engine):
+        """Single-pass matcher for every analysis pattern, compiled once per engine"""
+        matcher = self._analysis_matchers.get(engine.name)
+        if matcher is None:
+            matcher = engine.field_matcher([engine.compile(pattern) for pattern in ANALYSIS_PATTERNS])
+            self._analysis_matchers[engine.name] = matcher
+        return matcher
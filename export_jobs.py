@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import IO, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no flock on Windows, where only one process runs jobs
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExportQueueFull(RuntimeError):
+    """Raised when the export queue already holds its maximum number of jobs"""
+
+
+@dataclass
+class ExportJob:
+    """State of one background export, updated by the worker thread"""
+    job_id: str
+    expected_rows: int = 0
+    status: str = 'queued'
+    rows_processed: int = 0
+    # Rows already done by an interrupted run when this one resumed; excluded from the rate
+    resumed_rows: int = 0
+    message: str = ''
+    file_path: Optional[str] = None
+    download_name: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('queued', 'running')
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time at the current row rate, or None before the first rows arrive"""
+        if self.status != 'running' or not self.rows_processed or not self.expected_rows:
+            return None
+        rows_this_run = self.rows_processed - self.resumed_rows
+        if rows_this_run <= 0:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.expected_rows - self.rows_processed, 0)
+        return round(remaining * elapsed / rows_this_run, 1)
+
+    def to_dict(self) -> Dict:
+        now = self.finished_at or time.time()
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'rows_processed': self.rows_processed,
+            'expected_rows': self.expected_rows,
+            'eta_seconds': self.eta_seconds(),
+            'elapsed_seconds': round(now - self.started_at, 1) if self.started_at else 0,
+            'message': self.message,
+            'download_name': self.download_name
+        }
+
+
+class ExportJobManager:
+    """
+    Runs exports on a small thread pool so requests return immediately
+
+    Submitting returns a job whose status, row count and ETA can be polled, and
+    whose file can be downloaded once it is done. At most ``max_workers`` exports
+    run at once and at most ``max_queued`` more wait; beyond that submissions are
+    refused. Finished jobs and their files are removed after ``ttl_seconds``.
+    Job state lives in this process, so the app must run as a single worker
+    process (threads are fine) for polling to reach the job; the Procfile starts
+    gunicorn that way. Running a job also holds an exclusive lock on its files, so
+    even when several processes share ``export_dir`` a job runs in only one of them.
+
+    Each job's input document, arguments and state are also kept in ``export_dir``,
+    and the export function is given a checkpoint path to record its progress in.
+    After a crash or restart, ``recover`` queues the interrupted jobs again and they
+    continue from their last checkpoint; a failed job can be retried the same way
+    with ``resume``. Inputs are deleted once a job is done or expires.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 8, ttl_seconds: int = 3600,
+                 export_dir: str = 'exports'):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self.export_dir = export_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export-job')
+        self._jobs: Dict[str, ExportJob] = {}
+        self._export_funcs: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, export_func: Callable, document: str, *args, expected_rows: int = 0) -> ExportJob:
+        """
+        Queue an export
+
+        Args:
+            export_func: Called as ``export_func(document, *args, output_path=...,
+                progress_callback=..., checkpoint_path=...)``; returns
+                ``(file_path, download_name, record_count)``
+            document: Input document, saved so the job can be resumed
+            *args: Further positional arguments for ``export_func``; must be JSON serializable
+            expected_rows: Estimated number of rows, used for the ETA
+
+        Returns:
+            The queued job
+
+        Raises:
+            ExportQueueFull: when ``max_workers + max_queued`` jobs are already active
+        """
+        self._expire()
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.active)
+            if active >= self.max_workers + self.max_queued:
+                raise ExportQueueFull(f"{active} exports are already queued or running")
+            job = ExportJob(job_id=uuid.uuid4().hex, expected_rows=expected_rows)
+            self._jobs[job.job_id] = job
+            self._export_funcs[job.job_id] = export_func
+
+        try:
+            os.makedirs(self.export_dir, exist_ok=True)
+            with open(self._path(job.job_id, '.html'), 'w', encoding='utf-8') as f:
+                f.write(document)
+            with open(self._path(job.job_id, '.args.json'), 'w', encoding='utf-8') as f:
+                json.dump(list(args), f)
+            self._save_state(job)
+        except Exception:
+            with self._lock:
+                del self._jobs[job.job_id]
+            self._remove_files(job.job_id)
+            raise
+
+        self._executor.submit(self._run, job, export_func)
+        logger.info(f"Queued export job {job.job_id} ({active + 1} active)")
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        self._expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def resume(self, job_id: str) -> Optional[ExportJob]:
+        """
+        Queue a failed job again; it continues from its last checkpoint
+
+        Returns:
+            The queued job, or None when the job is unknown, not failed, or its input is gone
+
+        Raises:
+            ExportQueueFull: when ``max_workers + max_queued`` jobs are already active
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            export_func = self._export_funcs.get(job_id)
+            if job is None or export_func is None or job.status != 'failed':
+                return None
+            if not os.path.exists(self._path(job_id, '.html')):
+                return None
+            active = sum(1 for other in self._jobs.values() if other.active)
+            if active >= self.max_workers + self.max_queued:
+                raise ExportQueueFull(f"{active} exports are already queued or running")
+            job.status = 'queued'
+            job.message = ''
+            job.finished_at = None
+
+        self._save_state(job)
+        self._executor.submit(self._run, job, export_func)
+        logger.info(f"Resuming export job {job_id}")
+        return job
+
+    def recover(self, export_func: Callable) -> List[ExportJob]:
+        """
+        Reload jobs saved in ``export_dir`` by an earlier process
+
+        Jobs that were queued or running when that process stopped are queued again
+        with ``export_func`` and continue from their checkpoints, unless another process
+        holds their lock; finished jobs can be polled and downloaded again until they expire.
+
+        Returns:
+            The jobs queued again
+        """
+        if not os.path.isdir(self.export_dir):
+            return []
+
+        requeued = []
+        for name in sorted(os.listdir(self.export_dir)):
+            if not (name.startswith('job_') and name.endswith('.state.json')):
+                continue
+            try:
+                with open(os.path.join(self.export_dir, name), 'r', encoding='utf-8') as f:
+                    job = ExportJob(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Could not reload export job from {name}: {str(e)}")
+                continue
+
+            if job.active:
+                # Another process recovering the same directory may already run it
+                lock = self._lock_job(job.job_id)
+                if lock is None:
+                    logger.info(f"Export job {job.job_id} is running in another process")
+                    continue
+                lock.close()
+
+            with self._lock:
+                if job.job_id in self._jobs:
+                    continue
+                self._jobs[job.job_id] = job
+                self._export_funcs[job.job_id] = export_func
+                if job.active:
+                    job.status = 'queued'
+                    requeued.append(job)
+
+        for job in requeued:
+            self._executor.submit(self._run, job, export_func)
+            logger.info(f"Recovered interrupted export job {job.job_id}")
+        self._expire()
+        return requeued
+
+    def _run(self, job: ExportJob, export_func: Callable):
+        lock = self._lock_job(job.job_id)
+        if lock is None:
+            logger.warning(f"Export job {job.job_id} is already running in another process, not starting it")
+            return
+        with lock:
+            self._run_locked(job, export_func)
+
+    def _run_locked(self, job: ExportJob, export_func: Callable):
+        job.status = 'running'
+        job.started_at = time.time()
+        job.rows_processed = 0
+        job.resumed_rows = 0
+        output_path = self._path(job.job_id, '.csv')
+        checkpoint_path = self._path(job.job_id, '.checkpoint.json')
+        resuming = os.path.exists(checkpoint_path)
+        self._save_state(job)
+
+        def progress_callback(rows: int):
+            if resuming and not job.rows_processed:
+                # A resumed export first reports where its checkpoint left off
+                job.resumed_rows = rows
+            job.rows_processed = rows
+
+        try:
+            with open(self._path(job.job_id, '.html'), 'r', encoding='utf-8') as f:
+                document = f.read()
+            with open(self._path(job.job_id, '.args.json'), 'r', encoding='utf-8') as f:
+                args = json.load(f)
+            file_path, download_name, record_count = export_func(
+                document, *args, output_path=output_path, progress_callback=progress_callback,
+                checkpoint_path=checkpoint_path
+            )
+            document = None
+            job.rows_processed = record_count
+            if record_count:
+                job.file_path = file_path
+                job.download_name = download_name
+                job.status = 'done'
+                job.message = f'Exported {record_count} leads'
+            else:
+                job.status = 'failed'
+                job.message = 'No data extracted from the provided HTML'
+        except Exception as e:
+            logger.error(f"Export job {job.job_id} failed: {str(e)}")
+            job.status = 'failed'
+            job.message = f'CSV export error: {str(e)}'
+        finally:
+            job.finished_at = time.time()
+            self._save_state(job)
+            if job.status == 'done':
+                self._remove_files(job.job_id, ('.html', '.args.json', '.checkpoint.json', '.checkpoint.json.keys'))
+            logger.info(f"Export job {job.job_id} {job.status} after {job.finished_at - job.started_at:.1f}s")
+
+    def _lock_job(self, job_id: str) -> Optional[IO]:
+        """
+        Take the exclusive lock on a job's files, held until the returned file is closed
+
+        Returns:
+            The open lock file, or None when another process holds the lock
+        """
+        os.makedirs(self.export_dir, exist_ok=True)
+        lock = open(self._path(job_id, '.lock'), 'a')
+        if fcntl is None:
+            return lock
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.export_dir, f"job_{job_id}{suffix}")
+
+    def _save_state(self, job: ExportJob):
+        """Write the job's state next to its files, replacing the previous one atomically"""
+        state_path = self._path(job.job_id, '.state.json')
+        try:
+            with open(f"{state_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(asdict(job), f)
+            os.replace(f"{state_path}.tmp", state_path)
+        except OSError as e:
+            logger.warning(f"Could not save state of export job {job.job_id}: {str(e)}")
+
+    def _remove_files(self, job_id: str, suffixes=('.html', '.args.json', '.checkpoint.json', '.checkpoint.json.keys',
+                                                   '.csv', '.state.json', '.lock')):
+        for suffix in suffixes:
+            path = self._path(job_id, suffix)
+            if os.path.exists(path):
+                try:
+                    os.unlink(path)
+                except OSError as e:
+                    logger.warning(f"Could not remove export file {path}: {str(e)}")
+
+    def _expire(self):
+        """Forget finished jobs older than the TTL and delete their files"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job for job in self._jobs.values() if not job.active and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.job_id]
+                self._export_funcs.pop(job.job_id, None)
+        for job in expired:
+            self._remove_files(job.job_id)
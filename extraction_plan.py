@@ -0,0 +1,155 @@
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from parser_engine import UnsupportedSelector
+
+logger = logging.getLogger(__name__)
+
+
+class FieldPlan(NamedTuple):
+    """Everything needed to extract one field, resolved ahead of time"""
+    name: str
+    selector: str
+    compiled: Any
+    attribute: str
+    read: Callable[[Any], Any]
+    clean: Callable[[Any], Optional[str]]
+
+
+@dataclass(frozen=True)
+class ExtractionPlan:
+    """Immutable, engine-specific extraction plan compiled from a field mapping"""
+    key: str
+    engine: Any
+    fields: Tuple[FieldPlan, ...]
+    container_selector: Optional[str] = None
+    container: Any = None
+    # Compiled field selectors in field order, matched together in one walk
+    selectors: Tuple[Any, ...] = ()
+    matcher: Any = None
+
+
+def mapping_key(field_mappings: Dict, engine_name: str, profile: str, container_selector: Optional[str] = None) -> str:
+    """Stable hash of a field mapping together with the container selector, engine and cleaner profile"""
+    # Fields are kept as a list of pairs: their order is the order of the plan's fields and of the lead's keys
+    payload = json.dumps(
+        {'mappings': list(field_mappings.items()), 'container': container_selector, 'engine': engine_name,
+         'profile': profile},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def compile_plan(field_mappings: Dict, engine, cleaner: Callable, profile: str,
+                 container_selector: Optional[str] = None) -> ExtractionPlan:
+    """
+    Compile field mappings into an extraction plan
+
+    Args:
+        field_mappings: Dictionary mapping field names to CSS selectors or
+            ``{'selector': ..., 'attribute': ...}`` configs
+        engine: Parser engine the selectors are compiled for
+        cleaner: ``cleaner(value, field_type)`` used to clean extracted values
+        profile: Name identifying the cleaner, part of the cache key
+        container_selector: Optional selector for lead containers
+
+    Returns:
+        ExtractionPlan with pre-parsed selectors and bound accessors
+    """
+    fields = []
+    for field_name, selector_config in field_mappings.items():
+        if isinstance(selector_config, str):
+            # Simple CSS selector
+            selector = selector_config
+            attribute = 'text'
+        elif isinstance(selector_config, dict):
+            # Advanced configuration
+            selector = selector_config.get('selector', '')
+            attribute = selector_config.get('attribute', 'text')
+        else:
+            continue
+
+        if not selector:
+            continue
+
+        try:
+            compiled = engine.compile(selector)
+        except UnsupportedSelector:
+            raise
+        except Exception as e:
+            logger.debug(f"Skipping field {field_name}, invalid selector {selector}: {str(e)}")
+            continue
+
+        if attribute == 'text':
+            read = engine.text
+        elif attribute == 'html':
+            read = engine.outer_html
+        else:
+            read = partial(engine.attribute, name=attribute)
+
+        fields.append(FieldPlan(
+            name=field_name,
+            selector=selector,
+            compiled=compiled,
+            attribute=attribute,
+            read=read,
+            clean=partial(cleaner, field_type=field_name)
+        ))
+
+    return ExtractionPlan(
+        key=mapping_key(field_mappings, engine.name, profile, container_selector),
+        engine=engine,
+        fields=tuple(fields),
+        selectors=tuple(field.compiled for field in fields),
+        matcher=engine.field_matcher([field.compiled for field in fields]),
+        container_selector=container_selector,
+        container=engine.compile(container_selector) if container_selector else None
+    )
+
+
+class ExtractionPlanCache:
+    """Thread-safe LRU cache of compiled extraction plans"""
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_plan(self, field_mappings: Dict, engine, cleaner: Callable, profile: str,
+                 container_selector: Optional[str] = None) -> ExtractionPlan:
+        """Return the cached plan for a mapping, compiling it on first use"""
+        key = mapping_key(field_mappings, engine.name, profile, container_selector)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+
+        plan = compile_plan(field_mappings, engine, cleaner, profile, container_selector)
+
+        with self._lock:
+            self.misses += 1
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared across requests so repeated extractions with the same profile skip setup
+plan_cache = ExtractionPlanCache()
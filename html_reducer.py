@@ -0,0 +1,215 @@
+import re
+import time
+import logging
+from typing import Dict, Tuple
+
+from css_selectors import UnsupportedSelector, parse_selector
+
+logger = logging.getLogger(__name__)
+
+# Elements whose content is raw text to the parser and never reaches extracted values
+_RAW_TEXT_ELEMENTS = ('script', 'style')
+
+# A start or end tag up to its real ``>``, read the way the HTML tokenizer reads it:
+# quotes delimit attribute values only right after ``=``, so a ``>``, ``<!--`` or
+# ``<script>`` inside a quoted value belongs to the tag
+_TAG_BODY = r'/?[a-zA-Z][^\s/>]*+(?:[^>=]|=\s*+(?:"[^"]*+"|\'[^\']*+\'|[^\s>]*+))*+>'
+_TAG = re.compile('<' + _TAG_BODY)
+_TAG_NAME = re.compile(r'<(/?)([a-zA-Z][^\s/>]*)')
+
+_CLOSE_TAGS = {
+    name: re.compile(r'</%s(?=[\s/>])' % name, re.I) for name in _RAW_TEXT_ELEMENTS
+}
+
+# Type selectors naming these elements, at the start of a compound (for selectors
+# outside the subset ``css_selectors`` parses)
+_RAW_TEXT_TYPE = re.compile(r'(?:^|[\s>+~,(])(?:script|style)(?![\w-])', re.I)
+
+
+class HTMLReducer:
+    """
+    Strips regions no field mapping can target before the page is parsed
+
+    The content of ``<script>`` and ``<style>`` elements and of comments is dropped
+    in one forward scan, which reads tags as the HTML tokenizer does, so openers
+    inside quoted attribute values are left alone. The tags themselves are kept (comments become ``<!---->``),
+    so element positions, sibling selectors and text boundaries are unchanged and
+    extraction results stay identical. ``<svg>`` content and the ``<head>`` can also
+    be dropped; those may hold text, so they are opt-in.
+    """
+
+    def __init__(self, strip_svg: bool = False, trim_head: bool = False):
+        self.strip_svg = strip_svg
+        self.trim_head = trim_head
+        names = list(_RAW_TEXT_ELEMENTS)
+        if strip_svg:
+            names.append('svg')
+        if trim_head:
+            names.append('head')
+        # Text and tags that hold nothing to drop, skipped in one match; it stops at
+        # the next comment or region opener outside any tag, or at the end
+        self._skip = re.compile(
+            r'(?:[^<]++|<(?!!--|(?:%s)(?=[\s/>]))(?:%s)?+)*+' % ('|'.join(names), _TAG_BODY), re.I
+        )
+
+    def reduce(self, html_content: str) -> Tuple[str, Dict]:
+        """
+        Remove script, style and comment content (plus svg/head when enabled)
+
+        Args:
+            html_content: HTML content of the CRM page
+
+        Returns:
+            Tuple of (reduced HTML, stats with original/reduced size and characters
+            removed per region type, plus elapsed seconds)
+        """
+        start_time = time.perf_counter()
+        removed = {'comment': 0, 'script': 0, 'style': 0, 'svg': 0, 'head': 0}
+        pieces = []
+        position = 0
+        search_from = 0
+        skip = self._skip
+
+        while True:
+            start = skip.match(html_content, search_from).end()
+            if start == len(html_content):
+                break
+
+            if html_content.startswith('<!--', start):
+                # Comment: keep an empty one so neighbouring text nodes stay separate
+                end = html_content.find('-->', start + 4)
+                if end < 0:
+                    break
+                pieces.append(html_content[position:start])
+                pieces.append('<!---->')
+                removed['comment'] += end + 3 - start - len('<!---->')
+                position = search_from = end + 3
+                continue
+
+            tag = _TAG.match(html_content, start)
+            if not tag:
+                # Never closed; leave the rest as it is
+                break
+            name = _TAG_NAME.match(tag.group(0)).group(2).lower()
+            if tag.group(0).endswith('/>'):
+                # Self-closing (svg), nothing inside to drop
+                search_from = tag.end()
+                continue
+
+            close_start = self._find_close(html_content, name, tag.end())
+            if close_start < 0:
+                break
+            # Keep the opening and closing tags, drop only what is between them
+            pieces.append(html_content[position:tag.end()])
+            removed[name] += close_start - tag.end()
+            position = search_from = close_start
+
+        if not pieces:
+            reduced = html_content
+        else:
+            pieces.append(html_content[position:])
+            reduced = ''.join(pieces)
+
+        stats = {
+            'original_chars': len(html_content),
+            'reduced_chars': len(reduced),
+            'removed_chars': len(html_content) - len(reduced),
+            'removed_by_type': removed,
+            'seconds': round(time.perf_counter() - start_time, 4)
+        }
+        return reduced, stats
+
+    def _find_close(self, html_content: str, name: str, start: int) -> int:
+        """Offset of the tag closing ``name``, or -1 when it is never closed"""
+        if name in _CLOSE_TAGS:
+            # Raw text: the first end tag closes it, whatever precedes it
+            close = _CLOSE_TAGS[name].search(html_content, start)
+            return close.start() if close else -1
+
+        # svg and head hold markup, so their end tag is found tag by tag (svg may nest)
+        depth = 1
+        position = start
+        while True:
+            position = html_content.find('<', position)
+            if position < 0:
+                return -1
+            if html_content.startswith('<!--', position):
+                end = html_content.find('-->', position + 4)
+                if end < 0:
+                    return -1
+                position = end + 3
+                continue
+            tag = _TAG.match(html_content, position)
+            if not tag:
+                position += 1
+                continue
+            closing, tag_name = _TAG_NAME.match(tag.group(0)).groups()
+            tag_name = tag_name.lower()
+            if tag_name == name:
+                if closing:
+                    depth -= 1
+                    if not depth:
+                        return position
+                elif not tag.group(0).endswith('/>'):
+                    depth += 1
+            elif name == 'head' and not closing and tag_name in _CLOSE_TAGS:
+                # Raw text inside the head may contain anything, including "</head>"
+                position = self._find_close(html_content, tag_name, tag.end())
+                if position < 0:
+                    return -1
+                continue
+            position = tag.end()
+
+
+def _targets_raw_text(selector: str) -> bool:
+    """Whether a field selector names script or style elements, whose content the reducer drops"""
+    try:
+        return _names_raw_text(parse_selector(selector))
+    except UnsupportedSelector:
+        return bool(_RAW_TEXT_TYPE.search(selector))
+
+
+def _names_raw_text(selectors) -> bool:
+    for selector in selectors:
+        for compound in selector.compounds:
+            if compound.tag in _RAW_TEXT_ELEMENTS:
+                return True
+            if any(pseudo[0] == 'not' and _names_raw_text(pseudo[1]) for pseudo in compound.pseudos):
+                return True
+    return False
+
+
+def reduce_for_extraction(html_content: str, extraction_config: Dict, plan=None) -> str:
+    """
+    Apply the pre-reduction configured in ``extraction_config``
+
+    Enabled unless ``reduce_html`` is False. Skipped when a field reads raw HTML or its
+    selector names script/style elements, since stripped content would show up there.
+    ``strip_svg`` and ``trim_head`` opt into the wider reductions.
+
+    Args:
+        html_content: HTML content of the CRM page
+        extraction_config: Extraction configuration
+        plan: Extraction plan whose fields will be read, if any
+
+    Returns:
+        HTML to parse
+    """
+    if not extraction_config.get('reduce_html', True):
+        return html_content
+    if plan is not None and any(
+        field.attribute == 'html' or _targets_raw_text(field.selector) for field in plan.fields
+    ):
+        return html_content
+
+    reducer = HTMLReducer(
+        strip_svg=extraction_config.get('strip_svg', False),
+        trim_head=extraction_config.get('trim_head', False)
+    )
+    reduced, stats = reducer.reduce(html_content)
+    if stats['removed_chars']:
+        logger.info(
+            f"Pre-reduction removed {stats['removed_chars']} of {stats['original_chars']} characters "
+            f"in {stats['seconds']}s: {stats['removed_by_type']}"
+        )
+    return reduced
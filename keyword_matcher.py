@@ -0,0 +1,137 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """
+    Finds any of a list of keywords in text with one compiled regular expression
+
+    The keywords are matched literally, against lowercased text and ignoring case.
+    They are merged into a trie-shaped pattern, so the regex engine reads each
+    character once however many keywords there are, instead of retrying one
+    pattern per keyword. When several keywords occur, the one listed first is
+    reported, as with searching for each keyword in list order.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = tuple(keywords)
+        # Position in the list of each lowercased keyword; the first listing wins
+        self._priority: Dict[str, int] = {}
+        for position, keyword in enumerate(self.keywords):
+            if keyword:
+                self._priority.setdefault(keyword.lower(), position)
+
+        self._trie = self._build_trie(self._priority)
+        self._alphabet = {char for keyword in self._priority for char in keyword}
+        self._char_keys: Dict[str, Tuple[str, ...]] = {}
+        pattern = self._trie_pattern(self._trie)
+        if pattern:
+            self._search = re.compile(pattern, re.IGNORECASE).search
+            # Every position where some keyword starts, with the longest keyword there
+            self._scan = re.compile(f'(?=({pattern}))', re.IGNORECASE).finditer
+            # Once lowercased, ASCII text can only match ASCII keywords exactly, which is cheaper
+            self._ascii = all(keyword.isascii() for keyword in self._priority)
+            if self._ascii:
+                self._search_ascii = re.compile(pattern).search
+                self._scan_ascii = re.compile(f'(?=({pattern}))').finditer
+        else:
+            self._search = self._scan = None
+
+    def first_keyword(self, texts: Iterable[str]) -> Optional[str]:
+        """
+        The earliest-listed keyword occurring in any of the texts
+
+        Args:
+            texts: Strings to search, each lowercased and scanned on its own
+
+        Returns:
+            The keyword as listed, or None when none occurs
+        """
+        if self._search is None:
+            return None
+
+        matched = []
+        for text in texts:
+            text = text.lower()
+            exact = self._ascii and text.isascii()
+            if (self._search_ascii if exact else self._search)(text):
+                matched.append((text, exact))
+        if not matched:
+            return None
+
+        best = len(self.keywords)
+        for text, exact in matched:
+            if exact:
+                for found in self._scan_ascii(text):
+                    best = min(best, self._best_exact_prefix(found.group(1)))
+            else:
+                for found in self._scan(text):
+                    best = min(best, self._best_prefix(found.group(1)))
+            if best == 0:
+                break
+        return self.keywords[best]
+
+    def _best_exact_prefix(self, longest: str) -> int:
+        """``_best_prefix`` for text matched exactly, where prefixes are plain lookups"""
+        best = len(self.keywords)
+        priority = self._priority
+        for end in range(1, len(longest) + 1):
+            position = priority.get(longest[:end])
+            if position is not None and position < best:
+                best = position
+        return best
+
+    def _best_prefix(self, longest: str) -> int:
+        """Highest-priority keyword among ``longest`` and its prefixes; all of them match there"""
+        best = len(self.keywords)
+        # Walk the trie as the regex does; a character may match more than one key ignoring case
+        frontier = [(self._trie, '')]
+        for char in longest:
+            frontier = [(node[key], path + key) for node, path in frontier
+                        for key in self._equivalents(char) if key in node]
+            for node, path in frontier:
+                if '' in node and self._priority[path] < best:
+                    best = self._priority[path]
+        return best
+
+    def _equivalents(self, char: str) -> Tuple[str, ...]:
+        """Keyword characters that ``char`` matches ignoring case"""
+        keys = self._char_keys.get(char)
+        if keys is None:
+            keys = tuple(key for key in self._alphabet
+                         if key == char or re.fullmatch(re.escape(key), char, re.IGNORECASE))
+            self._char_keys[char] = keys
+        return keys
+
+    @staticmethod
+    def _build_trie(keywords: Iterable[str]) -> Dict:
+        trie: Dict = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            # Empty key marks the end of a keyword
+            node[''] = {}
+        return trie
+
+    @classmethod
+    def _trie_pattern(cls, node: Dict) -> str:
+        """Regex for a trie node; greedy, so it matches the longest keyword at a position"""
+        branches = [re.escape(char) + cls._trie_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if '' in node:
+            return f'(?:{body})?'
+        return body
+
+
+@lru_cache(maxsize=16)
+def compile_keywords(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Shared matcher for a keyword list, compiled once per distinct list"""
+    logger.info(f"Compiling keyword matcher for {len(keywords)} keywords")
+    return KeywordMatcher(keywords)
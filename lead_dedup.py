@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'delivered_leads.db')
+
+# Keys per history lookup, below SQLite's limit on bound parameters
+HISTORY_QUERY_SIZE = 500
+
+NO_KEY = -1
+
+_KEY_BYTES = 8
+
+
+def lead_keys(numbers: np.ndarray, emails: Optional[Sequence[Optional[str]]] = None) -> np.ndarray:
+    """
+    Deduplication keys of leads, from their normalized phone numbers and optional emails
+
+    A lead without an email is keyed by its 10-digit number; with one, by a 64-bit
+    BLAKE2b hash of the number and the lowercased email, so the keys are the same
+    in every process and can be stored.
+
+    Args:
+        numbers: int64 normalized numbers (see ``LeadScrubber.classify_phones``), -1 for none
+        emails: Email of each lead, or None to key on the phone alone
+
+    Returns:
+        int64 array of keys, ``NO_KEY`` for leads without a number (never duplicates)
+    """
+    keys = numbers.astype(np.int64, copy=True)
+    keys[keys < 0] = NO_KEY
+    if emails is None:
+        return keys
+
+    for i, email in enumerate(emails):
+        if keys[i] == NO_KEY or not email or not isinstance(email, str):
+            continue
+        email = email.strip().lower()
+        if email:
+            digest = hashlib.blake2b(f"{keys[i]}|{email}".encode('utf-8'), digest_size=_KEY_BYTES).digest()
+            # Clear the top bit so keys stay non-negative, like phone numbers
+            keys[i] = int.from_bytes(digest, 'big') >> 1
+    return keys
+
+
+class DeliveryHistory:
+    """
+    Keys of every lead delivered by earlier exports, in an SQLite table
+
+    The keys are the table's primary key, so a lookup is one B-tree search on disk
+    and the history can grow without being loaded into memory. Each thread gets
+    its own connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS delivered (key INTEGER PRIMARY KEY) WITHOUT ROWID')
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def delivered(self, keys: Sequence[int]) -> Set[int]:
+        """The given keys that an earlier export delivered"""
+        found = set()
+        connection = self._connection()
+        for start in range(0, len(keys), HISTORY_QUERY_SIZE):
+            chunk = keys[start:start + HISTORY_QUERY_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(key for key, in connection.execute(
+                f'SELECT key FROM delivered WHERE key IN ({placeholders})', chunk))
+        return found
+
+    def record(self, keys: Iterable[int]):
+        """Add delivered keys, in one transaction"""
+        with self._connection() as connection:
+            connection.executemany('INSERT OR IGNORE INTO delivered (key) VALUES (?)', ((key,) for key in keys))
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM delivered').fetchone()[0]
+
+
+class LeadDeduplicator:
+    """
+    Drops leads repeated within one export, and optionally leads earlier exports delivered
+
+    Keys of the leads kept so far are held in a set for the whole export. With a
+    ``DeliveryHistory`` they are also checked against it, and added to it by
+    ``commit`` once the export is complete, so an export that fails part way
+    delivers nothing to the history. ``persist``/``restore`` keep the set across a
+    checkpointed restart.
+    """
+
+    def __init__(self, history: Optional[DeliveryHistory] = None, use_email: bool = False,
+                 email_field: str = 'email'):
+        self.history = history
+        self.use_email = use_email
+        self.email_field = email_field
+        self.seen: Set[int] = set()
+        # Keys added since the last ``persist``, in the order they were kept
+        self._unsaved: List[int] = []
+
+    def keys(self, leads: Sequence[dict], numbers: np.ndarray) -> np.ndarray:
+        """Keys of a batch of leads (see ``lead_keys``)"""
+        emails = [lead.get(self.email_field) for lead in leads] if self.use_email else None
+        return lead_keys(numbers, emails)
+
+    def check(self, keys: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """
+        Classify the candidate leads of a batch as new or duplicate, keeping the new ones' keys
+
+        Within the batch the first lead with a key is the one kept.
+
+        Args:
+            keys: Key of every lead in the batch
+            candidates: Boolean mask of the leads still kept by the other checks
+
+        Returns:
+            int8 array per lead: 0 new (or not checked), 1 repeated in this export,
+            2 delivered by an earlier export
+        """
+        verdicts = np.zeros(len(keys), dtype=np.int8)
+        positions = np.flatnonzero(candidates & (keys != NO_KEY))
+        if not len(positions):
+            return verdicts
+
+        batch_keys = keys[positions]
+        _, first = np.unique(batch_keys, return_index=True)
+        repeated = np.ones(len(positions), dtype=bool)
+        repeated[first] = False
+        seen = self.seen
+        repeated |= np.fromiter((key in seen for key in batch_keys.tolist()), dtype=bool, count=len(batch_keys))
+        verdicts[positions[repeated]] = 1
+
+        fresh = positions[~repeated]
+        if self.history is not None and len(fresh):
+            delivered = self.history.delivered(keys[fresh].tolist())
+            if delivered:
+                earlier = np.fromiter((key in delivered for key in keys[fresh].tolist()), dtype=bool, count=len(fresh))
+                verdicts[fresh[earlier]] = 2
+                fresh = fresh[~earlier]
+
+        new_keys = keys[fresh].tolist()
+        seen.update(new_keys)
+        self._unsaved.extend(new_keys)
+        return verdicts
+
+    def commit(self):
+        """Record every key kept by this export as delivered"""
+        if self.history is not None and self.seen:
+            self.history.record(self.seen)
+            logger.info(f"Recorded {len(self.seen):,} delivered leads in {self.history.path}")
+
+    def persist(self, path: str) -> int:
+        """
+        Append the keys kept since the last call to ``path`` and make them durable
+
+        Returns:
+            Size of the file, to store with the checkpoint it belongs to
+        """
+        with open(path, 'ab') as f:
+            f.write(np.asarray(self._unsaved, dtype=np.int64).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        self._unsaved = []
+        return size
+
+    def restore(self, path: str, size: int):
+        """Reload the keys persisted up to ``size`` bytes, dropping any written after that checkpoint"""
+        if not os.path.exists(path):
+            logger.warning(f"No deduplication keys at {path}, earlier leads of this export are not known")
+            return
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+            self.seen.update(np.fromfile(f, dtype=np.int64).tolist())
+        self._unsaved = []
@@ -1,31 +1,94 @@
-import re
 import logging
-from typing import List, Dict, Tuple, Optional
+from itertools import compress
+from typing import Any, List, Dict, Tuple, Optional, Iterable, Generator, Sequence
+
+import numpy as np
+
+from keyword_matcher import KeywordMatcher, compile_keywords
+from lead_dedup import DEFAULT_HISTORY_PATH, NO_KEY, DeliveryHistory, LeadDeduplicator
+from phone_utils import normalize_phone
+from process_pool import PoolUnavailable, SharedStatePool, parallel_workers, shard_ranges
+from npa_nxx_index import DEFAULT_PREFIX_FILE, LANDLINE, TOLL_FREE, VOIP, load_prefix_index
+from suppression_list import DEFAULT_SUPPRESSION_DIR, load_suppression_list
 
 logger = logging.getLogger(__name__)
 
+# Reasons reported by ``LeadScrubber.classify_phones``, indexed by code (0 keeps the lead)
+PHONE_REASONS = (
+    "Valid mobile number",
+    "Empty number",
+    "Invalid format",
+    "Known landline prefix",
+    "Toll-free number",
+    "VOIP area code"
+)
+PHONE_VALID, PHONE_EMPTY, PHONE_INVALID, PHONE_LANDLINE, PHONE_TOLL_FREE, PHONE_VOIP = range(len(PHONE_REASONS))
+
+SUPPRESSED_REASON = "Suppression: Number on suppression list"
+
+# Reasons by ``LeadDeduplicator.check`` verdict
+DUPLICATE_REASONS = {1: "Duplicate: Repeated lead", 2: "Duplicate: Delivered in an earlier export"}
+
+# Phone numbers classified per vectorised pass, bounding the temporary arrays
+CLASSIFY_CHUNK_SIZE = 1 << 20
+
+# Below this many leads, forking workers costs more than it saves
+PARALLEL_THRESHOLD = 100000
+
+# Shards per worker, so a shard heavy in litigation checks does not hold up the others
+SHARDS_PER_WORKER = 4
+
+_ASCII_ZERO, _ASCII_NINE, _ASCII_X, _ASCII_UPPER_X = b'09xX'
+
+
+def _scrub_shard(shared, bounds):
+    """
+    Worker entry point: scrub one index range of the leads inherited from the parent
+
+    Only the outcome crosses back: which leads are kept, the shard's stats, the first
+    position of each filter reason and, when deduplicating, the kept leads' keys.
+    """
+    scrubber, leads, scrub_config, deduplicator = shared
+    start, end = bounds
+    shard = leads[start:end]
+    stats = scrubber.new_stats()
+    rejected = []
+    scrubber.scrub_batch(shard, scrub_config, stats, rejected)
+
+    keep = np.ones(len(shard), dtype=bool)
+    first_seen = {}
+    for position, filter_reason in rejected:
+        keep[position] = False
+        first_seen.setdefault(filter_reason, start + position)
+
+    keys = None
+    if deduplicator is not None:
+        kept = np.flatnonzero(keep)
+        kept_leads = [shard[i] for i in kept]
+        phone_field = scrub_config.get('phone_field', 'number')
+        _, numbers = scrubber.classify_phones([lead.get(phone_field) for lead in kept_leads], return_numbers=True)
+        keys = np.full(len(shard), NO_KEY, dtype=np.int64)
+        keys[kept] = deduplicator.keys(kept_leads, numbers)
+    return keep, stats, first_seen, keys
+
+
 class LeadScrubber:
     """Lead scrubbing service to filter out landlines, toll-free, and VOIP numbers"""
     
-    def __init__(self):
-        # Known landline prefixes (NPA-NXX format)
-        self.LANDLINE_PREFIXES = {
-            "205-222", "205-333", "212-222", "305-222", "407-222", "415-222", "713-222", 
-            "312-222", "404-222", "503-222", "602-222", "702-222", "818-222", "919-222",
-            "646-346", "718-455", "718-599", "914-220", "310-454", "212-555", "917-324", "516-466",
-            "847-555", "630-620", "773-522", "312-698", "708-682", "815-759", "847-329",
-            "203-234", "315-448", "518-474", "570-387", "631-444", "716-848", "718-422", "845-334",
-            "860-486", "914-255", "978-658", "212-970", "214-220", "312-906", "512-465", "713-465",
-            "972-465", "202-785", "305-810", "407-814", "504-861", "602-627", "702-486", "808-586"
-        }
+    def __init__(self, prefix_file: Optional[str] = None, suppression_dir: Optional[str] = None,
+                 history_path: Optional[str] = None):
+        # Landline, toll-free and VOIP classification of every NPA-NXX prefix, shared by all instances
+        self.prefix_index = load_prefix_index(prefix_file or DEFAULT_PREFIX_FILE)
         
-        # Toll-free prefixes
-        self.TOLL_FREE_PREFIXES = {"800", "888", "877", "866", "855", "844", "833", "822"}
+        # Numbers on the internal do-not-call lists, shared by all instances
+        self.suppression_list = load_suppression_list(suppression_dir or DEFAULT_SUPPRESSION_DIR)
         
-        # Common VOIP area codes
-        self.VOIP_AREA_CODES = {"347", "646", "650", "678", "702", "704", "716", "818", "919"}
+        # Leads delivered by earlier exports, opened on first use
+        self.history_path = history_path or DEFAULT_HISTORY_PATH
+        self._history = None
         
-        # Litigation/spam patterns to filter out
+        # Litigation/spam keywords to filter out (matched literally, ignoring case);
+        # scrub_config['litigation_keywords'] replaces them per request
         self.LITIGATION_PATTERNS = [
             r'legal',
             r'litigation',
@@ -47,20 +110,37 @@ class LeadScrubber:
         """
         if not number or not isinstance(number, str):
             return None, None
-            
-        # Check for extensions (usually landlines)
-        if "x" in number.lower() or "ext" in number.lower():
+        
+        record = normalize_phone(number)
+        # Numbers with extensions are usually landlines
+        if record.has_extension or not record.number:
             return None, None
+        return record.prefix, record.npa
+    
+    def prefix_code(self, number: str) -> Optional[int]:
+        """
+        NPA-NXX prefix of a phone number as the integer ``NPA * 1000 + NXX``
         
-        # Remove all non-numeric characters
-        cleaned = re.sub(r"[^\d]", "", number)
+        Returns:
+            The prefix code, or None for numbers ``clean_phone_number`` rejects
+        """
+        normalized = self.normalized_number(number)
+        return normalized // 10000 if normalized is not None else None
+    
+    def normalized_number(self, number: str) -> Optional[int]:
+        """
+        Phone number as the 10-digit integer ``NPA NXX XXXX``, without the country code
         
-        if len(cleaned) == 10:  # Standard US number
-            return f"{cleaned[:3]}-{cleaned[3:6]}", cleaned[:3]
-        elif len(cleaned) == 11 and cleaned.startswith("1"):  # US number with country code
-            return f"{cleaned[1:4]}-{cleaned[4:7]}", cleaned[1:4]
+        Returns:
+            The number, or None for numbers ``clean_phone_number`` rejects
+        """
+        if not number or not isinstance(number, str):
+            return None
         
-        return None, None
+        record = normalize_phone(number)
+        if record.has_extension or not record.number:
+            return None
+        return int(record.number)
     
     def is_landline_or_unwanted(self, phone_number: str) -> Tuple[bool, str]:
         """
@@ -72,49 +152,167 @@ class LeadScrubber:
         if not phone_number:
             return True, "Empty number"
             
-        prefix, area_code = self.clean_phone_number(phone_number)
+        code = self.prefix_code(phone_number)
         
-        if not prefix or not area_code:
+        if code is None:
             return True, "Invalid format"
         
+        flags = self.prefix_index.lookup(code)
+        
         # Check landline prefixes
-        if prefix in self.LANDLINE_PREFIXES:
+        if flags & LANDLINE:
             return True, "Known landline prefix"
         
         # Check toll-free numbers
-        if area_code in self.TOLL_FREE_PREFIXES:
+        if flags & TOLL_FREE:
             return True, "Toll-free number"
         
         # Check VOIP area codes
-        if area_code in self.VOIP_AREA_CODES:
+        if flags & VOIP:
             return True, "VOIP area code"
         
         return False, "Valid mobile number"
     
-    def check_litigation_risk(self, lead_data: Dict) -> Tuple[bool, str]:
+    def classify_phones(self, phones: Sequence[Any], return_numbers: bool = False):
+        """
+        Classify many phone numbers at once, with the same outcome as ``is_landline_or_unwanted``
+        
+        ASCII numbers are handled as one byte buffer per chunk: digits are counted and
+        extracted, the 10/11-digit rule applied and NPA/NXX assembled with array
+        operations, and the prefix index read for all of them at once. Numbers with
+        non-ASCII characters (which may hold Unicode digits) go through
+        ``is_landline_or_unwanted``.
+        
+        Args:
+            phones: pandas Series, NumPy array or sequence of phone numbers
+            return_numbers: Also return the numbers normalized as by ``normalized_number``
+        
+        Returns:
+            int8 array of ``PHONE_REASONS`` codes, one per number; with ``return_numbers``,
+            a tuple of it and an int64 array of the numbers, -1 where there is none
+        """
+        values = phones.tolist() if hasattr(phones, 'tolist') else list(phones)
+        codes = np.empty(len(values), dtype=np.int8)
+        numbers = np.empty(len(values), dtype=np.int64)
+        for start in range(0, len(values), CLASSIFY_CHUNK_SIZE):
+            chunk = values[start:start + CLASSIFY_CHUNK_SIZE]
+            codes[start:start + len(chunk)], numbers[start:start + len(chunk)] = self._classify_chunk(chunk)
+        return (codes, numbers) if return_numbers else codes
+    
+    def _classify_chunk(self, values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(values)
+        codes = np.full(count, PHONE_INVALID, dtype=np.int8)
+        numbers = np.full(count, -1, dtype=np.int64)
+        
+        # Anything the byte path cannot judge is set aside and classified one by one
+        try:
+            joined = ''.join(values)
+            texts = values
+            special = []
+        except TypeError:
+            texts = [value if isinstance(value, str) else '' for value in values]
+            joined = ''.join(texts)
+            special = [i for i, value in enumerate(values) if not isinstance(value, str)]
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=count)
+        if not joined.isascii():
+            non_ascii = [i for i, text in enumerate(texts) if not text.isascii()]
+            texts = [text if text.isascii() else '' for text in texts]
+            special += non_ascii
+            lengths[non_ascii] = 0
+            joined = ''.join(texts)
+        
+        # A trailing NUL keeps every offset, even of empty numbers at the end, inside the buffer
+        buffer = np.frombuffer((joined + '\0').encode('ascii'), dtype=np.uint8)
+        starts = np.cumsum(lengths) - lengths
+        nonempty = lengths > 0
+        codes[~nonempty] = PHONE_EMPTY
+        
+        if nonempty.any():
+            # Per-number counts via reduceat; empty numbers are masked out afterwards
+            is_digit = (buffer >= _ASCII_ZERO) & (buffer <= _ASCII_NINE)
+            digit_count = np.where(nonempty, np.add.reduceat(is_digit, starts, dtype=np.int32), 0)
+            has_x = nonempty & (np.add.reduceat((buffer == _ASCII_X) | (buffer == _ASCII_UPPER_X),
+                                                starts, dtype=np.int32) > 0)
+            
+            digits = buffer[is_digit] - _ASCII_ZERO
+            digit_offsets = np.cumsum(digit_count) - digit_count
+            candidates = ~has_x & ((digit_count == 10) | (digit_count == 11))
+            first = digits[np.minimum(digit_offsets, max(len(digits) - 1, 0))] if len(digits) else 0
+            # 11 digits only with the US country code in front
+            valid = candidates & ((digit_count == 10) | (first == 1))
+            
+            begin = digit_offsets[valid] + (digit_count[valid] == 11)
+            valid_numbers = np.zeros(len(begin), dtype=np.int64)
+            for i in range(10):
+                valid_numbers = valid_numbers * 10 + digits[begin + i]
+            numbers[valid] = valid_numbers
+            flags = self.prefix_index.lookup_codes(valid_numbers // 10000)
+            codes[valid] = np.select(
+                [(flags & LANDLINE) != 0, (flags & TOLL_FREE) != 0, (flags & VOIP) != 0],
+                [PHONE_LANDLINE, PHONE_TOLL_FREE, PHONE_VOIP],
+                PHONE_VALID
+            )
+        
+        for i in special:
+            codes[i] = PHONE_REASONS.index(self.is_landline_or_unwanted(values[i])[1])
+            normalized = self.normalized_number(values[i])
+            numbers[i] = normalized if normalized is not None else -1
+        return codes, numbers
+    
+    def litigation_matcher(self, keywords: Optional[Sequence[str]] = None) -> KeywordMatcher:
+        """Compiled matcher for ``keywords``, or for ``LITIGATION_PATTERNS`` when none are given"""
+        return compile_keywords(tuple(keywords if keywords is not None else self.LITIGATION_PATTERNS))
+    
+    def check_litigation_risk(self, lead_data: Dict, matcher: Optional[KeywordMatcher] = None) -> Tuple[bool, str]:
         """
         Check if lead data contains litigation-related keywords
         
+        Each text value is scanned once for all keywords; when several occur, the
+        one listed first is reported.
+        
+        Args:
+            lead_data: Lead dictionary
+            matcher: Keyword matcher to use instead of the default keywords
+        
         Returns:
             Tuple of (is_risky, reason)
         """
-        # Convert all values to lowercase string for checking
-        text_content = ""
-        for key, value in lead_data.items():
-            if value and isinstance(value, str):
-                text_content += f" {value.lower()}"
+        matcher = matcher or self.litigation_matcher()
+        keyword = matcher.first_keyword(value for value in lead_data.values() if value and isinstance(value, str))
         
-        # Check for litigation patterns
-        for pattern in self.LITIGATION_PATTERNS:
-            if re.search(pattern, text_content, re.IGNORECASE):
-                return True, f"Contains litigation keyword: {pattern}"
+        if keyword is not None:
+            return True, f"Contains litigation keyword: {keyword}"
         
         return False, "No litigation risk detected"
     
+    def deduplicator(self, scrub_config: Dict = None) -> Optional[LeadDeduplicator]:
+        """
+        Deduplicator for one export, or None when ``scrub_config`` does not enable it
+        
+        ``dedupe`` drops leads whose normalized phone number (plus their email, with
+        ``dedupe_email``) was already kept in the export; ``dedupe_history`` also drops
+        leads delivered by earlier exports.
+        """
+        scrub_config = scrub_config or {}
+        if not scrub_config.get('dedupe', False):
+            return None
+        history = None
+        if scrub_config.get('dedupe_history', False):
+            if self._history is None:
+                self._history = DeliveryHistory(self.history_path)
+            history = self._history
+        return LeadDeduplicator(history, scrub_config.get('dedupe_email', False),
+                                scrub_config.get('email_field', 'email'))
+    
     def scrub_leads(self, leads: List[Dict], scrub_config: Dict = None) -> Dict:
         """
         Scrub leads based on phone number quality and litigation risk
         
+        With ``scrub_config['parallel']`` and at least ``parallel_threshold`` leads
+        (default ``PARALLEL_THRESHOLD``), the leads are split into contiguous shards
+        scrubbed by ``workers`` forked processes (default: CPU count); the results are
+        the same as a serial scrub.
+        
         Args:
             leads: List of lead dictionaries
             scrub_config: Configuration for scrubbing options
@@ -122,63 +320,252 @@ class LeadScrubber:
         Returns:
             Dictionary with scrubbing results
         """
+        logger.info(f"Starting lead scrubbing for {len(leads)} leads")
+        
+        filtered_stats = self.new_stats()
+        deduplicator = self.deduplicator(scrub_config)
+        workers = parallel_workers(scrub_config or {}, len(leads), PARALLEL_THRESHOLD)
+        clean_leads = None
+        if workers:
+            logger.info(f"Scrubbing {len(leads)} leads with {workers} workers")
+            clean_leads = self._scrub_parallel(leads, scrub_config, filtered_stats, deduplicator, workers)
+        if clean_leads is None:
+            clean_leads = self.scrub_batch(leads, scrub_config, filtered_stats, deduplicator=deduplicator)
+        if deduplicator:
+            deduplicator.commit()
+        
+        logger.info(f"Lead scrubbing complete: {len(clean_leads)} clean leads from {len(leads)} original")
+        
+        return {
+            'clean_leads': clean_leads,
+            'stats': filtered_stats
+        }
+    
+    def _scrub_parallel(self, leads: List[Dict], scrub_config: Optional[Dict], stats: Dict,
+                        deduplicator: Optional[LeadDeduplicator], workers: int) -> Optional[List[Dict]]:
+        """
+        Scrub leads in shards across forked workers, adding the counts to ``stats``
+        
+        Workers inherit the scrubber's prefix index, suppression list and compiled
+        litigation matcher along with the leads, so only index ranges go out. The
+        shards are merged in order, and deduplication runs here on the merged result,
+        since which repeat of a lead is kept depends on every shard before it.
+        
+        Returns:
+            Clean leads in their original order, or None if the pool could not be used
+            (see ``PoolUnavailable``); errors raised while scrubbing propagate
+        """
+        shard_config = dict(scrub_config or {}, dedupe=False)
+        if shard_config.get('filter_litigation', False):
+            # Compiled before forking, so every worker inherits the same matcher
+            self.litigation_matcher(shard_config.get('litigation_keywords'))
+        
+        ranges = shard_ranges(0, len(leads), workers * SHARDS_PER_WORKER)
+        try:
+            with SharedStatePool((self, leads, shard_config, deduplicator), workers) as pool:
+                results = pool.map(_scrub_shard, ranges)
+        except PoolUnavailable as e:
+            logger.warning(f"Parallel scrubbing unavailable, running serially: {str(e)}")
+            return None
+        
+        merged = self.new_stats()
+        first_seen = {}
+        for _, shard_stats, shard_first_seen, _ in results:
+            self.merge_stats(merged, shard_stats)
+            for filter_reason, position in shard_first_seen.items():
+                first_seen.setdefault(filter_reason, position)
+        keep = np.concatenate([result[0] for result in results])
+        counts = dict(merged['filter_reasons'])
+        
+        if deduplicator:
+            keys = np.concatenate([result[3] for result in results])
+            verdicts = deduplicator.check(keys, keep)
+            merged['clean_count'] -= self._drop_duplicates(verdicts, keep, merged, first_seen, counts)
+        
+        # Reasons in the order of their first lead, as a serial scrub reports them
+        merged['filter_reasons'] = {filter_reason: counts[filter_reason]
+                                    for filter_reason in sorted(first_seen, key=first_seen.get)}
+        self.merge_stats(stats, merged)
+        return list(compress(leads, keep))
+    
+    @staticmethod
+    def _drop_duplicates(verdicts: np.ndarray, keep: np.ndarray, stats: Dict, first_seen: Dict, counts: Dict,
+                         lead_reasons: Optional[Dict] = None) -> int:
+        """Unkeep the leads ``LeadDeduplicator.check`` found duplicate and count them; returns how many"""
+        duplicates = np.flatnonzero(verdicts)
+        keep[duplicates] = False
+        stats['filtered_duplicates'] = stats.get('filtered_duplicates', 0) + len(duplicates)
+        for verdict, filter_reason in DUPLICATE_REASONS.items():
+            positions = np.flatnonzero(verdicts == verdict)
+            if len(positions):
+                first_seen[filter_reason] = positions[0]
+                counts[filter_reason] = len(positions)
+                if lead_reasons is not None:
+                    lead_reasons.update(dict.fromkeys(positions.tolist(), filter_reason))
+        return len(duplicates)
+    
+    def scrub_batches(self, batches: Iterable[List[Dict]], scrub_config: Dict = None,
+                      stats: Dict = None) -> Generator[List[Dict], None, None]:
+        """
+        Scrub a stream of lead batches, yielding the clean leads of each batch
+        
+        Only the current batch is held, so exports of any size scrub in constant
+        memory. Batches left empty by scrubbing are still yielded.
+        
+        Args:
+            batches: Iterable of lead batches, e.g. from ``BatchProcessor.process_large_dataset``
+            scrub_config: Configuration for scrubbing options
+            stats: Statistics to accumulate into (see ``new_stats``); pass one in to read
+                the running totals while the stream is consumed
+        
+        Yields:
+            Clean leads of each batch
+        """
+        stats = stats if stats is not None else self.new_stats()
+        deduplicator = self.deduplicator(scrub_config)
+        for batch in batches:
+            yield self.scrub_batch(batch, scrub_config, stats, deduplicator=deduplicator)
+        
+        if deduplicator:
+            deduplicator.commit()
+        if stats['original_count']:
+            logger.info(f"Lead scrubbing results:\n{self.get_scrubbing_summary(stats)}")
+    
+    def scrub_batch(self, leads: List[Dict], scrub_config: Dict, stats: Dict,
+                    rejected: Optional[List[Tuple[int, str]]] = None,
+                    deduplicator: Optional[LeadDeduplicator] = None) -> List[Dict]:
+        """
+        Scrub one batch of leads, adding its counts to ``stats``
+        
+        Args:
+            leads: List of lead dictionaries
+            scrub_config: Configuration for scrubbing options
+            stats: Statistics updated in place (see ``new_stats``)
+            rejected: If given, ``(position, reason)`` of every filtered lead is appended
+                to it, in batch order
+            deduplicator: Deduplication state of the export the batch belongs to (see
+                ``deduplicator``); without one, a deduplicating config only removes
+                duplicates within the batch
+        
+        Returns:
+            Clean leads of the batch, in their original order
+        """
         scrub_config = scrub_config or {}
         
         filter_landlines = scrub_config.get('filter_landlines', True)
         filter_litigation = scrub_config.get('filter_litigation', False)
+        filter_suppressed = scrub_config.get('filter_suppressed', True) and len(self.suppression_list) > 0
         phone_field = scrub_config.get('phone_field', 'number')
+        if deduplicator is None:
+            deduplicator = self.deduplicator(scrub_config)
         
-        clean_leads = []
-        filtered_stats = {
-            'original_count': len(leads),
-            'filtered_landlines': 0,
-            'filtered_litigation': 0,
-            'clean_count': 0,
-            'filter_reasons': {}
-        }
+        filter_reasons = stats['filter_reasons']
+        stats['original_count'] += len(leads)
+        keep = np.ones(len(leads), dtype=bool)
+        # Reasons seen in this batch, with the position of their first lead and their count,
+        # so they enter the stats in the order the per-lead scrub would add them
+        first_seen = {}
+        counts = {}
+        # Reason of each filtered lead, only tracked when the caller asks for it
+        lead_reasons = {} if rejected is not None else None
         
-        logger.info(f"Starting lead scrubbing for {len(leads)} leads")
+        # Check phone number quality, all numbers of the batch at once
+        if (filter_landlines or filter_suppressed or deduplicator) and leads:
+            codes, numbers = self.classify_phones([lead.get(phone_field) for lead in leads], return_numbers=True)
         
-        for lead in leads:
-            should_filter = False
-            filter_reason = None
+        if filter_landlines and leads:
+            has_phone = np.fromiter((phone_field in lead for lead in leads), dtype=bool, count=len(leads))
+            unwanted = has_phone & (codes != PHONE_VALID)
+            keep &= ~unwanted
             
-            # Check phone number quality
-            if filter_landlines and phone_field in lead:
-                phone_number = lead[phone_field]
-                is_unwanted, phone_reason = self.is_landline_or_unwanted(phone_number)
-                
-                if is_unwanted:
-                    should_filter = True
-                    filter_reason = f"Phone: {phone_reason}"
-                    filtered_stats['filtered_landlines'] += 1
+            positions = np.flatnonzero(unwanted)
+            stats['filtered_landlines'] += len(positions)
+            reason_codes, first_index, reason_counts = np.unique(codes[positions], return_index=True,
+                                                                 return_counts=True)
+            for code, first, reason_count in zip(reason_codes, first_index, reason_counts):
+                filter_reason = f"Phone: {PHONE_REASONS[code]}"
+                first_seen[filter_reason] = positions[first]
+                counts[filter_reason] = int(reason_count)
+            if lead_reasons is not None:
+                for i, code in zip(positions.tolist(), codes[positions].tolist()):
+                    lead_reasons[i] = f"Phone: {PHONE_REASONS[code]}"
+        
+        # Check the remaining numbers against the suppression list
+        if filter_suppressed and leads:
+            suppressed = keep & self.suppression_list.contains(numbers)
+            keep &= ~suppressed
             
-            # Check litigation risk
-            if not should_filter and filter_litigation:
-                is_risky, litigation_reason = self.check_litigation_risk(lead)
+            positions = np.flatnonzero(suppressed)
+            stats['filtered_suppressed'] = stats.get('filtered_suppressed', 0) + len(positions)
+            if len(positions):
+                first_seen[SUPPRESSED_REASON] = positions[0]
+                counts[SUPPRESSED_REASON] = len(positions)
+                if lead_reasons is not None:
+                    lead_reasons.update(dict.fromkeys(positions.tolist(), SUPPRESSED_REASON))
+        
+        # Check litigation risk of the leads that are still kept
+        if filter_litigation:
+            matcher = self.litigation_matcher(scrub_config.get('litigation_keywords'))
+            for i in np.flatnonzero(keep):
+                is_risky, litigation_reason = self.check_litigation_risk(leads[i], matcher)
                 
                 if is_risky:
-                    should_filter = True
+                    keep[i] = False
                     filter_reason = f"Litigation: {litigation_reason}"
-                    filtered_stats['filtered_litigation'] += 1
-            
-            # Add to results
-            if not should_filter:
-                clean_leads.append(lead)
-                filtered_stats['clean_count'] += 1
-            else:
-                # Track filter reasons
-                if filter_reason not in filtered_stats['filter_reasons']:
-                    filtered_stats['filter_reasons'][filter_reason] = 0
-                filtered_stats['filter_reasons'][filter_reason] += 1
+                    first_seen.setdefault(filter_reason, i)
+                    counts[filter_reason] = counts.get(filter_reason, 0) + 1
+                    stats['filtered_litigation'] += 1
+                    if lead_reasons is not None:
+                        lead_reasons[i] = filter_reason
         
-        logger.info(f"Lead scrubbing complete: {len(clean_leads)} clean leads from {len(leads)} original")
+        # Drop leads already kept in this export or delivered by an earlier one
+        if deduplicator and leads:
+            verdicts = deduplicator.check(deduplicator.keys(leads, numbers), keep)
+            self._drop_duplicates(verdicts, keep, stats, first_seen, counts, lead_reasons)
+        
+        # Track filter reasons
+        for filter_reason in sorted(first_seen, key=first_seen.get):
+            filter_reasons[filter_reason] = filter_reasons.get(filter_reason, 0) + counts[filter_reason]
+        
+        if lead_reasons:
+            rejected.extend(sorted(lead_reasons.items()))
         
+        clean_leads = list(compress(leads, keep))
+        stats['clean_count'] += len(clean_leads)
+        return clean_leads
+    
+    @staticmethod
+    def new_stats() -> Dict:
+        """Zeroed scrubbing statistics, in the shape reported by ``scrub_leads``"""
         return {
-            'clean_leads': clean_leads,
-            'stats': filtered_stats
+            'original_count': 0,
+            'filtered_landlines': 0,
+            'filtered_litigation': 0,
+            'filtered_suppressed': 0,
+            'filtered_duplicates': 0,
+            'clean_count': 0,
+            'filter_reasons': {}
         }
     
+    @staticmethod
+    def merge_stats(stats: Dict, other: Dict) -> Dict:
+        """
+        Add the counts of ``other`` to ``stats`` in place
+        
+        Merging the stats of consecutive batches in order keeps the filter reasons
+        in the order a single scrub of all the leads would report them.
+        
+        Returns:
+            ``stats``
+        """
+        for key in ('original_count', 'filtered_landlines', 'filtered_suppressed', 'filtered_litigation',
+                    'filtered_duplicates', 'clean_count'):
+            stats[key] = stats.get(key, 0) + other.get(key, 0)
+        filter_reasons = stats['filter_reasons']
+        for filter_reason, count in other['filter_reasons'].items():
+            filter_reasons[filter_reason] = filter_reasons.get(filter_reason, 0) + count
+        return stats
+    
     def get_scrubbing_summary(self, stats: Dict) -> str:
         """Generate human-readable summary of scrubbing results"""
         summary_parts = []
@@ -188,6 +575,8 @@ class LeadScrubber:
         filtered = original - clean
         
         summary_parts.append(f"Processed {original:,} leads")
+        if not original:
+            return "\n".join(summary_parts)
         summary_parts.append(f"Kept {clean:,} clean leads ({clean/original*100:.1f}%)")
         
         if filtered > 0:
@@ -196,7 +585,13 @@ class LeadScrubber:
             if stats['filtered_landlines'] > 0:
                 summary_parts.append(f"  • {stats['filtered_landlines']:,} landlines/toll-free/VOIP")
             
+            if stats.get('filtered_suppressed', 0) > 0:
+                summary_parts.append(f"  • {stats['filtered_suppressed']:,} on suppression lists")
+            
             if stats['filtered_litigation'] > 0:
                 summary_parts.append(f"  • {stats['filtered_litigation']:,} litigation risks")
+            
+            if stats.get('filtered_duplicates', 0) > 0:
+                summary_parts.append(f"  • {stats['filtered_duplicates']:,} duplicates")
         
         return "\n".join(summary_parts)
\ No newline at end of file
@@ -0,0 +1,151 @@
+import os
+import csv
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# One byte per NPA-NXX prefix, indexed by NPA * 1000 + NXX
+INDEX_SIZE = 1000 * 1000
+
+# Classification bits stored per prefix
+LANDLINE = 1
+TOLL_FREE = 2
+VOIP = 4
+
+PREFIX_TYPES = {'landline': LANDLINE, 'toll_free': TOLL_FREE, 'voip': VOIP}
+
+DEFAULT_PREFIX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'npa_nxx_prefixes.csv')
+
+_loaded: Dict[str, 'NpaNxxIndex'] = {}
+_load_lock = threading.Lock()
+
+
+class NpaNxxIndex:
+    """
+    Classification flags of every NPA-NXX prefix in a flat byte array
+
+    Lookups are plain integer indexing (``NPA * 1000 + NXX``), for one number or a
+    whole array of them. Loaded from a compiled file, the array is a read-only
+    memory map, so every worker process shares the same pages.
+    """
+
+    def __init__(self, flags: np.ndarray, source: Optional[str] = None):
+        if flags.shape != (INDEX_SIZE,):
+            raise ValueError(f"NPA-NXX index must have {INDEX_SIZE} entries, got {flags.shape}")
+        self.flags = flags
+        self.source = source
+        # Indexing a memoryview yields plain ints, much faster than NumPy scalar access
+        self._bytes = memoryview(flags)
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> 'NpaNxxIndex':
+        """
+        Build an in-memory index from a prefix list
+
+        The CSV has ``npa,nxx,type`` columns, ``type`` being one of ``landline``,
+        ``toll_free`` or ``voip``. A blank or ``*`` NXX applies the type to the whole
+        area code. A prefix listed with several types keeps all of them.
+
+        Args:
+            csv_path: Path of the prefix list
+
+        Returns:
+            The index
+        """
+        flags = np.zeros(INDEX_SIZE, dtype=np.uint8)
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                try:
+                    npa = int(row['npa'])
+                    nxx = (row.get('nxx') or '').strip()
+                    bit = PREFIX_TYPES[row['type'].strip().lower()]
+                    if not 0 <= npa <= 999:
+                        raise ValueError(f"NPA {npa} out of range")
+                    if nxx in ('', '*'):
+                        flags[npa * 1000:npa * 1000 + 1000] |= bit
+                    else:
+                        nxx = int(nxx)
+                        if not 0 <= nxx <= 999:
+                            raise ValueError(f"NXX {nxx} out of range")
+                        flags[npa * 1000 + nxx] |= bit
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    logger.warning(f"Skipping line {line_number} of {csv_path}: {str(e)}")
+        return cls(flags, csv_path)
+
+    @classmethod
+    def open(cls, index_path: str) -> 'NpaNxxIndex':
+        """Memory-map a compiled index read-only"""
+        return cls(np.memmap(index_path, dtype=np.uint8, mode='r', shape=(INDEX_SIZE,)), index_path)
+
+    @classmethod
+    def empty(cls) -> 'NpaNxxIndex':
+        """Index with no classified prefixes"""
+        return cls(np.zeros(INDEX_SIZE, dtype=np.uint8))
+
+    def save(self, index_path: str):
+        """Write the flags as a raw byte file, replacing any previous one atomically"""
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(self.flags, dtype=np.uint8).tobytes())
+        os.replace(temp_path, index_path)
+
+    def lookup(self, code: int) -> int:
+        """Classification bits of one ``NPA * 1000 + NXX`` code"""
+        return self._bytes[code]
+
+    def lookup_codes(self, codes: np.ndarray) -> np.ndarray:
+        """Classification bits of an array of ``NPA * 1000 + NXX`` codes"""
+        return self.flags[codes]
+
+    def count(self, bit: int) -> int:
+        """Number of prefixes carrying ``bit``"""
+        return int(np.count_nonzero(self.flags & bit))
+
+
+def load_prefix_index(csv_path: str = DEFAULT_PREFIX_FILE) -> NpaNxxIndex:
+    """
+    Load the NPA-NXX index for a prefix list, compiling it when needed
+
+    The compiled flags are kept next to the list (``.bin``) and rebuilt whenever the
+    list is newer, then memory-mapped; each path is loaded once per process. When the
+    list is missing the index is empty and nothing is classified.
+
+    Args:
+        csv_path: Path of the prefix list (see ``NpaNxxIndex.from_csv``)
+
+    Returns:
+        The shared index
+    """
+    csv_path = os.path.abspath(csv_path)
+    with _load_lock:
+        index = _loaded.get(csv_path)
+        if index is not None:
+            return index
+
+        index_path = os.path.splitext(csv_path)[0] + '.bin'
+        try:
+            if not os.path.exists(csv_path):
+                logger.warning(f"NPA-NXX prefix list {csv_path} not found, no prefixes will be classified")
+                index = NpaNxxIndex.empty()
+            else:
+                if (not os.path.exists(index_path)
+                        or os.path.getmtime(index_path) < os.path.getmtime(csv_path)
+                        or os.path.getsize(index_path) != INDEX_SIZE):
+                    built = NpaNxxIndex.from_csv(csv_path)
+                    built.save(index_path)
+                    logger.info(
+                        f"Compiled NPA-NXX index {index_path}: {built.count(LANDLINE)} landline, "
+                        f"{built.count(TOLL_FREE)} toll-free, {built.count(VOIP)} VOIP prefixes"
+                    )
+                index = NpaNxxIndex.open(index_path)
+        except OSError as e:
+            # Read-only deployments can still use the list, just without sharing the pages
+            logger.warning(f"Could not compile NPA-NXX index {index_path}, keeping it in memory: {str(e)}")
+            index = NpaNxxIndex.from_csv(csv_path)
+
+        _loaded[csv_path] = index
+        return index
@@ -0,0 +1,427 @@
+import logging
+from typing import Any, Iterator, List, Optional
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:  # pragma: no cover - lxml is a declared dependency
+    etree = None
+    LXML_AVAILABLE = False
+
+from css_selectors import (
+    UnsupportedSelector, Bs4Nav, LxmlNav, FieldMatcher, compile_matcher, depends_on_siblings,
+    needs_following_siblings, parse_selector, selector_features, to_xpath
+)
+
+logger = logging.getLogger(__name__)
+
+# Attributes BeautifulSoup splits into lists; reading them via ``get`` never yields a string
+MULTI_VALUED_ATTRIBUTES = {'class', 'rel', 'rev', 'accept-charset', 'headers', 'accesskey', 'dropzone'}
+
+# Elements whose strings BeautifulSoup leaves out of ``get_text``
+NON_TEXT_ELEMENTS = ('script', 'style', 'template')
+
+# First chunk fed to the incremental parser when selecting with a limit
+INITIAL_CHUNK_SIZE = 256 * 1024
+
+# Chunk fed to the incremental parser when streaming batches of matches
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _batches_of(matches: List[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Yield ``matches`` in batches; a size sent into the generator applies from the next batch"""
+    start = 0
+    while start < len(matches):
+        batch = matches[start:start + batch_size]
+        start += len(batch)
+        batch_size = (yield batch) or batch_size
+
+
+class Bs4Selector:
+    """A soupsieve selector, plus a node predicate when the selector is in the supported subset"""
+
+    def __init__(self, selector: str):
+        self.selector = selector
+        self.compiled = soupsieve.compile(selector)
+        try:
+            self.parsed = parse_selector(selector)
+        except UnsupportedSelector:
+            self.parsed = None
+            self.match = None
+        else:
+            self.match = compile_matcher(self.parsed, Bs4Nav)
+
+
+class Bs4Engine:
+    """BeautifulSoup/html.parser engine (reference behaviour)"""
+
+    name = 'bs4'
+    nav = Bs4Nav
+
+    def parse(self, html_content: str) -> BeautifulSoup:
+        return BeautifulSoup(html_content, 'html.parser')
+
+    def compile(self, selector: str) -> Bs4Selector:
+        return Bs4Selector(selector)
+
+    def select(self, node, compiled: Bs4Selector, limit: int = 0) -> List[Any]:
+        return compiled.compiled.select(node, limit=limit)
+
+    def iter_select(self, node, compiled: Bs4Selector) -> Iterator[Any]:
+        """Lazily yield matches in document order"""
+        return compiled.compiled.iselect(node)
+
+    def count(self, node, compiled: Bs4Selector) -> int:
+        return len(self.select(node, compiled))
+
+    def select_from_html(self, html_content: str, compiled: Bs4Selector, limit: int = 0) -> List[Any]:
+        """Parse a document and select matches; html.parser has no early exit, so only the select stops at ``limit``"""
+        return self.select(self.parse(html_content), compiled, limit)
+
+    def iter_select_batches(self, html_content: str, compiled: Bs4Selector, batch_size: int, limit: int = 0,
+                            related: List[Bs4Selector] = ()) -> Iterator[List[Any]]:
+        """Select matches in batches; html.parser cannot parse incrementally, so the whole tree is built first"""
+        yield from _batches_of(self.select_from_html(html_content, compiled, limit), batch_size)
+
+    def field_matcher(self, selectors: List[Bs4Selector]) -> Optional[FieldMatcher]:
+        """Single-pass matcher for the selectors, or None if one is outside the supported subset"""
+        if any(selector.parsed is None for selector in selectors):
+            return None
+        return FieldMatcher([selector.parsed for selector in selectors], Bs4Nav)
+
+    def first_matches(self, node, selectors: List[Bs4Selector], matcher: Optional[FieldMatcher] = None) -> List[Any]:
+        """First match of each selector below ``node``, walking the subtree once when possible"""
+        if matcher is not None:
+            return matcher.first_matches(Bs4Nav.descendants(node))
+        return [selector.compiled.select_one(node) for selector in selectors]
+
+    def text(self, element) -> str:
+        return element.get_text(strip=True)
+
+    def attribute(self, element, name: str):
+        return element.get(name, '')
+
+    def outer_html(self, element) -> str:
+        return str(element)
+
+
+class LxmlSelector:
+    """A CSS selector compiled to XPath and to a node predicate for the lxml engine"""
+
+    def __init__(self, selector: str):
+        self.selector = selector
+        self.parsed = parse_selector(selector)
+        try:
+            self.descendants = etree.XPath(to_xpath(self.parsed), smart_strings=False)
+            self.document = etree.XPath(to_xpath(self.parsed, 'descendant-or-self::'), smart_strings=False)
+            self.following = etree.XPath(to_xpath(self.parsed, 'following::'), smart_strings=False)
+            self.count_descendants = etree.XPath(f"count({to_xpath(self.parsed)})")
+            self.count_document = etree.XPath(f"count({to_xpath(self.parsed, 'descendant-or-self::')})")
+        except etree.XPathError as e:
+            # Valid CSS that has no XPath rendering here (e.g. a type starting with '-'); soupsieve handles it
+            raise UnsupportedSelector(f"Selector {selector!r} has no XPath equivalent: {str(e)}") from e
+        self.match = compile_matcher(self.parsed, LxmlNav)
+        # Matches on a partially parsed tree are final unless later siblings can change them
+        self.incremental = not needs_following_siblings(self.parsed)
+
+
+def _is_closed(element) -> bool:
+    """Whether the parser has finished ``element``: it or an ancestor already has a next sibling"""
+    while element is not None:
+        if element.getnext() is not None:
+            return True
+        element = element.getparent()
+    return False
+
+
+def _is_attached(element, root) -> bool:
+    """Whether ``element`` is still inside the tree under ``root``"""
+    while True:
+        parent = element.getparent()
+        if parent is None:
+            return element is root
+        element = parent
+
+
+def _contains(element, other) -> bool:
+    """Whether ``other`` is ``element`` or one of its descendants"""
+    while other is not None:
+        if other is element:
+            return True
+        other = other.getparent()
+    return False
+
+
+class LxmlEngine:
+    """lxml/libxml2 engine with CSS selectors compiled to XPath"""
+
+    name = 'lxml'
+    nav = LxmlNav
+
+    def __init__(self):
+        self._text_xpath = etree.XPath(
+            'descendant::text()[not(ancestor::script or ancestor::style or ancestor::template)]',
+            smart_strings=False
+        )
+
+    def parse(self, html_content: str):
+        parser = etree.HTMLParser(encoding='utf-8', huge_tree=True)
+        root = etree.fromstring(html_content.encode('utf-8'), parser)
+        if root is None:
+            raise ValueError("Document is empty")
+        return root.getroottree()
+
+    def compile(self, selector: str) -> LxmlSelector:
+        return LxmlSelector(selector)
+
+    def select(self, node, compiled: LxmlSelector, limit: int = 0) -> List[Any]:
+        if isinstance(node, etree._ElementTree):
+            # Like soupsieve on a whole document, the root element is a candidate too
+            elements = compiled.document(node.getroot())
+        else:
+            elements = compiled.descendants(node)
+        return elements[:limit] if limit else elements
+
+    def iter_select(self, node, compiled: LxmlSelector) -> Iterator[Any]:
+        """Lazily yield matches in document order, so a caller needing a few matches stops early"""
+        return (element for element in LxmlNav.descendants(node) if compiled.match(element))
+
+    def count(self, node, compiled: LxmlSelector) -> int:
+        """Number of matches, counted inside libxml2 without creating element proxies"""
+        if isinstance(node, etree._ElementTree):
+            return int(compiled.count_document(node.getroot()))
+        return int(compiled.count_descendants(node))
+
+    def select_from_html(self, html_content: str, compiled: LxmlSelector, limit: int = 0) -> List[Any]:
+        """
+        Parse a document and select matches, stopping the parse once ``limit`` are complete
+
+        The document is fed to an incremental parser in growing chunks. New elements are
+        only ever appended after everything already parsed, so once the first ``limit``
+        matches in document order are closed, the rest of the input cannot change them.
+
+        Args:
+            html_content: HTML document
+            compiled: Compiled selector
+            limit: Maximum number of matches, 0 for all
+
+        Returns:
+            Matching elements in document order
+        """
+        if not limit or not compiled.incremental:
+            return self.select(self.parse(html_content), compiled, limit)
+
+        data = html_content.encode('utf-8')
+        parser = etree.HTMLPullParser(events=('start',), tag='html', encoding='utf-8', huge_tree=True)
+        root = None
+        position = 0
+        chunk_size = INITIAL_CHUNK_SIZE
+        try:
+            while position < len(data):
+                parser.feed(data[position:position + chunk_size])
+                position += chunk_size
+                if root is None:
+                    for _, root in parser.read_events():
+                        break
+                    if root is None:
+                        continue
+
+                matches = compiled.document(root)
+                complete = 0
+                for element in matches:
+                    if complete == limit or not _is_closed(element):
+                        break
+                    complete += 1
+                if complete == limit:
+                    logger.debug(f"Stopped parsing after {position} of {len(data)} bytes with {limit} matches")
+                    return matches[:limit]
+
+                # Grow geometrically, or straight to the projected size when matches are dense.
+                # Once the projection passes the end, a partial select would be wasted work.
+                projected = position * limit // complete if complete else 0
+                chunk_size = max(chunk_size * 2, projected + projected // 10 - position)
+                if position + chunk_size >= len(data):
+                    parser.feed(data[position:])
+                    break
+        finally:
+            try:
+                # Closes any open elements so the returned ones stay attached to a finished tree
+                finished = parser.close()
+            except etree.XMLSyntaxError:
+                finished = None
+
+        if finished is None:
+            raise ValueError("Document is empty")
+        return self.select(finished.getroottree(), compiled, limit)
+
+    def iter_select_batches(self, html_content: str, compiled: LxmlSelector, batch_size: int, limit: int = 0,
+                            related: List[LxmlSelector] = ()) -> Iterator[List[Any]]:
+        """
+        Parse incrementally and yield matches in batches as soon as they are complete
+
+        Each batch is released from the tree when the next one is requested, so the
+        caller must finish with a batch before iterating on. Memory then holds one batch
+        and the still-open part of the document instead of the whole tree (libxml2 also
+        keeps the input fed so far, about the page's size in bytes, until the end). Released
+        matches are removed outright, unless ``compiled`` or the ``related`` selectors
+        (those run inside the matches) depend on sibling positions; then they are kept
+        as childless elements so positions and sibling tests are unchanged. Selectors
+        that look at later siblings, or at ``:empty`` alongside sibling tests, cannot be
+        streamed and fall back to a full parse.
+
+        Args:
+            html_content: HTML document
+            compiled: Compiled selector
+            batch_size: Matches per batch; a size sent into the generator replaces it
+            limit: Maximum number of matches, 0 for all
+            related: Selectors that will be evaluated against the yielded matches
+
+        Yields:
+            Lists of matching elements in document order
+        """
+        features = selector_features(compiled.parsed)
+        for selector in related:
+            features |= selector_features(selector.parsed)
+        keep_positions = depends_on_siblings(compiled.parsed) or any(
+            depends_on_siblings(selector.parsed) for selector in related
+        )
+        if not compiled.incremental or (keep_positions and 'empty' in features):
+            yield from _batches_of(self.select_from_html(html_content, compiled, limit), batch_size)
+            return
+
+        parser = etree.HTMLPullParser(events=('start',), tag='html', encoding='utf-8', huge_tree=True)
+        root = None
+        # Last collected match still in the tree; later scans only look past it
+        anchor = None
+        pending = []
+        retained = []
+        found = 0
+        position = 0
+        finished = False
+
+        while not finished:
+            if position < len(html_content):
+                # Encoding chunk by chunk avoids a second full-size copy of the page
+                chunk = html_content[position:position + STREAM_CHUNK_SIZE]
+                position += len(chunk)
+                parser.feed(chunk.encode('utf-8'))
+                if root is None:
+                    for _, root in parser.read_events():
+                        break
+                    if root is None:
+                        continue
+            else:
+                try:
+                    closed = parser.close()
+                except etree.XMLSyntaxError:
+                    closed = None
+                if root is None:
+                    root = closed
+                if root is None:
+                    raise ValueError("Document is empty")
+                finished = True
+
+            matches = compiled.following(anchor) if anchor is not None else compiled.document(root)
+            for element in matches:
+                if limit and found == limit:
+                    break
+                if not finished and not _is_closed(element):
+                    break
+                pending.append(element)
+                found += 1
+            if pending:
+                anchor = pending[-1]
+            if limit and found == limit:
+                finished = True
+
+            while len(pending) >= batch_size or (finished and pending):
+                batch = pending[:batch_size]
+                del pending[:batch_size]
+                batch_size = (yield batch) or batch_size
+                anchor = self._release(batch, retained, pending, root, keep_positions)
+
+        if position < len(html_content):
+            logger.debug(f"Stopped parsing after {position} of {len(html_content)} characters with {found} matches")
+
+    def _release(self, batch: List[Any], retained: List[Any], pending: List[Any], root, keep_positions: bool):
+        """
+        Drop processed matches from the tree, returning the anchor for the next scan
+
+        Matches enclosing a still-pending one (nested containers) stay in ``retained``
+        until everything inside them has been yielded.
+        """
+        released = retained + batch
+        retained.clear()
+        for element in released:
+            if pending and _contains(element, pending[0]):
+                retained.append(element)
+            elif keep_positions:
+                attributes = dict(element.attrib)
+                element.clear(keep_tail=True)
+                element.attrib.update(attributes)
+            else:
+                parent = element.getparent()
+                if parent is not None:
+                    parent.remove(element)
+
+        if pending:
+            return pending[-1]
+        if not keep_positions:
+            return None
+        # An emptied outer match may have taken the anchor with it; the last attached one stands in
+        for element in reversed(released):
+            if _is_attached(element, root):
+                return element
+        return None
+
+    def field_matcher(self, selectors: List[LxmlSelector]) -> FieldMatcher:
+        """Single-pass matcher for the selectors"""
+        return FieldMatcher([selector.parsed for selector in selectors], LxmlNav)
+
+    def first_matches(self, node, selectors: List[LxmlSelector], matcher: Optional[FieldMatcher] = None) -> List[Any]:
+        """First match of each selector below ``node``, walking the subtree once"""
+        matcher = matcher or self.field_matcher(selectors)
+        return matcher.first_matches(LxmlNav.descendants(node))
+
+    def text(self, element) -> str:
+        if element.tag in NON_TEXT_ELEMENTS:
+            strings = element.itertext()
+        else:
+            strings = self._text_xpath(element)
+        return ''.join(piece for piece in (s.strip() for s in strings) if piece)
+
+    def attribute(self, element, name: str):
+        value = element.get(name, '')
+        if name in MULTI_VALUED_ATTRIBUTES and value:
+            return value.split()
+        return value
+
+    def outer_html(self, element) -> str:
+        return etree.tostring(element, method='html', encoding='unicode', with_tail=False)
+
+
+_ENGINES = {}
+
+
+def get_parser_engine(name: Optional[str] = None):
+    """
+    Get a parser engine by name
+
+    Args:
+        name: 'lxml' or 'bs4'; defaults to lxml when it is installed
+
+    Returns:
+        Shared engine instance
+    """
+    name = (name or ('lxml' if LXML_AVAILABLE else 'bs4')).lower()
+    if name == 'lxml' and not LXML_AVAILABLE:
+        logger.warning("lxml is not installed, falling back to BeautifulSoup parser")
+        name = 'bs4'
+    if name not in ('lxml', 'bs4'):
+        raise ValueError(f"Unknown parser engine: {name}")
+    if name not in _ENGINES:
+        _ENGINES[name] = LxmlEngine() if name == 'lxml' else Bs4Engine()
+    return _ENGINES[name]
@@ -0,0 +1,98 @@
+import re
+import logging
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Distinct phone strings whose parse is kept; CRM exports repeat the same numbers a lot
+PHONE_CACHE_SIZE = 1 << 16
+
+# Shape of a phone number as written in a CRM field, after ``PhoneRecord.cleaned`` tidying
+PHONE_TEXT_PATTERN = r'^[\+]?[1-9][\d\s\-\(\)]{7,15}$'
+
+_NON_DIGIT = re.compile(r'\D')
+_NON_PHONE_CHAR = re.compile(r'[^\d\+\-\(\)\s]')
+_WHITESPACE = re.compile(r'\s+')
+_PHONE_TEXT = re.compile(PHONE_TEXT_PATTERN)
+
+# ASCII text is filtered with str.translate, several times faster than the regexes above
+_ASCII_NON_DIGITS = {code: None for code in range(128) if not chr(code).isdigit()}
+_ASCII_NON_PHONE_CHARS = {code: None for code in range(128)
+                          if not (chr(code).isdigit() or chr(code) in '+-()' or chr(code).isspace())}
+
+
+class PhoneRecord(NamedTuple):
+    """
+    A phone string parsed once
+
+    ``number`` is the 10-digit US number (country code dropped) when the digits
+    form one, ignoring any extension marker; ``has_extension`` says whether there
+    was one, which the scrubber treats as a landline. ``display`` is the number as
+    ``(NPA) NXX-XXXX``, with ``+1`` in front when the country code was written.
+    ``cleaned`` is the original text reduced to phone characters and single spaces,
+    or None when that does not look like a phone number.
+    """
+    digits: str
+    number: Optional[str]
+    has_country_code: bool
+    has_extension: bool
+    display: Optional[str]
+    cleaned: Optional[str]
+
+    @property
+    def npa(self) -> Optional[str]:
+        """Area code"""
+        return self.number[:3] if self.number else None
+
+    @property
+    def nxx(self) -> Optional[str]:
+        """Exchange code"""
+        return self.number[3:6] if self.number else None
+
+    @property
+    def prefix(self) -> Optional[str]:
+        """``NPA-NXX``"""
+        return f"{self.number[:3]}-{self.number[3:6]}" if self.number else None
+
+
+@lru_cache(maxsize=PHONE_CACHE_SIZE)
+def normalize_phone(text: str) -> PhoneRecord:
+    """
+    Parse a phone string, once per distinct string per process
+
+    Args:
+        text: Phone number as found in the lead
+
+    Returns:
+        The shared, immutable record
+    """
+    ascii_text = text.isascii()
+    digits = text.translate(_ASCII_NON_DIGITS) if ascii_text else _NON_DIGIT.sub('', text)
+    if len(digits) == 10:  # Standard US number
+        number, has_country_code = digits, False
+    elif len(digits) == 11 and digits.startswith('1'):  # US number with country code
+        number, has_country_code = digits[1:], True
+    else:
+        number, has_country_code = None, False
+
+    display = None
+    if number:
+        display = f"({number[:3]}) {number[3:6]}-{number[6:]}"
+        if has_country_code:
+            display = f"+1 {display}"
+
+    # Field text keeps its own formatting
+    if ascii_text:
+        cleaned = ' '.join(text.translate(_ASCII_NON_PHONE_CHARS).split())
+    else:
+        cleaned = _WHITESPACE.sub(' ', _NON_PHONE_CHAR.sub('', text)).strip()
+    if not _PHONE_TEXT.match(cleaned):
+        cleaned = None
+
+    return PhoneRecord(digits, number, has_country_code, 'x' in text.lower(), display, cleaned)
+
+
+def phone_cache_info():
+    """Hits, misses and size of the ``normalize_phone`` cache"""
+    return normalize_phone.cache_info()
@@ -0,0 +1,196 @@
+import os
+import uuid
+import pickle
+from collections import deque
+import logging
+import threading
+import multiprocessing
+from multiprocessing.pool import MaybeEncodingError
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# State handed to forked workers, keyed by pool token. Children get a copy-on-write
+# snapshot when the pool forks, so large objects (parsed documents, rule tables)
+# are never pickled.
+_SHARED_STATE: Dict[str, Any] = {}
+
+# Failures to move tasks or results between processes, as opposed to errors raised by the work
+_TRANSFER_ERRORS = (pickle.PicklingError, MaybeEncodingError)
+
+
+# Config keys that choose worker processes; library callers set them, API clients must not
+PARALLEL_KEYS = ('parallel', 'workers', 'parallel_threshold')
+
+
+class PoolUnavailable(RuntimeError):
+    """Raised when work cannot run in worker processes: they did not start, or tasks or results could not be pickled"""
+
+
+def fork_available() -> bool:
+    """Whether worker processes can inherit state by forking"""
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def fork_safe() -> bool:
+    """Whether this process can fork now: no other thread could hold a lock the child inherits"""
+    return fork_available() and threading.active_count() == 1
+
+
+def parallel_workers(config: Dict, item_count: int, default_threshold: int) -> int:
+    """
+    Decide how many worker processes to use for a job
+
+    The count is capped at the CPU count whatever ``workers`` asks for, and at the
+    number of items; multi-threaded processes always run serially (see ``SharedStatePool``).
+
+    Args:
+        config: Dictionary with optional 'parallel', 'workers' and 'parallel_threshold' keys
+        item_count: Number of items the job will process
+        default_threshold: Item count below which the job stays serial
+
+    Returns:
+        Number of workers, or 0 to run serially
+    """
+    if not config.get('parallel', False) or not fork_safe():
+        return 0
+
+    threshold = config.get('parallel_threshold', default_threshold)
+    if item_count < threshold:
+        return 0
+
+    cpus = os.cpu_count() or 1
+    workers = min(int(config.get('workers') or cpus), cpus, item_count)
+    return workers if workers > 1 else 0
+
+
+def without_parallel_keys(config: Optional[Dict]) -> Dict:
+    """
+    Copy of a client-supplied extraction or scrub config without its parallel settings
+
+    Request and export-job threads always run serially (see ``SharedStatePool``), so
+    the web apps drop these keys rather than let clients pick a worker count.
+
+    Args:
+        config: Config from the request
+
+    Returns:
+        The config without ``PARALLEL_KEYS``
+    """
+    return {key: value for key, value in (config or {}).items() if key not in PARALLEL_KEYS}
+
+
+def shard_ranges(start: int, end: int, shards: int) -> List[Tuple[int, int]]:
+    """Split [start, end) into at most ``shards`` contiguous, near-equal ranges"""
+    total = end - start
+    if total <= 0:
+        return []
+    shards = max(1, min(shards, total))
+    size, remainder = divmod(total, shards)
+    ranges = []
+    position = start
+    for index in range(shards):
+        step = size + (1 if index < remainder else 0)
+        ranges.append((position, position + step))
+        position += step
+    return ranges
+
+
+def _invoke(payload):
+    token, func, task = payload
+    return func(_SHARED_STATE[token], task)
+
+
+class SharedStatePool:
+    """
+    Process pool whose workers inherit shared state by forking instead of pickling it
+
+    ``func(shared, task)`` must be a module-level function; only ``task`` and the
+    return value cross the process boundary. Results come back in task order.
+    Errors raised by ``func`` propagate unchanged; failing to start the workers or
+    to pickle a task or result raises ``PoolUnavailable``, so callers can fall back
+    to running serially for those alone.
+
+    Forking copies only the calling thread, so a lock another thread holds at that
+    moment (logging, caches, sqlite) stays locked forever in the child. The pool
+    therefore refuses to start while other threads run, as they always do in the
+    web app (request threads, export jobs), which is why the app never asks for
+    workers. Only single-threaded processes get them: ``scrub_csv.py``, the
+    benchmarks, and scripts calling ``DataExtractor`` or ``BatchProcessor`` directly.
+    """
+
+    def __init__(self, shared: Any, workers: int):
+        self.shared = shared
+        self.workers = workers
+        self._token = uuid.uuid4().hex
+        self._pool = None
+
+    def __enter__(self) -> 'SharedStatePool':
+        if threading.active_count() > 1:
+            raise PoolUnavailable(f"{threading.active_count()} threads are running, forking could deadlock")
+        _SHARED_STATE[self._token] = self.shared
+        try:
+            self._pool = multiprocessing.get_context('fork').Pool(processes=self.workers)
+        except Exception as e:
+            _SHARED_STATE.pop(self._token, None)
+            raise PoolUnavailable(f"Could not start {self.workers} worker processes: {str(e)}") from e
+        return self
+
+    def map(self, func: Callable[[Any, Any], Any], tasks: Sequence) -> List:
+        try:
+            return self._pool.map(_invoke, [(self._token, func, task) for task in tasks], chunksize=1)
+        except _TRANSFER_ERRORS as e:
+            raise PoolUnavailable(f"Could not pass work to worker processes: {str(e)}") from e
+
+    def imap(self, func: Callable[[Any, Any], Any], tasks: Iterable,
+             max_pending: Optional[int] = None) -> Iterator:
+        """
+        Like ``map`` but lazy: results are yielded in task order as they finish
+
+        At most ``max_pending`` tasks (default twice the workers) are submitted ahead
+        of the result being consumed, so tasks can come from a stream of any length
+        without it being read into memory, as ``multiprocessing.Pool.imap`` would.
+        """
+        max_pending = max_pending or self.workers * 2
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(self._pool.apply_async(_invoke, ((self._token, func, task),)))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        except _TRANSFER_ERRORS as e:
+            raise PoolUnavailable(f"Could not pass work to worker processes: {str(e)}") from e
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._pool.close()
+            else:
+                self._pool.terminate()
+            self._pool.join()
+        finally:
+            _SHARED_STATE.pop(self._token, None)
+        return False
+
+
+def map_shards(func: Callable[[Any, Tuple[int, int]], List], shared: Any, item_count: int,
+               workers: int, shards_per_worker: int = 4) -> Optional[List]:
+    """
+    Run ``func(shared, (start, end))`` over shards of ``range(item_count)`` in a forked pool
+
+    Returns:
+        Concatenated shard results in order, or None if the pool could not be used
+        (see ``PoolUnavailable``); errors raised by ``func`` propagate
+    """
+    ranges = shard_ranges(0, item_count, workers * shards_per_worker)
+    try:
+        with SharedStatePool(shared, workers) as pool:
+            results = []
+            for shard in pool.map(func, ranges):
+                results.extend(shard)
+            return results
+    except PoolUnavailable as e:
+        logger.warning(f"Parallel processing unavailable, running serially: {str(e)}")
+        return None
@@ -0,0 +1,135 @@
+import json
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    size: int
+    expires_at: float
+    blob: bytes
+
+
+class ResultCache:
+    """
+    Content-addressed cache of extracted rows
+
+    Rows are stored pickled, so callers always get their own copy. Expired entries
+    are dropped on access; the least recently used ones are evicted once the memory
+    budget is exceeded. Only exports small enough to be extracted in memory use it
+    (up to ``simple_app.LARGE_EXPORT_THRESHOLD`` leads, a few MB pickled); large
+    exports stream and are never cached.
+    """
+
+    def __init__(self, max_memory_bytes: int = 256 * 1024 * 1024, ttl_seconds: int = 1800):
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(html_content: str, field_mappings: Dict, extraction_config: Dict = None,
+                 profile: str = 'DataExtractor') -> str:
+        """
+        Hash the inputs that determine an extraction result
+
+        Args:
+            html_content: HTML content of the CRM page
+            field_mappings: Dictionary mapping field names to CSS selectors
+            extraction_config: Additional configuration for extraction
+            profile: Name of the extractor producing the rows
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        digest.update(html_content.encode('utf-8'))
+        digest.update(b'\0')
+        # Mapping order is the order of each row's keys, so it is hashed as a list of pairs
+        digest.update(json.dumps(
+            {'mappings': list(field_mappings.items()), 'config': extraction_config or {}, 'profile': profile},
+            sort_keys=True, default=str
+        ).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return a copy of the cached rows for ``key``, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        try:
+            return pickle.loads(entry.blob)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache entry {key[:12]}: {str(e)}")
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+            return None
+
+    def put(self, key: str, rows: List[Dict]):
+        """Store rows under ``key``, unless they alone exceed the memory budget"""
+        try:
+            blob = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"Could not cache extraction result: {str(e)}")
+            return
+        if len(blob) > self.max_memory_bytes:
+            logger.info(f"Not caching {len(rows)} rows of {len(blob)} bytes, over the cache budget")
+            return
+
+        entry = CacheEntry(size=len(blob), expires_at=time.time() + self.ttl_seconds, blob=blob)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self.memory_bytes += entry.size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self.memory_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until the budget holds (lock held)"""
+        now = time.time()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            self._drop(key)
+        while self._entries and self.memory_bytes > self.max_memory_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        """Remove an entry and release its memory (lock held)"""
+        self.memory_bytes -= self._entries.pop(key).size
+
+
+# Shared by the preview and export endpoints so an export reuses the preview's rows
+result_cache = ResultCache()
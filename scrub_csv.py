@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Scrub a lead CSV file from the command line with LeadScrubber
+
+The file is read row by row and scrubbed in chunks, so files of any size run at
+constant memory. Kept rows go to one CSV and rejected rows, with the reason, to
+another; a summary is printed at the end.
+
+    python scrub_csv.py leads.csv
+    python scrub_csv.py leads.csv -o clean.csv --rejected rejected.csv --litigation --workers 4
+    python scrub_csv.py leads.csv --dedupe-history
+"""
+
+import os
+import sys
+import csv
+import json
+import logging
+import argparse
+from collections import deque
+from contextlib import ExitStack
+from itertools import chain, islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lead_dedup import LeadDeduplicator
+from lead_scrubber import LeadScrubber
+from process_pool import PoolUnavailable, SharedStatePool, fork_available
+
+logger = logging.getLogger(__name__)
+
+# Rows scrubbed per chunk; one chunk per worker task
+DEFAULT_CHUNK_SIZE = 50000
+
+REASON_COLUMN = 'scrub_reason'
+MALFORMED_REASON = "Row has no phone column"
+
+
+def detect_phone_column(headers: Sequence[str], name: Optional[str] = None) -> Optional[int]:
+    """
+    Find the phone column of a CSV header
+
+    Args:
+        headers: Header row
+        name: Column to use, matched ignoring case and surrounding spaces; by default
+            the first column with "phone" in its header
+
+    Returns:
+        Index of the column, or None when there is none
+    """
+    normalized_headers = [h.strip().lower() for h in headers]
+    if name is not None:
+        name = name.strip().lower()
+        return next((i for i, h in enumerate(normalized_headers) if h == name), None)
+    return next((i for i, h in enumerate(normalized_headers) if 'phone' in h), None)
+
+
+def _scrub_rows(shared: Tuple[LeadScrubber, Dict], rows: List[List[str]]) -> Tuple[List[Tuple[int, str]], Dict]:
+    """Scrub one chunk of rows, returning the rejected positions with reasons and the chunk's stats"""
+    scrubber, scrub_config = shared
+    phone_index = scrub_config['phone_field']
+    # Leads are keyed by column index, so duplicate or blank headers lose nothing;
+    # only the litigation check needs more than the phone number
+    if scrub_config.get('filter_litigation', False):
+        leads = [dict(enumerate(row)) for row in rows]
+    else:
+        leads = [{phone_index: row[phone_index]} for row in rows]
+
+    stats = scrubber.new_stats()
+    rejected = []
+    scrubber.scrub_batch(leads, scrub_config, stats, rejected)
+    return rejected, stats
+
+
+def _dedupe_rows(scrubber: LeadScrubber, deduplicator: LeadDeduplicator, scrub_config: Dict,
+                 rows: List[List[str]], rejected: List[Tuple[int, str]], stats: Dict) -> List[Tuple[int, str]]:
+    """
+    Drop the duplicates among the rows a chunk scrub kept, adding them to ``rejected`` and ``stats``
+
+    Runs in the parent on each chunk in file order, so one deduplicator sees the whole
+    file, as ``LeadScrubber._scrub_parallel`` does for its shards.
+    """
+    dropped = {position for position, _ in rejected}
+    kept = [position for position in range(len(rows)) if position not in dropped]
+    if not kept:
+        return rejected
+
+    phone_index = scrub_config['phone_field']
+    if deduplicator.use_email:
+        leads = [dict(enumerate(rows[position])) for position in kept]
+    else:
+        leads = [{phone_index: rows[position][phone_index]} for position in kept]
+    dedupe_config = {'phone_field': phone_index, 'filter_landlines': False, 'filter_suppressed': False}
+    dedupe_stats = scrubber.new_stats()
+    duplicates = []
+    scrubber.scrub_batch(leads, dedupe_config, dedupe_stats, duplicates, deduplicator)
+    if not duplicates:
+        return rejected
+
+    # Only the duplicates are new: the rows were already counted by the chunk scrub
+    dedupe_stats['original_count'] = 0
+    dedupe_stats['clean_count'] = -len(duplicates)
+    scrubber.merge_stats(stats, dedupe_stats)
+    return sorted(rejected + [(kept[position], reason) for position, reason in duplicates])
+
+
+def _chunks(reader: Iterator[List[str]], size: int, phone_index: int) -> Iterator[Tuple[List, List]]:
+    """Rows of a reader in chunks of ``size``, each split into well-formed and malformed rows"""
+    while True:
+        chunk = list(islice(reader, size))
+        if not chunk:
+            return
+        valid = [row for row in chunk if len(row) > phone_index]
+        malformed = [row for row in chunk if len(row) <= phone_index] if len(valid) < len(chunk) else []
+        yield valid, malformed
+
+
+def _scrub_chunks(chunks: Iterator[Tuple[List, List]], shared: Tuple[LeadScrubber, Dict],
+                  pool: Optional[SharedStatePool]) -> Iterator[Tuple[List, List, List, Dict]]:
+    """Scrub chunks in order, in the pool when there is one; only a few chunks are in flight at once"""
+    if pool is None:
+        for valid, malformed in chunks:
+            yield (valid, malformed) + _scrub_rows(shared, valid)
+        return
+
+    held = deque()
+
+    def tasks():
+        for valid, malformed in chunks:
+            held.append((valid, malformed))
+            yield valid
+
+    try:
+        for rejected, stats in pool.imap(_scrub_rows, tasks()):
+            valid, malformed = held.popleft()
+            yield valid, malformed, rejected, stats
+        return
+    except PoolUnavailable as e:
+        logger.warning(f"Parallel processing unavailable, scrubbing the remaining rows serially: {str(e)}")
+
+    # Chunks the pool did not return, then the rest of the file
+    for valid, malformed in chain(held, chunks):
+        yield (valid, malformed) + _scrub_rows(shared, valid)
+
+
+def scrub_file(input_path: str, output_path: str, rejected_path: Optional[str] = None,
+               scrub_config: Dict = None, phone_column: Optional[str] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 0,
+               scrubber: Optional[LeadScrubber] = None) -> Dict:
+    """
+    Scrub a CSV file into a file of kept rows and, optionally, one of rejected rows
+
+    Rows keep their columns and order. Rejected rows get an extra ``scrub_reason``
+    column. Rows too short to have a phone number are rejected without being
+    scrubbed, and counted apart as ``malformed_rows``. With ``dedupe``, repeats are
+    dropped across the whole file, not just within a chunk; with ``dedupe_history``
+    the kept rows are recorded as delivered once the output file is complete.
+
+    Args:
+        input_path: CSV file with a header row
+        output_path: Where to write the kept rows
+        rejected_path: Where to write the rejected rows, or None to drop them
+        scrub_config: Configuration for scrubbing options (``phone_field`` is set here)
+        phone_column: Header of the phone column (see ``detect_phone_column``)
+        chunk_size: Rows scrubbed at a time
+        workers: Worker processes to scrub chunks in; 0 or 1 scrubs in this process
+        scrubber: Scrubber to use, by default one with the standard prefix list
+
+    Returns:
+        Scrubbing statistics (see ``LeadScrubber.new_stats``) plus ``malformed_rows``
+
+    Raises:
+        ValueError: If the file has no header or no phone column
+    """
+    scrubber = scrubber or LeadScrubber()
+    scrub_config = dict(scrub_config or {})
+    stats = scrubber.new_stats()
+    stats['malformed_rows'] = 0
+
+    with ExitStack() as stack:
+        reader = csv.reader(stack.enter_context(open(input_path, 'r', newline='', encoding='utf-8-sig')))
+        headers = next(reader, None)
+        if headers is None:
+            raise ValueError(f"{input_path} is empty or missing headers")
+
+        phone_index = detect_phone_column(headers, phone_column)
+        if phone_index is None:
+            wanted = repr(phone_column) if phone_column else "a column with 'phone'"
+            raise ValueError(f"Could not find {wanted} in the header of {input_path}")
+        scrub_config['phone_field'] = phone_index
+        logger.info(f"Scrubbing {input_path} on column {phone_index} ({headers[phone_index]!r})")
+
+        writer = csv.writer(stack.enter_context(open(output_path, 'w', newline='', encoding='utf-8')))
+        writer.writerow(headers)
+        reject_writer = None
+        if rejected_path:
+            reject_writer = csv.writer(stack.enter_context(open(rejected_path, 'w', newline='', encoding='utf-8')))
+            reject_writer.writerow(headers + [REASON_COLUMN])
+
+        # Chunks are scrubbed without deduplication, which runs here across the whole file
+        deduplicator = scrubber.deduplicator(scrub_config)
+        shared = (scrubber, dict(scrub_config, dedupe=False))
+        pool = None
+        if workers > 1 and fork_available():
+            try:
+                pool = stack.enter_context(SharedStatePool(shared, workers))
+            except PoolUnavailable as e:
+                logger.warning(f"Parallel processing unavailable, running serially: {str(e)}")
+
+        for valid, malformed, rejected, chunk_stats in _scrub_chunks(_chunks(reader, chunk_size, phone_index),
+                                                                     shared, pool):
+            if deduplicator:
+                rejected = _dedupe_rows(scrubber, deduplicator, scrub_config, valid, rejected, chunk_stats)
+            if rejected:
+                dropped = {position for position, _ in rejected}
+                writer.writerows(row for position, row in enumerate(valid) if position not in dropped)
+            else:
+                writer.writerows(valid)
+            if reject_writer:
+                reject_writer.writerows(valid[position] + [reason] for position, reason in rejected)
+                reject_writer.writerows(row + [MALFORMED_REASON] for row in malformed)
+
+            scrubber.merge_stats(stats, chunk_stats)
+            stats['malformed_rows'] += len(malformed)
+            logger.info(f"Scrubbed {stats['original_count']:,} rows, kept {stats['clean_count']:,}")
+
+    # Only once every output file is closed are the kept rows delivered
+    if deduplicator:
+        deduplicator.commit()
+    return stats
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Scrub landline, toll-free, VOIP, suppressed and litigation-risk leads from a CSV file")
+    parser.add_argument('input', help="CSV file with a header row")
+    parser.add_argument('-o', '--output', help="CSV of kept rows (default: <input>_clean.csv)")
+    parser.add_argument('--rejected', help="CSV of rejected rows with their reason (default: <input>_rejected.csv)")
+    parser.add_argument('--no-rejected', action='store_true', help="Do not write rejected rows")
+    parser.add_argument('--phone-column', help="Header of the phone column (default: first header containing 'phone')")
+    parser.add_argument('--keep-landlines', action='store_true', help="Do not filter phone numbers")
+    parser.add_argument('--litigation', action='store_true', help="Filter leads with litigation keywords")
+    parser.add_argument('--keywords', help="File of litigation keywords, one per line (implies --litigation)")
+    parser.add_argument('--prefix-file', help="NPA-NXX prefix list (default: config/npa_nxx_prefixes.csv)")
+    parser.add_argument('--suppression-dir', help="Directory of suppression lists (default: config/suppression)")
+    parser.add_argument('--keep-suppressed', action='store_true', help="Do not filter numbers on suppression lists")
+    parser.add_argument('--dedupe', action='store_true', help="Drop rows whose phone number was already kept")
+    parser.add_argument('--dedupe-history', action='store_true',
+                        help="Also drop rows delivered by earlier scrubs and exports, and record the kept ones "
+                             "(implies --dedupe)")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (default: scrub in this process)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows scrubbed at a time")
+    parser.add_argument('--stats-json', help="Also write the statistics to this JSON file")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only log warnings and errors")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    stem = os.path.splitext(args.input)[0]
+    output_path = args.output or f"{stem}_clean.csv"
+    rejected_path = None if args.no_rejected else (args.rejected or f"{stem}_rejected.csv")
+
+    scrub_config: Dict[str, Any] = {
+        'filter_landlines': not args.keep_landlines,
+        'filter_suppressed': not args.keep_suppressed,
+        'filter_litigation': args.litigation or bool(args.keywords),
+        'dedupe': args.dedupe or args.dedupe_history,
+        'dedupe_history': args.dedupe_history
+    }
+    try:
+        if args.keywords:
+            with open(args.keywords, 'r', encoding='utf-8') as f:
+                scrub_config['litigation_keywords'] = [line.strip() for line in f if line.strip()]
+
+        scrubber = LeadScrubber(args.prefix_file, args.suppression_dir)
+        stats = scrub_file(args.input, output_path, rejected_path, scrub_config, args.phone_column,
+                           max(1, args.chunk_size), args.workers, scrubber)
+    except (OSError, ValueError, csv.Error) as e:
+        logger.error(f"Scrubbing failed: {str(e)}")
+        return 1
+
+    print(scrubber.get_scrubbing_summary(stats))
+    for filter_reason, count in stats['filter_reasons'].items():
+        print(f"    {filter_reason}: {count:,}")
+    if stats['malformed_rows']:
+        print(f"Rejected {stats['malformed_rows']:,} rows with no phone column")
+    print(f"Kept rows written to {output_path}")
+    if rejected_path:
+        print(f"Rejected rows written to {rejected_path}")
+
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
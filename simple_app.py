@@ -1,14 +1,16 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
 import json
 import os
 import logging
 import gc
-import tempfile
 import time
 from data_extractor import DataExtractor
 from csv_exporter import CSVExporter
 from batch_processor import BatchProcessor
 from lead_scrubber import LeadScrubber
+from result_cache import result_cache
+from export_jobs import ExportJobManager, ExportQueueFull
+from process_pool import without_parallel_keys
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +23,136 @@ data_extractor = DataExtractor()
 csv_exporter = CSVExporter()
 batch_processor = BatchProcessor()
 lead_scrubber = LeadScrubber()
+export_jobs = ExportJobManager()
+export_jobs_recovered = False
+
+# Above this many leads, exports stream through the batch processor
+LARGE_EXPORT_THRESHOLD = 10000
+# Last line of a streamed export that failed after its first rows were sent
+STREAM_ERROR_MARKER = '# EXPORT FAILED'
+
+def request_configs(data):
+    """Extraction and export configs of a request; requests never fork workers (see ``SharedStatePool``)"""
+    extraction_config = without_parallel_keys(data.get('extraction_config', {}))
+    export_config = dict(data.get('export_config', {}))
+    if 'scrub_config' in export_config:
+        export_config['scrub_config'] = without_parallel_keys(export_config['scrub_config'])
+    return extraction_config, export_config
+
+def extract_leads_cached(html_content, field_mappings, extraction_config):
+    """
+    Extract leads, reusing the rows of an earlier request for identical input
+    
+    Only exports of up to ``LARGE_EXPORT_THRESHOLD`` leads read this cache; larger ones
+    stream through the batch processor so they never hold every row at once. The
+    preview fills it for exactly those sizes (see ``preview_leads_cached``).
+    """
+    cache_key = result_cache.make_key(html_content, field_mappings, extraction_config)
+    extracted_data = result_cache.get(cache_key)
+    if extracted_data is not None:
+        logger.info(f"Reusing {len(extracted_data)} cached leads")
+        return extracted_data
+    
+    extracted_data = data_extractor.extract_leads(
+        html_content, 
+        field_mappings, 
+        extraction_config
+    )
+    result_cache.put(cache_key, extracted_data)
+    return extracted_data
+
+def preview_leads_cached(html_content, field_mappings, extraction_config, sample_size=10):
+    """
+    Preview rows and lead count for the extraction step
+    
+    When the export will take the in-memory path (``max_leads`` up to
+    ``LARGE_EXPORT_THRESHOLD``), the preview extracts every lead, at most that many
+    containers, and caches them so the export reuses the work instead of
+    extracting again. Larger exports stream through the batch processor, which
+    does not read the cache, so their preview only extracts the sample rows and
+    counts the remaining containers; the export then extracts from scratch.
+    
+    Returns:
+        Dictionary with 'leads' (up to sample_size leads) and 'total_count'
+    """
+    if extraction_config.get('max_leads', 1000) > LARGE_EXPORT_THRESHOLD:
+        return data_extractor.preview_leads(html_content, field_mappings, extraction_config, sample_size)
+    
+    extracted_data = extract_leads_cached(html_content, field_mappings, extraction_config)
+    return {'leads': extracted_data[:sample_size], 'total_count': len(extracted_data)}
+
+def write_export(html_content, field_mappings, extraction_config, export_config,
+                 output_path=None, progress_callback=None, checkpoint_path=None):
+    """
+    Run the extract, scrub and write pipeline for one export
+    
+    Large exports go through the batch processor into ``output_path``, scrubbed batch
+    by batch and resumable from ``checkpoint_path``; smaller ones are extracted in
+    memory, optionally scrubbed and written by the CSV exporter (moved to
+    ``output_path`` when one is given).
+    
+    Returns:
+        Tuple of (file path, download name, record count); the count is 0 when nothing was extracted
+    """
+    max_leads = extraction_config.get('max_leads', 1000)
+    scrub_enabled = export_config.get('scrub_config', {}).get('enable_scrubbing', False)
+    
+    if max_leads > LARGE_EXPORT_THRESHOLD:
+        logger.info(f"Processing large dataset with {max_leads} max leads using batch processor")
+        total_records = batch_processor.export_large_csv(
+            html_content, field_mappings, extraction_config, export_config, output_path,
+            progress_callback=progress_callback, checkpoint_path=checkpoint_path
+        )
+        if scrub_enabled:
+            return output_path, f"crm_leads_scrubbed_{total_records}_clean.csv", total_records
+        return output_path, f"crm_leads_{total_records}_records.csv", total_records
+    
+    # For smaller datasets, use normal processing (reusing the preview's rows when cached)
+    extracted_data = extract_leads_cached(html_content, field_mappings, extraction_config)
+    if not extracted_data:
+        return None, None, 0
+    
+    # Apply lead scrubbing if enabled
+    scrub_config = export_config.get('scrub_config', {})
+    if scrub_enabled:
+        scrub_results = lead_scrubber.scrub_leads(extracted_data, scrub_config)
+        final_data = scrub_results['clean_leads']
+        scrub_summary = lead_scrubber.get_scrubbing_summary(scrub_results['stats'])
+        logger.info(f"Lead scrubbing results:\n{scrub_summary}")
+        filename_suffix = f"_scrubbed_{len(final_data)}_clean"
+    else:
+        final_data = extracted_data
+        filename_suffix = f"_{len(final_data)}_records"
+    
+    record_count = len(final_data)
+    if not record_count:
+        return None, None, 0
+    
+    # Export to CSV
+    csv_file_path = csv_exporter.export_to_csv(final_data, export_config)
+    if output_path:
+        os.replace(csv_file_path, output_path)
+        csv_file_path = output_path
+    if progress_callback:
+        progress_callback(record_count)
+    
+    # Clear extracted data from memory immediately
+    extracted_data = None
+    final_data = None
+    gc.collect()
+    
+    return csv_file_path, f"crm_leads{filename_suffix}.csv", record_count
+
+@app.before_request
+def recover_export_jobs():
+    """Resume exports interrupted by a crash or restart, once this process serves requests"""
+    global export_jobs_recovered
+    if not export_jobs_recovered:
+        export_jobs_recovered = True
+        try:
+            export_jobs.recover(write_export)
+        except Exception as e:
+            logger.error(f"Error recovering export jobs: {str(e)}")
 
 @app.route('/')
 def index():
@@ -49,7 +181,7 @@ def extract_from_html():
         data = request.json
         html_content = data.get('html_content', '')
         field_mappings = data.get('field_mappings', {})
-        extraction_config = data.get('extraction_config', {})
+        extraction_config, _ = request_configs(data)
         
         if not html_content:
             return jsonify({
@@ -63,23 +195,14 @@ def extract_from_html():
                 'message': 'Please configure at least one field mapping'
             })
         
-        # Extract data using configured mappings
-        extracted_data = data_extractor.extract_leads(
-            html_content, 
-            field_mappings, 
-            extraction_config
-        )
-        
-        preview_data = extracted_data[:10]  # Get preview before clearing
-        total_count = len(extracted_data)
-        
-        # Clear the full dataset from memory after getting preview
-        extracted_data = None
-        gc.collect()
+        # Small exports are extracted and cached for the export; large ones only extract the sample
+        preview = preview_leads_cached(html_content, field_mappings, extraction_config, sample_size=10)
+        preview_data = preview['leads']
+        total_count = preview['total_count']
         
         return jsonify({
             'success': True,
-            'message': f'Extracted {total_count} leads',
+            'message': f'Found {total_count} leads',
             'data': preview_data,  # Return first 10 for preview
             'total_count': total_count
         })
@@ -98,8 +221,7 @@ def export_from_html():
         data = request.json
         html_content = data.get('html_content', '')
         field_mappings = data.get('field_mappings', {})
-        extraction_config = data.get('extraction_config', {})
-        export_config = data.get('export_config', {})
+        extraction_config, export_config = request_configs(data)
         
         if not html_content:
             return jsonify({
@@ -115,92 +237,57 @@ def export_from_html():
         
         max_leads = extraction_config.get('max_leads', 1000)
         
-        # For large datasets, use batch processing to avoid memory issues
-        if max_leads > 10000:
-            logger.info(f"Processing large dataset with {max_leads} max leads using batch processor")
+        # For large datasets, stream CSV rows to the client as each batch is extracted
+        if max_leads > LARGE_EXPORT_THRESHOLD:
+            logger.info(f"Streaming large dataset with {max_leads} max leads using batch processor")
+            csv_chunks = batch_processor.stream_csv(html_content, field_mappings, extraction_config, export_config)
+            
+            # Producing the first chunk before responding lets an empty result still get a JSON error
+            first_chunk = next(csv_chunks, None)
+            if first_chunk is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'No data extracted from the provided HTML'
+                })
             
-            # Create temporary file for large dataset processing
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as temp_file:
-                temp_path = temp_file.name
+            # Past the first chunk the status is sent, so a failure ends the body with
+            # STREAM_ERROR_MARKER and re-raises, which drops the connection before the
+            # final chunk; clients see a truncated transfer rather than a short CSV
+            def generate():
+                try:
+                    yield first_chunk
+                    yield from csv_chunks
+                except Exception as e:
+                    logger.error(f"Streamed export failed after the response started: {str(e)}")
+                    yield f"{STREAM_ERROR_MARKER}: {str(e)}\n".encode('utf-8')
+                    raise
+                finally:
+                    gc.collect()
             
-            try:
-                # Use batch processor for large datasets
-                total_records = batch_processor.export_large_csv(
-                    html_content, field_mappings, extraction_config, export_config, temp_path
-                )
-                
-                if total_records == 0:
-                    os.unlink(temp_path)  # Clean up temp file
-                    return jsonify({
-                        'success': False,
-                        'message': 'No data extracted from the provided HTML'
-                    })
-                
-                # Send file and clean up immediately after
-                def remove_file(response):
-                    try:
-                        os.unlink(temp_path)
-                        gc.collect()  # Force garbage collection
-                    except Exception:
-                        pass
-                    return response
-                
-                response = send_file(
-                    temp_path,
-                    as_attachment=True,
-                    download_name=f"crm_leads_{total_records}_records.csv",
-                    mimetype='text/csv'
-                )
-                
-                # Schedule file cleanup after response
-                response.call_on_close(lambda: os.unlink(temp_path) if os.path.exists(temp_path) else None)
-                
-                return response
-                
-            except Exception as e:
-                # Clean up temp file on error
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                raise e
+            # The row count is unknown until the last batch, so the name cannot include it
+            scrub_enabled = export_config.get('scrub_config', {}).get('enable_scrubbing', False)
+            download_name = 'crm_leads_scrubbed_export.csv' if scrub_enabled else 'crm_leads_export.csv'
+            return Response(
+                generate(),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename={download_name}'}
+            )
         
         else:
-            # For smaller datasets, use normal processing
-            extracted_data = data_extractor.extract_leads(
-                html_content, 
-                field_mappings, 
-                extraction_config
+            csv_file_path, download_name, total_records = write_export(
+                html_content, field_mappings, extraction_config, export_config
             )
             
-            if not extracted_data:
+            if not total_records:
                 return jsonify({
                     'success': False,
                     'message': 'No data extracted from the provided HTML'
                 })
             
-            # Apply lead scrubbing if enabled
-            scrub_config = export_config.get('scrub_config', {})
-            if scrub_config.get('enable_scrubbing', False):
-                scrub_results = lead_scrubber.scrub_leads(extracted_data, scrub_config)
-                final_data = scrub_results['clean_leads']
-                scrub_summary = lead_scrubber.get_scrubbing_summary(scrub_results['stats'])
-                logger.info(f"Lead scrubbing results:\n{scrub_summary}")
-                filename_suffix = f"_scrubbed_{len(final_data)}_clean"
-            else:
-                final_data = extracted_data
-                filename_suffix = f"_{len(final_data)}_records"
-            
-            # Export to CSV
-            csv_file_path = csv_exporter.export_to_csv(final_data, export_config)
-            
-            # Clear extracted data from memory immediately
-            extracted_data = None
-            final_data = None
-            gc.collect()
-            
             return send_file(
                 csv_file_path,
                 as_attachment=True,
-                download_name=f"crm_leads{filename_suffix}.csv",
+                download_name=download_name,
                 mimetype='text/csv'
             )
         
@@ -211,6 +298,107 @@ def export_from_html():
             'message': f'CSV export error: {str(e)}'
         })
 
+@app.route('/api/export_jobs', methods=['POST'])
+def submit_export_job():
+    """Queue an export in the background and return its job id for polling"""
+    try:
+        data = request.json
+        html_content = data.get('html_content', '')
+        field_mappings = data.get('field_mappings', {})
+        extraction_config, export_config = request_configs(data)
+        
+        if not html_content:
+            return jsonify({
+                'success': False,
+                'message': 'Please provide HTML content to extract from'
+            })
+        
+        if not field_mappings:
+            return jsonify({
+                'success': False,
+                'message': 'Please configure at least one field mapping'
+            })
+        
+        # The preview's lead count makes a better ETA basis than the max_leads cap
+        expected_rows = data.get('expected_rows') or extraction_config.get('max_leads', 1000)
+        job = export_jobs.submit(
+            write_export, html_content, field_mappings, extraction_config, export_config,
+            expected_rows=expected_rows
+        )
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 202
+        
+    except ExportQueueFull as e:
+        logger.warning(f"Rejected export job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Too many exports in progress, please try again shortly'
+        }), 429
+    except Exception as e:
+        logger.error(f"Error submitting export job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'CSV export error: {str(e)}'
+        })
+
+@app.route('/api/export_jobs/<job_id>', methods=['GET'])
+def export_job_status(job_id):
+    """Status, rows processed and ETA of an export job"""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Export job not found or expired'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+@app.route('/api/export_jobs/<job_id>/resume', methods=['POST'])
+def resume_export_job(job_id):
+    """Retry a failed export job from its last checkpoint"""
+    try:
+        job = export_jobs.resume(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'message': 'Export job cannot be resumed'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 202
+        
+    except ExportQueueFull as e:
+        logger.warning(f"Rejected export job resume: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Too many exports in progress, please try again shortly'
+        }), 429
+
+@app.route('/api/export_jobs/<job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    """Download the CSV of a finished export job"""
+    job = export_jobs.get(job_id)
+    if job is None or job.status != 'done':
+        return jsonify({
+            'success': False,
+            'message': 'Export is not ready for download'
+        }), 404
+    
+    return send_file(
+        os.path.abspath(job.file_path),
+        as_attachment=True,
+        download_name=job.download_name,
+        mimetype='text/csv'
+    )
+
 @app.route('/api/analyze_html', methods=['POST'])
 def analyze_html():
     """Analyze provided HTML to suggest field mappings"""
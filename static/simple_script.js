@@ -84,6 +84,13 @@ class SimpleCRMExtractor {
             
             if (result.success) {
                 this.displayAnalysisResults(result.suggestions);
+                
+                // Pre-fill a confidently detected container if the user hasn't chosen one
+                const detected = result.suggestions.detected_container;
+                const containerInput = document.getElementById('containerSelector');
+                if (detected && detected.confidence >= 0.8 && !containerInput.value.trim()) {
+                    containerInput.value = detected.selector;
+                }
                 this.showMessage('success', 'HTML analysis completed. Check suggestions below.');
             } else {
                 this.showMessage('danger', result.message);
@@ -180,7 +187,7 @@ class SimpleCRMExtractor {
                     <div class="suggestion-item cursor-pointer" onclick="selectContainerSuggestion('${container.selector}')">
                         <div class="d-flex justify-content-between">
                             <code>${container.selector}</code>
-                            <span class="suggestion-meta">${container.count} elements</span>
+                            <span class="suggestion-meta">${container.count} elements${container.confidence !== undefined ? ` · ${Math.round(container.confidence * 100)}% match` : ''}</span>
                         </div>
                         <small class="text-muted">${container.sample_text}</small>
                     </div>
@@ -276,6 +283,7 @@ class SimpleCRMExtractor {
             if (result.success) {
                 // Don't store extracted data - just use for preview
                 this.displayDataPreview(result.data, result.total_count);
+                this.lastTotalCount = result.total_count;
                 this.showMessage('success', result.message);
             } else {
                 this.showMessage('danger', result.message);
@@ -305,6 +313,12 @@ class SimpleCRMExtractor {
             const extractionConfig = this.getExtractionConfig();
             extractionConfig.html_content = htmlContent;
             
+            // Large exports run as background jobs so the request never hits the worker timeout
+            if (extractionConfig.extraction_config.max_leads > 10000) {
+                await this.exportAsJob(extractionConfig, exportBtn);
+                return;
+            }
+            
             const response = await fetch('/api/export_from_html', {
                 method: 'POST',
                 headers: {
@@ -339,6 +353,57 @@ class SimpleCRMExtractor {
         }
     }
 
+    async exportAsJob(extractionConfig, exportBtn) {
+        if (this.lastTotalCount) {
+            extractionConfig.expected_rows = this.lastTotalCount;
+        }
+        
+        const response = await fetch('/api/export_jobs', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(extractionConfig)
+        });
+        let result = await response.json();
+        if (!result.success) {
+            this.showMessage('danger', result.message || 'Export failed');
+            return;
+        }
+        
+        let job = result.job;
+        while (job.status === 'queued' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const statusResponse = await fetch(`/api/export_jobs/${job.job_id}`);
+            result = await statusResponse.json();
+            if (!result.success) {
+                this.showMessage('danger', result.message || 'Export failed');
+                return;
+            }
+            job = result.job;
+            
+            let progress = job.status === 'queued' ? 'Queued...' : `${job.rows_processed.toLocaleString()} rows`;
+            if (job.eta_seconds !== null) {
+                progress += ` (~${Math.ceil(job.eta_seconds)}s left)`;
+            }
+            exportBtn.innerHTML = `<i class="fas fa-spinner fa-spin me-2"></i>${progress}`;
+        }
+        
+        if (job.status !== 'done') {
+            this.showMessage('danger', job.message || 'Export failed');
+            return;
+        }
+        
+        const a = document.createElement('a');
+        a.href = `/api/export_jobs/${job.job_id}/download`;
+        a.download = job.download_name;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        
+        this.showMessage('success', `${job.message}. CSV file downloaded successfully!`);
+    }
+
     getExtractionConfig() {
         const fieldMappings = {};
         const containerSelector = document.getElementById('containerSelector').value.trim();
@@ -363,6 +428,8 @@ class SimpleCRMExtractor {
         if (enableScrubbing) {
             scrubConfig.filter_landlines = document.getElementById('filterLandlines').checked;
             scrubConfig.filter_litigation = document.getElementById('filterLitigation').checked;
+            scrubConfig.dedupe_history = document.getElementById('filterDelivered').checked;
+            scrubConfig.dedupe = document.getElementById('filterDuplicates').checked || scrubConfig.dedupe_history;
             scrubConfig.phone_field = 'number'; // Assuming phone field is 'number'
         }
         
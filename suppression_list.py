@@ -0,0 +1,237 @@
+import os
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUPPRESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'suppression')
+
+# Files in the suppression directory that are read as lists
+SOURCE_EXTENSIONS = ('.txt', '.csv')
+
+# Bytes of a list file parsed per vectorised pass, bounding the temporary arrays
+READ_BLOCK_SIZE = 8 * 1024 * 1024
+
+_NEWLINE, _COMMA, _ZERO, _NINE = b'\n,09'
+
+_loaded: Dict[str, 'SuppressionList'] = {}
+_load_lock = threading.Lock()
+
+
+def parse_numbers(data: bytes) -> np.ndarray:
+    """
+    Normalized phone numbers of the lines of a list file
+
+    Each line's first comma-separated field is reduced to its digits; 10 digits, or
+    11 starting with the US country code, make a number. Other lines (headers,
+    blanks, foreign or extension numbers) are skipped.
+
+    Args:
+        data: Whole lines of the file; the last one may lack its newline
+
+    Returns:
+        int64 array of the 10-digit numbers, in file order
+    """
+    if not data:
+        return np.empty(0, dtype=np.int64)
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    ends = np.flatnonzero(buffer == _NEWLINE)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Cut each line at its first comma
+    commas = np.flatnonzero(buffer == _COMMA)
+    if len(commas):
+        first_comma = np.searchsorted(commas, starts)
+        has_comma = first_comma < len(commas)
+        has_comma[has_comma] = commas[first_comma[has_comma]] < ends[has_comma]
+        ends = ends.copy()
+        ends[has_comma] = commas[first_comma[has_comma]]
+
+    in_field = np.zeros(len(buffer) + 1, dtype=np.int8)
+    in_field[starts] += 1
+    in_field[ends] -= 1
+    is_digit = (buffer >= _ZERO) & (buffer <= _NINE) & (np.cumsum(in_field[:-1], dtype=np.int8) > 0)
+
+    # Digits before each offset, so a line's digit count is a difference of two lookups
+    # (blocks are well under 2 GiB, so int32 offsets suffice)
+    digits_before = np.zeros(len(buffer) + 1, dtype=np.int32)
+    np.cumsum(is_digit, dtype=np.int32, out=digits_before[1:])
+    digit_count = digits_before[ends] - digits_before[starts]
+    digits = buffer[is_digit] - _ZERO
+
+    begin = digits_before[starts]
+    ten = digit_count == 10
+    eleven = digit_count == 11
+    eleven[eleven] = digits[begin[eleven]] == 1
+    begin = begin[ten | eleven] + eleven[ten | eleven]
+
+    numbers = np.zeros(len(begin), dtype=np.int64)
+    for i in range(10):
+        numbers = numbers * 10 + digits[begin + i]
+    return numbers
+
+
+def unique_sorted(numbers: np.ndarray) -> np.ndarray:
+    """Sorted distinct values; sorting in place and dropping repeats beats ``np.unique`` on large arrays"""
+    numbers.sort()
+    if len(numbers) < 2:
+        return numbers
+    distinct = np.empty(len(numbers), dtype=bool)
+    distinct[0] = True
+    np.not_equal(numbers[1:], numbers[:-1], out=distinct[1:])
+    return numbers[distinct]
+
+
+def read_numbers(path: str) -> np.ndarray:
+    """Normalized phone numbers of one list file (see ``parse_numbers``), read block by block"""
+    parts: List[np.ndarray] = []
+    rest = b''
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            block = rest + block
+            cut = block.rfind(b'\n') + 1
+            rest = block[cut:]
+            parts.append(parse_numbers(block[:cut]))
+    parts.append(parse_numbers(rest))
+    return np.concatenate(parts)
+
+
+class SuppressionList:
+    """
+    Phone numbers that must never be exported, as a sorted array of 10-digit integers
+
+    Membership is a binary search per number, done for a whole batch at once. Loaded
+    from a compiled file the array is a read-only memory map, so every worker
+    process shares the same pages however long the list is.
+    """
+
+    def __init__(self, numbers: np.ndarray, source: Optional[str] = None):
+        if numbers.dtype != np.int64 or numbers.ndim != 1:
+            raise ValueError(f"Suppression list must be a 1-d int64 array, got {numbers.dtype} {numbers.shape}")
+        self.numbers = numbers
+        self.source = source
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> 'SuppressionList':
+        """
+        Build an in-memory list from list files
+
+        Files hold one number per line in any formatting, or are CSV files with the
+        number in the first column (see ``parse_numbers``). Duplicates are dropped.
+
+        Args:
+            paths: Paths of the list files
+
+        Returns:
+            The list
+        """
+        parts = []
+        for path in paths:
+            numbers = read_numbers(path)
+            logger.info(f"Read {len(numbers):,} numbers from {path}")
+            parts.append(numbers)
+        numbers = unique_sorted(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        return cls(numbers)
+
+    @classmethod
+    def open(cls, list_path: str) -> 'SuppressionList':
+        """Memory-map a compiled list read-only"""
+        return cls(np.load(list_path, mmap_mode='r'), list_path)
+
+    @classmethod
+    def empty(cls) -> 'SuppressionList':
+        """List suppressing nothing"""
+        return cls(np.empty(0, dtype=np.int64))
+
+    def save(self, list_path: str):
+        """Write the numbers as a ``.npy`` file, replacing any previous one atomically"""
+        temp_path = f"{list_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.numbers))
+        os.replace(temp_path, list_path)
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def contains(self, numbers: np.ndarray) -> np.ndarray:
+        """
+        Which of an array of normalized 10-digit numbers are on the list
+
+        The queries are sorted first, so consecutive binary searches walk the
+        mapped pages in order instead of jumping around them.
+
+        Args:
+            numbers: int64 numbers; negative entries (no valid number) are never on it
+
+        Returns:
+            Boolean array, one entry per number
+        """
+        found = np.zeros(len(numbers), dtype=bool)
+        if not len(self.numbers) or not len(numbers):
+            return found
+        order = np.argsort(numbers, kind='stable')
+        queries = numbers[order]
+        positions = np.searchsorted(self.numbers, queries)
+        positions[positions == len(self.numbers)] = 0
+        found[order] = self.numbers[positions] == queries
+        return found
+
+
+def list_files(directory: str) -> List[str]:
+    """List files of a suppression directory, in name order"""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(SOURCE_EXTENSIONS) and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def load_suppression_list(directory: str = DEFAULT_SUPPRESSION_DIR) -> SuppressionList:
+    """
+    Load the suppression list of a directory, compiling it when needed
+
+    Every ``.txt``/``.csv`` file in the directory is part of the list. The merged
+    numbers are compiled next to the directory (``<directory>.npy``), rebuilt
+    whenever a file is added, removed or changed, then memory-mapped; each directory
+    is loaded once per process. Without the directory nothing is suppressed.
+
+    Args:
+        directory: Directory of list files (see ``SuppressionList.from_files``)
+
+    Returns:
+        The shared list
+    """
+    directory = os.path.abspath(directory)
+    with _load_lock:
+        suppression = _loaded.get(directory)
+        if suppression is not None:
+            return suppression
+
+        list_path = directory.rstrip(os.sep) + '.npy'
+        try:
+            if not os.path.isdir(directory):
+                logger.info(f"No suppression list directory {directory}, no numbers will be suppressed")
+                suppression = SuppressionList.empty()
+            else:
+                files = list_files(directory)
+                # Adding or removing a file updates the directory's own mtime
+                newest = max([os.path.getmtime(directory)] + [os.path.getmtime(path) for path in files])
+                if not os.path.exists(list_path) or os.path.getmtime(list_path) < newest:
+                    built = SuppressionList.from_files(files)
+                    built.save(list_path)
+                    logger.info(f"Compiled suppression list {list_path}: {len(built):,} numbers from {len(files)} files")
+                suppression = SuppressionList.open(list_path)
+        except (OSError, ValueError) as e:
+            # Read-only deployments can still use the lists, just without sharing the pages
+            logger.warning(f"Could not compile suppression list {list_path}, keeping it in memory: {str(e)}")
+            suppression = SuppressionList.from_files(list_files(directory))
+
+        _loaded[directory] = suppression
+        return suppression
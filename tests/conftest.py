@@ -0,0 +1,80 @@
+import os
+import sys
+import random
+
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _lead_table(rows: int, extra: str = '', distinct_phones: int = 10000) -> str:
+    """HTML page with one ``tr.lead`` row per lead; ``extra`` goes before the table"""
+    body = ''.join(
+        f'<tr class="lead"><td class="name">Lead {i}</td><td class="phone">(212) 555-{i % distinct_phones:04d}</td>'
+        f'<td class="city">city {i}</td></tr>'
+        for i in range(rows)
+    )
+    return f'<html><head><title>Leads</title></head><body>{extra}<table>{body}</table></body></html>'
+
+
+def _profile_row(profile: str, i: int, rng: random.Random) -> str:
+    """One lead of a synthetic CRM page, written the way that CRM's markup reads"""
+    first = rng.choice(['jane', 'Bob', "o'connor", 'Ann-Marie', 'Li', 'José', 'Zed'])
+    phone = rng.choice(['(%03d) %03d-%04d', '%03d.%03d.%04d', '+1 %03d %03d %04d', '%03d-%03d-%04d x12']) % (
+        rng.randint(200, 999), rng.randint(200, 999), i % 10000)
+    if profile == 'salesforce':
+        return (f'<tr class="listItem"><td class="name"><a href="/c/{i}">{first} Smith{i}</a></td>'
+                f'<td class="email"><a href="mailto:user{i}@ex.com">USER{i}@Ex.com</a></td><td class="phone">{phone}</td>'
+                f'<td class="company">Acme {i} &amp; Co</td><td data-field="Title">VP   Sales</td>'
+                f'<td class="status"> Open </td><td><script>track({i})</script><svg><path d="M0"/></svg></td></tr>')
+    if profile == 'hubspot':
+        return (f'<tr class="contact-row"><td class="name-cell"><a>{first} {i}</a></td><td class="email-cell">u{i}@hub.io</td>'
+                f'<td data-field="phone">{phone}</td><td class="company-cell">Hub{i}</td><td class="title-cell">CTO</td>'
+                f'<td data-field="hs_lead_status">NEW</td></tr>')
+    if profile == 'pipedrive':
+        return (f'<div class="person-row"><span class="person-name">{first} P{i}</span>'
+                f'<span class="email"><a href="mailto:p{i}@pd.com">p{i}@pd.com</a></span><a href="tel:{i}">{phone}</a>'
+                f'<div data-field="org_name">Org {i}</div><span class="title">Eng</span><span class="status">won</span>'
+                f'<!-- x --></div>')
+    zip_code = '' if i % 7 else f'<span class="zip">3{i:04d}</span>'
+    city = '' if i % 5 == 0 else f'<td class="city">new york {i % 9}</td>'
+    return (f'<tr class="contact-row"><td class="first-name">{first}</td><td class="last-name">doe{i}</td>'
+            f'<td class="phone">{phone}</td>{city}<td class="state">ny</td><td>{zip_code}</td></tr>')
+
+
+def _profile_page(profile: str, rows: int, seed: int = 7) -> str:
+    """Synthetic page for a profile of config/field_mappings.json"""
+    rng = random.Random(seed)
+    body = ''.join(_profile_row(profile, i, rng) for i in range(rows))
+    head = '<html><head><title>t</title><style>.a{color:red}</style><script>var big = "x";</script></head><body>'
+    if profile == 'pipedrive':
+        return f'{head}<div class="list">{body}</div></body></html>'
+    return f'{head}<table class="slds-table"><tbody>{body}</tbody></table></body></html>'
+
+
+@pytest.fixture
+def lead_table():
+    return _lead_table
+
+
+@pytest.fixture
+def field_mappings():
+    return {'first_name': '.name', 'number': '.phone', 'city': '.city'}
+
+
+@pytest.fixture
+def job_manager(tmp_path):
+    """Makes ExportJobManagers over ``tmp_path/exports`` whose threads stop after the test, so later tests can fork"""
+    from export_jobs import ExportJobManager
+
+    managers = []
+
+    def make(**kwargs):
+        kwargs.setdefault('export_dir', str(tmp_path / 'exports'))
+        managers.append(ExportJobManager(**kwargs))
+        return managers[-1]
+
+    yield make
+    for manager in managers:
+        manager._executor.shutdown(wait=True)
@@ -0,0 +1,113 @@
+import pytest
+
+import batch_sizing
+from batch_sizing import BatchSizer
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def rss(monkeypatch):
+    """Readings ``current_rss`` returns, in order; the last one repeats"""
+    readings = []
+
+    def current_rss():
+        return readings.pop(0) if len(readings) > 1 else readings[0]
+
+    monkeypatch.setattr(batch_sizing, 'current_rss', current_rss)
+    monkeypatch.setattr(batch_sizing.gc, 'collect', lambda: 0)
+    return readings
+
+
+def _sizer(rss, **kwargs):
+    rss.append(100 * MB)
+    kwargs.setdefault('memory_target_bytes', 400 * MB)
+    kwargs.setdefault('max_batch_seconds', 1e9)
+    return BatchSizer(1000, min_size=100, max_size=100000, **kwargs)
+
+
+def test_growth_is_capped_at_doubling(rss):
+    sizer = _sizer(rss)
+    assert sizer.adaptive
+    # 1 MB for 1000 containers leaves room for 400,000; the next batch only doubles
+    rss[:] = [101 * MB]
+    assert sizer.record(1000) == 2000
+    rss[:] = [102 * MB]
+    assert sizer.record(2000) == 4000
+
+
+def test_shrinks_when_over_target(rss):
+    sizer = _sizer(rss)
+    # 800 MB above the baseline for 1000 containers: half as many fit in the target
+    rss[:] = [900 * MB]
+    assert sizer.record(1000) == 500
+    # RSS keeps the peak, so the estimate stays against the largest batch
+    assert sizer.record(500) == 500
+    rss[:] = [2100 * MB]
+    assert sizer.record(500) == 200
+    rss[:] = [100000 * MB]
+    assert sizer.record(200) == 100
+
+
+def test_time_limit_bounds_the_next_batch(rss, monkeypatch):
+    sizer = _sizer(rss, max_batch_seconds=2.0)
+    clock = iter([10.0, 14.0])
+    monkeypatch.setattr(batch_sizing.time, 'perf_counter', lambda: next(clock))
+    sizer.start()
+    rss[:] = [101 * MB]
+    # 1000 containers took 4s, so 500 fit in 2s
+    assert sizer.record(1000) == 500
+
+
+def test_gc_threshold_doubles_when_collection_frees_little(rss):
+    sizer = _sizer(rss, gc_growth_bytes=100 * MB)
+    # Grew 150 MB; collecting frees only 10 MB, so that growth was not garbage
+    rss[:] = [250 * MB, 240 * MB]
+    sizer.record(1000)
+    assert sizer.batches[-1]['gc']
+    assert sizer.gc_growth_bytes == 200 * MB
+    assert sizer.batches[-1]['rss_mb'] == 240
+
+    # Growth is measured from the collected reading; 150 MB is now under the threshold
+    rss[:] = [390 * MB]
+    sizer.record(1000)
+    assert not sizer.batches[-1]['gc']
+
+    # Collecting frees most of 250 MB of growth, so the threshold stays
+    rss[:] = [490 * MB, 250 * MB]
+    sizer.record(1000)
+    assert sizer.batches[-1]['gc']
+    assert sizer.gc_growth_bytes == 200 * MB
+
+
+def test_rss_unreadable_after_collecting(rss):
+    sizer = _sizer(rss, gc_growth_bytes=100 * MB)
+    rss[:] = [250 * MB, None]
+    sizer.record(1000)
+    assert sizer.batches[-1]['gc']
+    assert sizer.batches[-1]['rss_mb'] == 250
+    assert sizer.gc_growth_bytes == 100 * MB
+
+
+def test_rss_unreadable_partway_through(rss):
+    sizer = _sizer(rss)
+    rss[:] = [101 * MB]
+    assert sizer.record(1000) == 2000
+    # /proc goes away after the sizer started; the size stays where it was
+    rss[:] = [None]
+    assert sizer.record(2000) == 2000
+    assert sizer.batches[-1]['rss_mb'] is None
+    assert sizer.summary()['peak_rss_mb'] == 101
+    rss[:] = [102 * MB]
+    assert sizer.record(2000) == 4000
+
+
+def test_fixed_size_without_rss(rss):
+    rss.append(None)
+    sizer = BatchSizer(1000, memory_target_bytes=400 * MB)
+    assert not sizer.adaptive
+    collections = []
+    for _ in range(batch_sizing.GC_EVERY_BATCHES):
+        assert sizer.record(1000) == 1000
+        collections.append(sizer.batches[-1]['gc'])
+    assert collections == [False] * (batch_sizing.GC_EVERY_BATCHES - 1) + [True]
@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import _profile_page
+from data_extractor import DataExtractor
+
+ENGINES = ['lxml', 'bs4']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('profile, selector', [
+    ('salesforce', 'tr.listItem'),
+    ('hubspot', 'tr.contact-row'),
+    ('pipedrive', 'div.person-row'),
+    ('generic', 'tr.contact-row'),
+])
+def test_detects_profile_rows(profile, selector, engine):
+    suggestions = DataExtractor().analyze_page_structure(_profile_page(profile, 50), parser=engine)
+    detected = suggestions['detected_container']
+    assert detected['selector'] == selector
+    assert detected['count'] == 50
+    assert detected['confidence'] == 1.0
+    assert suggestions['potential_containers'][0] == detected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_alternating_row_classes_stay_one_group(engine):
+    rows = ''.join(f'<tr class="row {"odd" if i % 2 else "even"}"><td>Lead {i}</td><td>555-01{i:02d}</td></tr>'
+                   for i in range(20))
+    html = f'<html><body><h1>Leads</h1><table><tbody>{rows}</tbody></table></body></html>'
+    detected = DataExtractor().analyze_page_structure(html, parser=engine)['detected_container']
+    assert (detected['selector'], detected['count']) == ('tr.row', 20)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_no_repeated_structure(engine):
+    html = ('<html><body><h1>About</h1><p>Some <b>bold</b> text</p>'
+            '<div><span>one</span></div><ul><li>only item</li></ul></body></html>')
+    assert DataExtractor().analyze_page_structure(html, parser=engine)['detected_container'] is None
@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+import soupsieve
+
+from batch_processor import BatchProcessor
+from conftest import _profile_page
+from css_selectors import Bs4Nav, compile_matcher, parse_selector
+from data_extractor import DataExtractor
+from parser_engine import get_parser_engine
+
+DOCUMENT = '''<html><body><div id="main" class="wrap">
+<table class="slds-table"><tbody>
+<tr class="listItem"><td class="name"><a href="/x">Jane  Doe</a></td><td class="email"><a href="mailto:j@x.com">j@x.com</a></td><td class="phone">(555) 123-4567</td><td data-field="Company">Acme &amp; Co</td><script>var a=1</script></tr>
+<tr class="listItem odd"><td class="name"><a>Bob</a><!-- c --></td><td><a href="MAILTO:b@y.org">b@y.org</a></td><td><a href="tel:5551234567">call</a></td></tr>
+<tr><td class="contactName">Zed</td><td data-field='Title'>CEO</td><td class="x first">q</td></tr>
+</tbody></table>
+<ul><li class="a b">1</li><li title="en-us">2</li><li>3</li><li data-x="a b">4</li></ul>
+<input type="EMAIL" name="first_name" value="v"><p></p><span>s</span><p> <!-- only a comment --> </p>
+</div></body></html>'''
+
+# The supported subset: every simple selector, attribute operator, combinator and pseudo-class
+SELECTORS = [
+    ".name a, .contactName, [data-field='Name']", "a[href^='mailto:']", ".slds-table tbody tr",
+    "tr:nth-child(2n+1) > td:not(.x)", "input[name*='first']", "h1, h2, h3", "li + li", "li ~ li",
+    "li:first-child", "li:last-child", "li:nth-child(-n+2)", "li:nth-child(even)", "li:nth-child(odd)",
+    "li:nth-child(3)", "[title|='en']", "[data-x~='b']", "input[type='email']", "input[type='email' s]",
+    "div#main > ul > li.a", "a[href^='mailto:' i]", "tr td", "td:not(.name, .email)",
+    ".listItem, .slds-table tbody tr, .x-grid3-row", "body > div", "p:empty", "li:only-child", "[data-field]",
+    "td[class$='ame']", "td[class*='ma']", "td[class='x first']", "li.a.b", "#main", "TD.NAME", "tr > *",
+    "ul li:not(:first-child)", "a[href]:not([href^='tel:'])",
+]
+
+
+def _signature(engine, element):
+    tag = element.name if engine.name == 'bs4' else element.tag
+    return f"{tag}|{engine.text(element)}"
+
+
+@pytest.fixture(scope='module')
+def documents():
+    engines = {name: get_parser_engine(name) for name in ('bs4', 'lxml')}
+    return {name: (engine, engine.parse(DOCUMENT)) for name, engine in engines.items()}
+
+
+@pytest.mark.parametrize('selector', SELECTORS)
+def test_lxml_matches_soupsieve(documents, selector):
+    bs4, soup = documents['bs4']
+    lxml, tree = documents['lxml']
+    expected = [_signature(bs4, element) for element in soupsieve.select(selector, soup)]
+    assert [_signature(lxml, element) for element in lxml.select(tree, lxml.compile(selector))] == expected
+
+    # From each container, only descendants match, as with soupsieve
+    rows = zip(soupsieve.select('tr', soup), lxml.select(tree, lxml.compile('tr')))
+    for row, lxml_row in rows:
+        expected = [_signature(bs4, element) for element in soupsieve.select(selector, row)]
+        assert [_signature(lxml, element) for element in lxml.select(lxml_row, lxml.compile(selector))] == expected
+
+
+@pytest.mark.parametrize('selector', SELECTORS)
+def test_predicates_match_soupsieve(documents, selector):
+    _, soup = documents['bs4']
+    match = compile_matcher(parse_selector(selector), Bs4Nav)
+    expected = soupsieve.select(selector, soup)
+    assert [element for element in soup.find_all(True) if match(element)] == expected
+
+
+@pytest.mark.parametrize('parser', ['bs4', 'lxml'])
+def test_first_matches_equal_select_one(documents, parser):
+    bs4, soup = documents['bs4']
+    engine, document = documents[parser]
+    compiled = [engine.compile(selector) for selector in SELECTORS]
+    matcher = engine.field_matcher(compiled)
+    assert matcher is not None
+
+    containers = engine.select(document, engine.compile('tr')) + [document]
+    references = soupsieve.select('tr', soup) + [soup]
+    for container, reference in zip(containers, references):
+        expected = [soupsieve.select_one(selector, reference) for selector in SELECTORS]
+        expected = [None if element is None else _signature(bs4, element) for element in expected]
+        found = engine.first_matches(container, compiled, matcher)
+        assert [None if element is None else _signature(engine, element) for element in found] == expected
+
+
+def _profiles():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'field_mappings.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('profile', ['salesforce', 'hubspot', 'pipedrive'])
+def test_profiles_extract_identically_on_both_engines(profile):
+    config = _profiles()[profile]
+    html = _profile_page(profile, 300)
+    extraction_config = {'container_selector': config['container_selector'], 'max_leads': 1000}
+    results = {
+        parser: DataExtractor().extract_leads(html, config['mappings'], dict(extraction_config, parser=parser))
+        for parser in ('bs4', 'lxml')
+    }
+    assert len(results['bs4']) == 300
+    assert results['lxml'] == results['bs4']
+
+
+def test_ringy_export_is_identical_on_both_engines(tmp_path):
+    config = _profiles()['ringy']
+    html = _profile_page('ringy', 1200)
+    exports = {}
+    for parser in ('bs4', 'lxml'):
+        path = tmp_path / f'{parser}.csv'
+        extraction_config = {'container_selector': config['container_selector'], 'max_leads': 100000, 'parser': parser}
+        records = BatchProcessor(500).export_large_csv(html, config['mappings'], extraction_config, {}, str(path))
+        exports[parser] = records, path.read_bytes()
+    assert exports['bs4'][0] == 1200
+    assert exports['lxml'] == exports['bs4']
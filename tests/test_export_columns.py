@@ -0,0 +1,51 @@
+import csv
+import io
+
+import pytest
+
+from batch_processor import BatchProcessor
+
+MAPPINGS = {'company': '.company', 'number': '.phone', 'first_name': '.name', 'city': '.city'}
+HEADER = ['First Name', 'Number', 'City', 'Company']
+
+# The first batch has no city at all; the second carries extraction bookkeeping keys
+BATCHES = [
+    [{'first_name': 'Ann', 'number': '2125550100', 'company': 'Acme', '_extraction_index': 0},
+     {'first_name': 'Bob', 'company': 'Initech', '_extraction_index': 1}],
+    [{'city': 'Albany', 'number': '2125550102', 'first_name': 'Cy', 'company': 'Hooli',
+      '_extraction_index': 2, '_container': '<tr>', '_selector': 'tr.lead'},
+     {'company': 'Globex', 'city': 'Troy', '_extraction_index': 3, '_source': 'page 2'}],
+]
+EXPECTED = [
+    ['Ann', '2125550100', '', 'Acme'],
+    ['Bob', '', '', 'Initech'],
+    ['Cy', '2125550102', 'Albany', 'Hooli'],
+    ['', '', 'Troy', 'Globex'],
+]
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    processor = BatchProcessor(2)
+    monkeypatch.setattr(processor, 'process_large_dataset',
+                        lambda *args, **kwargs: iter([[dict(lead) for lead in batch] for batch in BATCHES]))
+    return processor
+
+
+def _check(text):
+    assert text.startswith('\ufeff')
+    rows = list(csv.reader(io.StringIO(text[1:])))
+    assert rows[0] == HEADER
+    assert all(len(row) == len(HEADER) for row in rows)
+    assert rows[1:] == EXPECTED
+
+
+def test_file_export_keeps_columns_across_batches(processor, tmp_path):
+    path = str(tmp_path / 'leads.csv')
+    assert processor.export_large_csv('<html></html>', MAPPINGS, {}, {}, path) == 4
+    with open(path, encoding='utf-8', newline='') as f:
+        _check(f.read())
+
+
+def test_streamed_export_keeps_columns_across_batches(processor):
+    _check(b''.join(processor.stream_csv('<html></html>', MAPPINGS, {}, {})).decode('utf-8'))
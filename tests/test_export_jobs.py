@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import threading
+
+import pytest
+
+from export_jobs import ExportJob
+
+
+def _interrupted_job(manager, job_id='abc123'):
+    """Files of a job that was running when its process stopped"""
+    os.makedirs(manager.export_dir, exist_ok=True)
+    with open(manager._path(job_id, '.html'), 'w', encoding='utf-8') as f:
+        f.write('<html></html>')
+    with open(manager._path(job_id, '.args.json'), 'w', encoding='utf-8') as f:
+        json.dump([], f)
+    manager._save_state(ExportJob(job_id=job_id, status='running'))
+    return job_id
+
+
+def _export(document, output_path=None, progress_callback=None, checkpoint_path=None):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('Name\nAnn\n')
+    return output_path, 'leads.csv', 1
+
+
+def test_job_locked_by_another_process_is_not_recovered(job_manager):
+    manager = job_manager()
+    job_id = _interrupted_job(manager)
+
+    # flock conflicts between open files, so a second manager stands in for another process
+    other = job_manager()
+    lock = other._lock_job(job_id)
+    assert lock is not None
+    try:
+        assert manager.recover(_export) == []
+        assert manager.get(job_id) is None
+    finally:
+        lock.close()
+
+    assert [job.job_id for job in manager.recover(_export)] == [job_id]
+    deadline = time.time() + 10
+    while manager.get(job_id).active and time.time() < deadline:
+        time.sleep(0.02)
+    assert manager.get(job_id).status == 'done'
+
+
+def test_locked_job_does_not_run(job_manager):
+    manager = job_manager()
+    job_id = _interrupted_job(manager)
+    job = ExportJob(job_id=job_id)
+    lock = job_manager()._lock_job(job_id)
+    try:
+        manager._run(job, _export)
+    finally:
+        lock.close()
+    assert job.status == 'queued'
+    assert not os.path.exists(manager._path(job_id, '.csv'))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, job_manager):
+    """Test client whose export jobs run on a manager over ``tmp_path``; ``client.manager`` to reconfigure"""
+    import simple_app
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(simple_app, 'export_jobs_recovered', True)
+
+    def use(**kwargs):
+        manager = job_manager(**kwargs)
+        monkeypatch.setattr(simple_app, 'export_jobs', manager)
+        return manager
+
+    client = simple_app.app.test_client()
+    client.manager = use
+    use()
+    return client
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Holds each export after it reports 200 rows until the event is set, then runs the real export"""
+    import simple_app
+
+    release = threading.Event()
+    export = simple_app.write_export
+
+    def held(*args, progress_callback=None, **kwargs):
+        progress_callback(200)
+        release.wait(10)
+        return export(*args, progress_callback=progress_callback, **kwargs)
+
+    monkeypatch.setattr(simple_app, 'write_export', held)
+    yield release
+    release.set()
+
+
+def _submit(client, lead_table, field_mappings):
+    return client.post('/api/export_jobs', json={
+        'html_content': lead_table(50),
+        'field_mappings': field_mappings,
+        # Over the large export threshold, so the job goes through the batch processor
+        'extraction_config': {'container_selector': 'tr.lead', 'max_leads': 20000},
+        'export_config': {},
+        'expected_rows': 1000
+    })
+
+
+def _status(client, job_id, wanted, timeout=10):
+    deadline = time.time() + timeout
+    while True:
+        response = client.get(f'/api/export_jobs/{job_id}')
+        job = response.get_json()['job']
+        if wanted(job) or time.time() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def test_submit_poll_and_download(client, gate, lead_table, field_mappings):
+    response = _submit(client, lead_table, field_mappings)
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['job_id']
+
+    job = _status(client, job_id, lambda job: job['rows_processed'])
+    assert (job['status'], job['rows_processed'], job['expected_rows']) == ('running', 200, 1000)
+    assert job['eta_seconds'] is not None and job['eta_seconds'] >= 0
+    assert client.get(f'/api/export_jobs/{job_id}/download').status_code == 404
+
+    gate.set()
+    job = _status(client, job_id, lambda job: job['status'] != 'running')
+    assert (job['status'], job['rows_processed'], job['eta_seconds']) == ('done', 50, None)
+    assert job['download_name'] == 'crm_leads_50_records.csv'
+
+    download = client.get(f'/api/export_jobs/{job_id}/download')
+    assert download.status_code == 200
+    assert 'crm_leads_50_records.csv' in download.headers['Content-Disposition']
+    lines = download.data.decode('utf-8-sig').splitlines()
+    assert lines[0] == 'First Name,Number,City'
+    assert len(lines) == 51 and lines[1].startswith('Lead 0,')
+    download.close()
+
+
+def test_full_queue_is_refused(client, gate, lead_table, field_mappings):
+    client.manager(max_workers=1, max_queued=1)
+    assert _submit(client, lead_table, field_mappings).status_code == 202
+    assert _submit(client, lead_table, field_mappings).status_code == 202
+
+    response = _submit(client, lead_table, field_mappings)
+    assert response.status_code == 429
+    assert response.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('method, path', [
+    ('get', '/api/export_jobs/{}'),
+    ('get', '/api/export_jobs/{}/download'),
+    ('post', '/api/export_jobs/{}/resume'),
+])
+def test_unknown_job_is_not_found(client, method, path):
+    response = getattr(client, method)(path.format('0' * 32))
+    assert response.status_code == 404
+    assert response.get_json()['success'] is False
@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import subprocess
+
+import pytest
+
+from batch_processor import BatchProcessor
+
+ROWS = 2500
+BATCH_SIZE = 500
+EXTRACTION_CONFIG = {'container_selector': 'tr.lead', 'max_leads': 100000}
+# Scrubbed and deduplicated, so a resumed run must also restore the kept keys
+EXPORT_CONFIG = {'scrub_config': {'enable_scrubbing': True, 'filter_landlines': False, 'dedupe': True}}
+
+# Run in a child process, which dies without cleanup once two batches are checkpointed
+KILLED_EXPORT = '''
+import os, sys
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {tests!r})
+from conftest import _lead_table
+from batch_processor import BatchProcessor
+
+def progress(rows):
+    if rows >= 2 * {batch_size}:
+        os._exit(9)
+
+BatchProcessor({batch_size}).export_large_csv(
+    _lead_table({rows}, distinct_phones=1800), {mappings!r}, {extraction!r}, {export!r},
+    {output!r}, progress_callback=progress, checkpoint_path={checkpoint!r})
+'''
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def html(lead_table):
+    return lead_table(ROWS, distinct_phones=1800)
+
+
+@pytest.fixture
+def reference(tmp_path, html, field_mappings):
+    """Output of an uninterrupted export"""
+    path = str(tmp_path / 'reference.csv')
+    records = BatchProcessor(BATCH_SIZE).export_large_csv(html, field_mappings, EXTRACTION_CONFIG,
+                                                          EXPORT_CONFIG, path)
+    assert 0 < records < ROWS
+    return _read(path), records
+
+
+def _fail_after(monkeypatch, batches):
+    """Make extraction raise once ``batches`` batches were extracted"""
+    extract = BatchProcessor._extract_containers
+    calls = []
+
+    def failing(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) > batches:
+            raise RuntimeError("extraction failed")
+        return extract(self, *args, **kwargs)
+
+    monkeypatch.setattr(BatchProcessor, '_extract_containers', failing)
+
+
+def test_failed_export_raises_and_resumes(tmp_path, monkeypatch, html, field_mappings, reference):
+    output_path = str(tmp_path / 'export.csv')
+    checkpoint_path = str(tmp_path / 'export.checkpoint.json')
+
+    _fail_after(monkeypatch, 2)
+    with pytest.raises(RuntimeError):
+        BatchProcessor(BATCH_SIZE).export_large_csv(html, field_mappings, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                    output_path, checkpoint_path=checkpoint_path)
+    assert os.path.exists(checkpoint_path)
+    assert os.path.exists(f"{checkpoint_path}.keys")
+
+    monkeypatch.undo()
+    records = BatchProcessor(BATCH_SIZE).export_large_csv(html, field_mappings, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                          output_path, checkpoint_path=checkpoint_path)
+    assert (_read(output_path), records) == reference
+    assert not os.path.exists(checkpoint_path)
+    assert not os.path.exists(f"{checkpoint_path}.keys")
+
+
+def test_killed_export_resumes(tmp_path, html, field_mappings, reference):
+    output_path = str(tmp_path / 'export.csv')
+    checkpoint_path = str(tmp_path / 'export.checkpoint.json')
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    script = KILLED_EXPORT.format(
+        root=os.path.dirname(tests_dir), tests=tests_dir, batch_size=BATCH_SIZE, rows=ROWS,
+        mappings=field_mappings, extraction=EXTRACTION_CONFIG, export=EXPORT_CONFIG,
+        output=output_path, checkpoint=checkpoint_path
+    )
+    killed = subprocess.run([sys.executable, '-c', script], capture_output=True)
+    assert killed.returncode == 9, killed.stderr.decode()
+    assert os.path.exists(checkpoint_path)
+
+    records = BatchProcessor(BATCH_SIZE).export_large_csv(html, field_mappings, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                          output_path, checkpoint_path=checkpoint_path)
+    assert (_read(output_path), records) == reference
+
+
+def _wait(manager, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if not job.active:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Export job {job_id} did not finish")
+
+
+def test_failed_job_is_resumable(job_manager, monkeypatch, html, field_mappings, reference):
+    processor = BatchProcessor(BATCH_SIZE)
+
+    def export(document, mappings, output_path=None, progress_callback=None, checkpoint_path=None):
+        records = processor.export_large_csv(document, mappings, EXTRACTION_CONFIG, EXPORT_CONFIG, output_path,
+                                             progress_callback=progress_callback, checkpoint_path=checkpoint_path)
+        return output_path, 'leads.csv', records
+
+    manager = job_manager(max_workers=1)
+    _fail_after(monkeypatch, 2)
+    job = _wait(manager, manager.submit(export, html, field_mappings).job_id)
+    assert job.status == 'failed'
+    assert os.path.exists(manager._path(job.job_id, '.checkpoint.json'))
+
+    monkeypatch.undo()
+    assert manager.resume(job.job_id) is not None
+    job = _wait(manager, job.job_id)
+    assert job.status == 'done'
+    assert (_read(job.file_path), job.rows_processed) == reference
+
+
+def test_checkpoint_of_other_document_is_not_resumed(tmp_path, monkeypatch, html, field_mappings, reference):
+    output_path = str(tmp_path / 'export.csv')
+    checkpoint_path = str(tmp_path / 'export.checkpoint.json')
+    # Same length as ``html``, different leads
+    other = html.replace('Lead 1', 'Dead 1')
+    assert len(other) == len(html) and other != html
+
+    _fail_after(monkeypatch, 2)
+    with pytest.raises(RuntimeError):
+        BatchProcessor(BATCH_SIZE).export_large_csv(other, field_mappings, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                    output_path, checkpoint_path=checkpoint_path)
+
+    monkeypatch.undo()
+    records = BatchProcessor(BATCH_SIZE).export_large_csv(html, field_mappings, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                          output_path, checkpoint_path=checkpoint_path)
+    assert (_read(output_path), records) == reference
+
+
+def test_checkpoint_of_other_field_order_is_not_resumed(tmp_path, monkeypatch, html, field_mappings):
+    output_path = str(tmp_path / 'export.csv')
+    checkpoint_path = str(tmp_path / 'export.checkpoint.json')
+    # Fields outside PREFERRED_ORDER are written in mapping order
+    field_mappings = dict(field_mappings, town='.city', label='.name')
+    reordered = dict(reversed(list(field_mappings.items())))
+    reference_path = str(tmp_path / 'reference.csv')
+    expected = BatchProcessor(BATCH_SIZE).export_large_csv(html, reordered, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                           reference_path)
+
+    _fail_after(monkeypatch, 2)
+    with pytest.raises(RuntimeError):
+        BatchProcessor(BATCH_SIZE).export_large_csv(html, field_mappings, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                    output_path, checkpoint_path=checkpoint_path)
+
+    monkeypatch.undo()
+    records = BatchProcessor(BATCH_SIZE).export_large_csv(html, reordered, EXTRACTION_CONFIG, EXPORT_CONFIG,
+                                                          output_path, checkpoint_path=checkpoint_path)
+    assert (_read(output_path), records) == (_read(reference_path), expected)
@@ -0,0 +1,72 @@
+import pytest
+
+from extraction_plan import ExtractionPlanCache
+from parser_engine import get_parser_engine
+
+MAPPINGS = {'first_name': '.name', 'number': '.phone', 'email': {'selector': 'a.mail', 'attribute': 'href'}}
+
+
+def _clean(value, field_type):
+    return value
+
+
+@pytest.fixture
+def cache():
+    return ExtractionPlanCache(maxsize=3)
+
+
+def _plan(cache, mappings=MAPPINGS, engine='lxml', container='tr.lead'):
+    return cache.get_plan(mappings, get_parser_engine(engine), _clean, 'DataExtractor', container)
+
+
+def test_identical_mapping_hits(cache):
+    plan = _plan(cache)
+    # An equal mapping built separately, as each request builds its own
+    assert _plan(cache, {key: (dict(value) if isinstance(value, dict) else value)
+                         for key, value in MAPPINGS.items()}) is plan
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [field.name for field in plan.fields] == list(MAPPINGS)
+    assert plan.fields[2].attribute == 'href'
+
+
+@pytest.mark.parametrize('change', [
+    {'container': 'div.lead'},
+    {'container': None},
+    {'engine': 'bs4'},
+    {'mappings': dict(reversed(list(MAPPINGS.items())))},
+    {'mappings': dict(MAPPINGS, number='.tel')},
+    {'mappings': dict(MAPPINGS, email={'selector': 'a.mail', 'attribute': 'title'})},
+])
+def test_changed_inputs_miss(cache, change):
+    plan = _plan(cache)
+    other = _plan(cache, **change)
+    assert other is not plan
+    assert (cache.hits, cache.misses) == (0, 2)
+    if 'mappings' in change:
+        assert [field.name for field in other.fields] == list(change['mappings'])
+
+
+def test_profiles_do_not_share_plans(cache):
+    engine = get_parser_engine('lxml')
+    plan = cache.get_plan(MAPPINGS, engine, _clean, 'DataExtractor')
+    assert cache.get_plan(MAPPINGS, engine, _clean, 'BatchProcessor') is not plan
+
+
+def test_least_recently_used_plan_is_evicted(cache):
+    plans = [_plan(cache, container=f'tr.lead{i}') for i in range(3)]
+    # Using the oldest makes the second the least recently used
+    assert _plan(cache, container='tr.lead0') is plans[0]
+    _plan(cache, container='tr.lead3')
+    assert len(cache._plans) == 3
+
+    assert _plan(cache, container='tr.lead0') is plans[0]
+    assert _plan(cache, container='tr.lead2') is plans[2]
+    assert _plan(cache, container='tr.lead1') is not plans[1]
+    assert cache.misses == 5
+
+
+def test_clear(cache):
+    plan = _plan(cache)
+    cache.clear()
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert _plan(cache) is not plan
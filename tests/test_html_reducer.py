@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+from data_extractor import DataExtractor
+from html_reducer import HTMLReducer, reduce_for_extraction
+
+ROWS = '''
+<table>
+  <tr class="lead"><td class="name" title="tip: use <!-- to comment">Ann</td><td class="phone">2125550100</td></tr>
+  <tr class="lead"><td class="name" data-tip="<script> tags">Bob</td><td class="phone">2125550101</td></tr>
+  <tr class="lead"><td class="name" title='a > b'>Cat</td><td class="phone">2125550102</td></tr>
+  <tr class="lead"><td class="name">Dan</td><td class="phone">2125550103</td></tr><!-- end -->
+  <tr class="lead"><td class="name">Eve</td><td class="phone">2125550104</td></tr>
+  <tr class="lead"><td class="name">Fay</td><td class="phone">2125550105</td></tr>
+</table>
+<script>track("</td>")</script>
+'''
+PAGE = f'<html><head><title>Leads</title></head><body>{ROWS}</body></html>'
+MAPPINGS = {'name': '.name', 'phone': '.phone'}
+
+
+@pytest.mark.parametrize('parser', ['lxml', 'bs4'])
+def test_openers_inside_attribute_values_are_not_regions(parser):
+    config = {'container_selector': 'tr.lead', 'parser': parser}
+    extractor = DataExtractor()
+    baseline = extractor.extract_leads(PAGE, MAPPINGS, dict(config, reduce_html=False))
+    assert len(baseline) == 6
+    assert extractor.extract_leads(PAGE, MAPPINGS, config) == baseline
+
+
+def test_reduction_keeps_tags_with_quoted_openers():
+    reduced, stats = HTMLReducer().reduce(PAGE)
+    assert 'title="tip: use <!-- to comment">Ann' in reduced
+    assert 'data-tip="<script> tags">Bob' in reduced
+    assert '<!---->' in reduced and '<!-- end -->' not in reduced
+    assert '<script></script>' in reduced
+    assert stats['removed_by_type']['comment'] == len('<!-- end -->') - len('<!---->')
+
+
+def test_head_and_svg_end_tags_inside_attributes_and_scripts():
+    page = ('<html><head><meta content="</head>"><script>var s = "</head>";</script></head>'
+            '<body><svg><title>icon</title><path d="</svg>"/><svg></svg></svg><p class="x">kept</p></body></html>')
+    reduced, _ = HTMLReducer(strip_svg=True, trim_head=True).reduce(page)
+    assert reduced == '<html><head></head><body><svg></svg><p class="x">kept</p></body></html>'
+
+
+def _plan(*selectors):
+    return SimpleNamespace(fields=[SimpleNamespace(selector=selector, attribute='text') for selector in selectors])
+
+
+@pytest.mark.parametrize('selector', ['.style-name', '[data-style]', 'td.script', '#style', 'div.scripted > span'])
+def test_class_and_attribute_names_keep_reduction(selector):
+    assert reduce_for_extraction(PAGE, {}, _plan(selector)) != PAGE
+
+
+@pytest.mark.parametrize('selector', ['script', 'td > style', 'div script[type]', 'p, SCRIPT', 'td:not(style)',
+                                      'div:has(script)'])
+def test_script_and_style_type_selectors_skip_reduction(selector):
+    assert reduce_for_extraction(PAGE, {}, _plan(selector)) == PAGE
@@ -0,0 +1,72 @@
+import re
+import random
+
+import pytest
+
+from keyword_matcher import KeywordMatcher, compile_keywords
+from lead_scrubber import LeadScrubber
+
+
+def _reference(keywords, texts):
+    """Earliest-listed keyword occurring in any lowercased text, one case-insensitive search per keyword"""
+    lowered = [text.lower() for text in texts]
+    return next((keyword for keyword in keywords
+                 if keyword and any(re.search(re.escape(keyword), text, re.IGNORECASE) for text in lowered)), None)
+
+
+@pytest.mark.parametrize('keywords, texts, expected', [
+    (['lawsuit', 'attorney'], ['Spoke to an attorney about the lawsuit'], 'lawsuit'),
+    (['attorney', 'lawsuit'], ['Spoke to an attorney about the lawsuit'], 'attorney'),
+    (['law', 'lawsuit'], ['LAWSUIT pending'], 'law'),
+    (['lawsuit', 'law'], ['LAWSUIT pending'], 'lawsuit'),
+    (['sue', 'lawyer'], ['no notes', 'call my Lawyer'], 'lawyer'),
+    (['Lawyer', 'lawyer'], ['lawyer'], 'Lawyer'),
+    (['sue', 'lawyer'], ['warm lead'], None),
+    ([], ['anything'], None),
+])
+def test_earliest_listed_keyword_wins(keywords, texts, expected):
+    assert KeywordMatcher(keywords).first_keyword(texts) == expected
+
+
+def test_metacharacters_match_literally():
+    keywords = ['c++', 'a.b', '(x)', 'what?', '[tcpa]', 'a|b', '\\d', '$5']
+    matcher = KeywordMatcher(keywords)
+    assert matcher.first_keyword(['C++ developer']) == 'c++'
+    assert matcher.first_keyword(['axb', 'x', 'wha', 'tcpa', 'a', 'b', '5', 'd']) is None
+    assert matcher.first_keyword(['saw (X) here']) == '(x)'
+    assert matcher.first_keyword(['so what?']) == 'what?'
+    assert matcher.first_keyword(['see [TCPA] claim']) == '[tcpa]'
+    assert matcher.first_keyword(['a|b']) == 'a|b'
+    assert matcher.first_keyword(['\\D']) == '\\d'
+    assert matcher.first_keyword(['owes $5']) == '$5'
+
+
+def test_matches_per_keyword_search():
+    rng = random.Random(5)
+    alphabet = 'abcdel .+ÉéıK'
+    for _ in range(2000):
+        keywords = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        texts = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))) for _ in range(rng.randint(1, 3))]
+        assert KeywordMatcher(keywords).first_keyword(texts) == _reference(keywords, texts), (keywords, texts)
+
+
+def test_custom_keyword_lists_get_their_own_matcher():
+    compile_keywords.cache_clear()
+    scrubber = LeadScrubber()
+    default = scrubber.litigation_matcher()
+    assert scrubber.litigation_matcher() is default
+
+    keywords = ['refund']
+    custom = scrubber.litigation_matcher(keywords)
+    assert custom is not default
+    assert scrubber.litigation_matcher(['refund']) is custom
+    # The list is copied into the cache key, so changing it later compiles a new matcher
+    keywords.append('chargeback')
+    assert scrubber.litigation_matcher(keywords).first_keyword(['chargeback filed']) == 'chargeback'
+    assert custom.first_keyword(['chargeback filed']) is None
+    assert scrubber.litigation_matcher([]).first_keyword(['lawsuit']) is None
+
+    leads = [{'notes': 'wants a refund'}, {'notes': 'pending lawsuit'}]
+    config = {'filter_litigation': True, 'filter_landlines': False, 'filter_suppressed': False}
+    assert scrubber.scrub_leads(leads, dict(config, litigation_keywords=['refund']))['clean_leads'] == leads[1:]
+    assert scrubber.scrub_leads(leads, config)['clean_leads'] == leads[:1]
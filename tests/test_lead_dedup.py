@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from batch_processor import BatchProcessor
+from lead_dedup import NO_KEY, DeliveryHistory, LeadDeduplicator, lead_keys
+from lead_scrubber import LeadScrubber
+
+SPELLINGS = ['(212) 555-0100', '212.555.0100', '212 555 0100', '+1 212 555 0100', '12125550100']
+
+
+@pytest.fixture
+def scrubber(tmp_path):
+    return LeadScrubber(history_path=str(tmp_path / 'history.db'))
+
+
+def _numbers(scrubber, phones):
+    return scrubber.classify_phones(phones, return_numbers=True)[1]
+
+
+def test_spellings_of_a_number_share_a_key(scrubber):
+    keys = lead_keys(_numbers(scrubber, SPELLINGS + ['', 'n/a']))
+    assert keys[:len(SPELLINGS)].tolist() == [2125550100] * len(SPELLINGS)
+    assert keys[len(SPELLINGS):].tolist() == [NO_KEY, NO_KEY]
+
+    leads = [{'number': phone} for phone in SPELLINGS]
+    result = scrubber.scrub_leads(leads, {'filter_landlines': False, 'filter_suppressed': False, 'dedupe': True})
+    assert result['clean_leads'] == leads[:1]
+    assert result['stats']['filtered_duplicates'] == len(SPELLINGS) - 1
+
+
+def test_email_keys(scrubber):
+    numbers = _numbers(scrubber, ['(212) 555-0100'] * 4 + [''])
+    keys = lead_keys(numbers, ['a@ex.com', ' A@Ex.com ', 'b@ex.com', None, 'a@ex.com']).tolist()
+    assert keys[0] == keys[1]
+    assert len({keys[0], keys[2], keys[3]}) == 3
+    assert keys[3] == 2125550100
+    assert keys[4] == NO_KEY
+    assert all(key >= 0 for key in keys[:4])
+    # Stored in the history, so the same in every process and run
+    assert keys == lead_keys(numbers, ['a@ex.com', ' A@Ex.com ', 'b@ex.com', None, 'a@ex.com']).tolist()
+
+
+def test_history_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'history.db')
+    DeliveryHistory(path).record([1, 2, 3])
+    history = DeliveryHistory(path)
+    assert len(history) == 3
+    assert history.delivered([2, 3, 4]) == {2, 3}
+    assert history.delivered(list(range(2000))) == {1, 2, 3}
+
+
+def test_uncommitted_keys_are_not_delivered(tmp_path):
+    history = DeliveryHistory(str(tmp_path / 'history.db'))
+    deduplicator = LeadDeduplicator(history)
+    keys = np.array([5, 6, 5, NO_KEY], dtype=np.int64)
+    assert deduplicator.check(keys, np.ones(4, dtype=bool)).tolist() == [0, 0, 1, 0]
+    assert history.delivered([5, 6]) == set()
+
+    deduplicator.commit()
+    assert history.delivered([5, 6]) == {5, 6}
+    later = LeadDeduplicator(history)
+    assert later.check(np.array([6, 7], dtype=np.int64), np.ones(2, dtype=bool)).tolist() == [2, 0]
+
+
+def test_persist_and_restore(tmp_path):
+    path = str(tmp_path / 'export.keys')
+    deduplicator = LeadDeduplicator()
+    deduplicator.check(np.array([1, 2], dtype=np.int64), np.ones(2, dtype=bool))
+    size = deduplicator.persist(path)
+    # Kept after the checkpoint, so a restart must forget them
+    deduplicator.check(np.array([3], dtype=np.int64), np.ones(1, dtype=bool))
+    deduplicator.persist(path)
+
+    restored = LeadDeduplicator()
+    restored.restore(path, size)
+    assert restored.seen == {1, 2}
+    assert restored.check(np.array([2, 3], dtype=np.int64), np.ones(2, dtype=bool)).tolist() == [1, 0]
+
+
+def test_resumed_export_records_history_once(tmp_path, monkeypatch, lead_table, field_mappings):
+    html = lead_table(2500, distinct_phones=1800)
+    extraction_config = {'container_selector': 'tr.lead', 'max_leads': 100000}
+    export_config = {'scrub_config': {'enable_scrubbing': True, 'filter_landlines': False,
+                                      'dedupe': True, 'dedupe_history': True}}
+    output_path = str(tmp_path / 'export.csv')
+    checkpoint_path = str(tmp_path / 'export.checkpoint.json')
+    history_path = str(tmp_path / 'history.db')
+
+    def processor():
+        batch_processor = BatchProcessor(500)
+        batch_processor.lead_scrubber = LeadScrubber(history_path=history_path)
+        return batch_processor
+
+    extract = BatchProcessor._extract_containers
+    calls = []
+
+    def failing(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) > 2:
+            raise RuntimeError("extraction failed")
+        return extract(self, *args, **kwargs)
+
+    monkeypatch.setattr(BatchProcessor, '_extract_containers', failing)
+    with pytest.raises(RuntimeError):
+        processor().export_large_csv(html, field_mappings, extraction_config, export_config, output_path,
+                                     checkpoint_path=checkpoint_path)
+    # Two batches were written, but a failed export delivers nothing
+    assert len(DeliveryHistory(history_path)) == 0
+
+    monkeypatch.undo()
+    records = processor().export_large_csv(html, field_mappings, extraction_config, export_config, output_path,
+                                           checkpoint_path=checkpoint_path)
+    assert records == 1800
+    assert len(DeliveryHistory(history_path)) == 1800
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+import npa_nxx_index
+from npa_nxx_index import (DEFAULT_PREFIX_FILE, INDEX_SIZE, LANDLINE, TOLL_FREE, VOIP, NpaNxxIndex,
+                           load_prefix_index)
+
+# The sets LeadScrubber hardcoded before the prefix list moved to config/npa_nxx_prefixes.csv
+BASELINE_LANDLINE_PREFIXES = {
+    "205-222", "205-333", "212-222", "305-222", "407-222", "415-222", "713-222",
+    "312-222", "404-222", "503-222", "602-222", "702-222", "818-222", "919-222",
+    "646-346", "718-455", "718-599", "914-220", "310-454", "212-555", "917-324", "516-466",
+    "847-555", "630-620", "773-522", "312-698", "708-682", "815-759", "847-329",
+    "203-234", "315-448", "518-474", "570-387", "631-444", "716-848", "718-422", "845-334",
+    "860-486", "914-255", "978-658", "212-970", "214-220", "312-906", "512-465", "713-465",
+    "972-465", "202-785", "305-810", "407-814", "504-861", "602-627", "702-486", "808-586"
+}
+BASELINE_TOLL_FREE_PREFIXES = {"800", "888", "877", "866", "855", "844", "833", "822"}
+BASELINE_VOIP_AREA_CODES = {"347", "646", "650", "678", "702", "704", "716", "818", "919"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_loads(monkeypatch):
+    """Each test loads its lists from disk rather than this process's earlier loads"""
+    monkeypatch.setattr(npa_nxx_index, '_loaded', {})
+
+
+def _codes(flags: np.ndarray, bit: int):
+    return {f"{code // 1000:03d}-{code % 1000:03d}" for code in np.flatnonzero(flags & bit).tolist()}
+
+
+def test_wildcard_and_blank_nxx_cover_the_area_code(tmp_path):
+    source = tmp_path / 'prefixes.csv'
+    source.write_text('npa,nxx,type\n'
+                      '800,*,toll_free\n'
+                      '347,,voip\n'
+                      '347,222,landline\n'
+                      '212,555,LANDLINE\n'
+                      '1000,1,landline\n'
+                      '212,555,fax\n')
+    index = NpaNxxIndex.from_csv(str(source))
+    assert index.lookup(800000) == index.lookup(800999) == TOLL_FREE
+    assert index.lookup(799999) == index.lookup(801000) == 0
+    assert index.count(TOLL_FREE) == index.count(VOIP) == 1000
+    assert index.lookup(347222) == VOIP | LANDLINE
+    assert index.lookup(212555) == LANDLINE
+    assert index.count(LANDLINE) == 2
+    assert index.lookup_codes(np.array([800123, 347001, 212555, 0])).tolist() == [TOLL_FREE, VOIP, LANDLINE, 0]
+
+
+def test_compiled_index_is_rebuilt_when_the_list_changes(tmp_path):
+    source = tmp_path / 'prefixes.csv'
+    source.write_text('npa,nxx,type\n212,555,landline\n')
+    compiled = str(tmp_path / 'prefixes.bin')
+
+    index = load_prefix_index(str(source))
+    assert isinstance(index.flags, np.memmap)
+    assert os.path.getsize(compiled) == INDEX_SIZE
+    assert index.lookup(212555) == LANDLINE
+    assert load_prefix_index(str(source)) is index
+
+    source.write_text('npa,nxx,type\n212,556,landline\n')
+    stamp = os.path.getmtime(compiled) + 10
+    os.utime(source, (stamp, stamp))
+    npa_nxx_index._loaded.clear()
+    index = load_prefix_index(str(source))
+    assert (index.lookup(212555), index.lookup(212556)) == (0, LANDLINE)
+
+    # A truncated compile is rebuilt even though it is newer than the list
+    with open(compiled, 'r+b') as f:
+        f.truncate(10)
+    npa_nxx_index._loaded.clear()
+    assert load_prefix_index(str(source)).lookup(212556) == LANDLINE
+    assert os.path.getsize(compiled) == INDEX_SIZE
+
+
+def test_missing_list_classifies_nothing(tmp_path):
+    assert load_prefix_index(str(tmp_path / 'missing.csv')).count(LANDLINE | TOLL_FREE | VOIP) == 0
+
+
+def test_shipped_list_matches_the_baseline_sets():
+    flags = np.asarray(NpaNxxIndex.from_csv(DEFAULT_PREFIX_FILE).flags)
+    assert _codes(flags, LANDLINE) == BASELINE_LANDLINE_PREFIXES
+    assert _codes(flags, TOLL_FREE) == {f"{npa}-{nxx:03d}" for npa in BASELINE_TOLL_FREE_PREFIXES
+                                        for nxx in range(1000)}
+    assert _codes(flags, VOIP) == {f"{npa}-{nxx:03d}" for npa in BASELINE_VOIP_AREA_CODES for nxx in range(1000)}
@@ -0,0 +1,87 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import _lead_table, _profile_page
+from data_extractor import CONTAINER_PATTERNS, FIELD_PATTERNS, DataExtractor
+from html_reducer import reduce_for_extraction
+from parser_engine import get_parser_engine
+
+ENGINES = ['lxml', 'bs4']
+
+# Every pattern kind the profiles lack: forms, inputs, mailto/tel links, headings, lists, data-lead rows
+MIXED_PAGE = '''<html><body>
+<h1>Leads</h1><h2>West</h2>
+<form><input type="email" value="a@b.co"><input type="tel" value="555"></form>
+<ul><li class="item entry">one</li><li class="item entry">two</li></ul><ol><li class="row">x</li><li class="row">y</li></ol>
+<div data-lead="1" class="lead"><span class="contact-name">Ann</span><a href="mailto:ann@x.io">ann@x.io</a>
+  <a href="tel:2125550100">(212) 555-0100</a><span class="organization">Org</span></div>
+<div data-lead="2" class="lead"><span data-field="name">Bob</span><span data-field="email">bob@x.io</span>
+  <span data-field="company">Initech</span><span class="company-name">Initech</span></div>
+<table><tr class="contact record"><td>1</td></tr><tr class="contact record"><td>2</td></tr></table>
+<div data-contact="a"></div><div data-contact="b"></div>
+</body></html>'''
+
+PAGES = {
+    **{profile: _profile_page(profile, 30) for profile in ['salesforce', 'hubspot', 'pipedrive', 'generic']},
+    'mixed': MIXED_PAGE,
+    'no data attributes': _lead_table(30),
+}
+
+
+def old_analysis(html, parser):
+    """analyze_page_structure before the single traversal: one select per pattern"""
+    engine = get_parser_engine(parser)
+    document = engine.parse(reduce_for_extraction(html, {}))
+
+    def select(pattern):
+        return engine.select(document, engine.compile(pattern))
+
+    containers = []
+    for pattern in CONTAINER_PATTERNS:
+        elements = select(pattern)
+        if len(elements) > 1:
+            containers.append({'selector': pattern, 'count': len(elements),
+                               'sample_text': engine.text(elements[0])[:100]})
+    field_suggestions = {}
+    for field_type, patterns in FIELD_PATTERNS.items():
+        found = [{'selector': pattern, 'count': len(elements), 'sample_value': engine.text(elements[0])[:50]}
+                 for pattern in patterns for elements in [select(pattern)] if elements]
+        if found:
+            field_suggestions[field_type] = found
+    # '[data-*]' is not a selector (it made every old call fail), so data attributes are found by name
+    soup = BeautifulSoup(reduce_for_extraction(html, {}), 'html.parser')
+    analysis = {
+        'total_elements': len(select('*')),
+        'forms': len(select('form')),
+        'tables': len(select('table')),
+        'lists': len(select('ul, ol')),
+        'has_data_attributes': soup.find(lambda tag: any(name.startswith('data-') for name in tag.attrs)) is not None
+    }
+    return containers, field_suggestions, analysis
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('page', list(PAGES))
+def test_matches_per_pattern_selects(page, engine):
+    containers, field_suggestions, analysis = old_analysis(PAGES[page], engine)
+    suggestions = DataExtractor().analyze_page_structure(PAGES[page], parser=engine)
+    assert 'error' not in suggestions
+    assert suggestions['field_suggestions'] == field_suggestions
+    assert suggestions['analysis'] == analysis
+
+    # The detected container leads the list in place of its pattern entry
+    detected = suggestions['detected_container']
+    skipped = detected['selector'] if detected else None
+    offset = 1 if detected else 0
+    assert suggestions['potential_containers'][offset:] == [entry for entry in containers
+                                                            if entry['selector'] != skipped]
+
+
+def test_pages_cover_the_patterns():
+    covered = set()
+    for page in PAGES.values():
+        _, field_suggestions, analysis = old_analysis(page, 'lxml')
+        covered.update(entry['selector'] for found in field_suggestions.values() for entry in found)
+    assert covered == {pattern for patterns in FIELD_PATTERNS.values() for pattern in patterns}
+    assert not old_analysis(PAGES['no data attributes'], 'lxml')[2]['has_data_attributes']
+    assert old_analysis(PAGES['mixed'], 'lxml')[2]['forms'] == 1
@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pytest
+
+import lead_scrubber
+from lead_scrubber import PHONE_REASONS, LeadScrubber
+from npa_nxx_index import LANDLINE, TOLL_FREE, VOIP
+
+CHUNK_SIZE = 64
+
+SPELLINGS = ['{npa}{nxx}{line}', '({npa}) {nxx}-{line}', '{npa}.{nxx}.{line}', '{npa}-{nxx}-{line}',
+             '1{npa}{nxx}{line}', '+1 {npa} {nxx} {line}', '+1 ({npa}) {nxx}-{line}', '1-{npa}-{nxx}-{line}',
+             ' {npa} {nxx}\t{line} ']
+
+ODD_INPUTS = [
+    # Too short or too long, or 11 digits without the US country code
+    '', ' ', '555-0100', '212-555-010', '212-555-01000', '+44 20 7946 0958', '22125550100', '+2 212 555 0100',
+    # Extensions
+    '(212) 555-0100 x12', '212-555-0100 ext 4', '212.555.0100X',
+    # Not numbers at all
+    'n/a', 'call me', 'tel:', None, 2125550100, 12.5, ['212-555-0100'],
+    # Digits in other scripts go through the per-number path
+    '２１２５５５０１００', '٢١٢٥٥٥٠١٠٠', '(212) 555-0100 ☎',
+]
+
+
+@pytest.fixture(scope='module')
+def scrubber():
+    return LeadScrubber()
+
+
+@pytest.fixture(scope='module')
+def prefixes(scrubber):
+    """A few NPA-NXX codes of every class in the shipped list"""
+    codes = np.arange(200000, 1000000)
+    flags = scrubber.prefix_index.lookup_codes(codes)
+    picked = []
+    for mask in [flags == 0, (flags & LANDLINE) != 0, (flags & TOLL_FREE) != 0, (flags & VOIP) != 0]:
+        found = codes[mask]
+        assert len(found)
+        picked += found[np.linspace(0, len(found) - 1, 8).astype(int)].tolist()
+    return picked
+
+
+def _phones(prefixes, count, seed):
+    rng = random.Random(seed)
+    phones = []
+    for _ in range(count):
+        code = rng.choice(prefixes)
+        phone = rng.choice(SPELLINGS).format(npa=code // 1000, nxx=f'{code % 1000:03d}', line=f'{rng.randint(0, 9999):04d}')
+        phones.append(phone if rng.random() > 0.15 else rng.choice(ODD_INPUTS))
+    return phones
+
+
+def _expected(scrubber, phones):
+    codes = [PHONE_REASONS.index(scrubber.is_landline_or_unwanted(phone)[1]) for phone in phones]
+    numbers = [scrubber.normalized_number(phone) for phone in phones]
+    return codes, [-1 if number is None else number for number in numbers]
+
+
+@pytest.mark.parametrize('count', [CHUNK_SIZE // 2, CHUNK_SIZE * 5 + 3])
+def test_matches_is_landline_or_unwanted(scrubber, prefixes, monkeypatch, count):
+    monkeypatch.setattr(lead_scrubber, 'CLASSIFY_CHUNK_SIZE', CHUNK_SIZE)
+    phones = _phones(prefixes, count, seed=count)
+    codes, numbers = scrubber.classify_phones(phones, return_numbers=True)
+    assert (codes.tolist(), numbers.tolist()) == _expected(scrubber, phones)
+    assert scrubber.classify_phones(np.array(phones, dtype=object)).tolist() == codes.tolist()
+
+
+def test_every_outcome_is_covered(scrubber, prefixes):
+    phones = _phones(prefixes, CHUNK_SIZE * 5 + 3, seed=CHUNK_SIZE * 5 + 3) + ODD_INPUTS
+    assert set(scrubber.classify_phones(phones).tolist()) == set(range(len(PHONE_REASONS)))
+
+
+@pytest.mark.parametrize('phones', [[], ODD_INPUTS, ['+1 212 555 0100'] * (CHUNK_SIZE + 1)])
+def test_edge_lists_match(scrubber, monkeypatch, phones):
+    monkeypatch.setattr(lead_scrubber, 'CLASSIFY_CHUNK_SIZE', CHUNK_SIZE)
+    codes, numbers = scrubber.classify_phones(phones, return_numbers=True)
+    assert (codes.tolist(), numbers.tolist()) == _expected(scrubber, phones)
@@ -0,0 +1,93 @@
+import re
+
+import pytest
+
+from csv_exporter import CSVExporter
+from data_extractor import DataExtractor
+from lead_scrubber import LeadScrubber
+from phone_utils import normalize_phone
+
+
+# The three parsers normalize_phone replaced, as they were written before it
+def old_clean_phone_number(number):
+    """LeadScrubber.clean_phone_number"""
+    if not number or not isinstance(number, str):
+        return None, None
+    if "x" in number.lower() or "ext" in number.lower():
+        return None, None
+    cleaned = re.sub(r"[^\d]", "", number)
+    if len(cleaned) == 10:
+        return f"{cleaned[:3]}-{cleaned[3:6]}", cleaned[:3]
+    elif len(cleaned) == 11 and cleaned.startswith("1"):
+        return f"{cleaned[1:4]}-{cleaned[4:7]}", cleaned[1:4]
+    return None, None
+
+
+def old_extracted_phone(value):
+    """DataExtractor._clean_field_value for phone fields"""
+    phone = re.sub(r'[^\d\+\-\(\)\s]', '', value)
+    phone = re.sub(r'\s+', ' ', phone).strip()
+    if re.match(r'^[\+]?[1-9][\d\s\-\(\)]{7,15}$', phone):
+        return phone
+    return None
+
+
+def old_format_phone(phone):
+    """CSVExporter._format_phone"""
+    digits_only = re.sub(r'[^\d\+]', '', str(phone))
+    if len(digits_only) == 10 and digits_only.isdigit():
+        return f"({digits_only[:3]}) {digits_only[3:6]}-{digits_only[6:]}"
+    elif len(digits_only) == 11 and digits_only.startswith('1'):
+        return f"+1 ({digits_only[1:4]}) {digits_only[4:7]}-{digits_only[7:]}"
+    return phone
+
+
+PHONES = [
+    # Plain 10-digit numbers in common spellings
+    '2125550100', '(212) 555-0100', '212.555.0100', '212-555-0100', ' 212  555\t0100 ',
+    # Leading 1 and +1
+    '12125550100', '1 (212) 555-0100', '1-212-555-0100', '+1 212 555 0100', '+1 (212) 555-0100', '+12125550100',
+    # 11 digits not starting with 1
+    '22125550100', '+2 212 555 0100',
+    # Extensions, with and without their digits changing the length
+    '(212) 555-0100 x12', '212-555-0100 ext 4', '212-555-0100 EXT. 4', '212.555.0100X', '212-555-0100 x',
+    'ext', '(212) 555-010 x1',
+    # Too short or too long
+    '', ' ', '555-0100', '212-555-010', '212-555-01000', '1-212-555-01000', '+44 20 7946 0958', '0123456789',
+    # Not numbers, or numbers in other scripts
+    'n/a', 'call me', 'tel: 212 555 0100', '２１２５５５０１００', '٢١٢٥٥٥٠١٠٠',
+]
+
+
+@pytest.mark.parametrize('phone', PHONES)
+def test_scrubber_matches_old_clean_phone_number(phone):
+    scrubber = LeadScrubber()
+    expected = old_clean_phone_number(phone)
+    assert scrubber.clean_phone_number(phone) == expected
+    assert scrubber.normalized_number(phone) == (int(re.sub(r'\D', '', phone)[-10:]) if expected[0] else None)
+
+
+@pytest.mark.parametrize('phone', PHONES)
+def test_extractor_matches_old_phone_cleaning(phone):
+    assert DataExtractor()._clean_field_value(phone, 'phone') == old_extracted_phone(phone)
+
+
+@pytest.mark.parametrize('phone', [phone for phone in PHONES if '+' not in phone])
+def test_exporter_matches_old_formatting(phone):
+    assert CSVExporter()._format_phone(phone) == (old_format_phone(phone) if phone else '')
+
+
+def test_exporter_formats_numbers_written_with_plus():
+    # The old formatter kept the '+' among the digits, so these were left as written
+    assert CSVExporter()._format_phone('+1 951 737 1126') == '+1 (951) 737-1126'
+    assert CSVExporter()._format_phone('+44 20 7946 0958') == '+44 20 7946 0958'
+
+
+def test_records_are_shared():
+    normalize_phone.cache_clear()
+    first = normalize_phone('(212) 555-0100')
+    assert normalize_phone('(212) 555-0100') is first
+    assert normalize_phone.cache_info().hits == 1
+    assert (first.number, first.prefix, first.npa, first.nxx) == ('2125550100', '212-555', '212', '555')
+    assert first.display == '(212) 555-0100'
+    assert normalize_phone('+1 212 555 0100').display == '+1 (212) 555-0100'
@@ -0,0 +1,73 @@
+import pytest
+
+import simple_app
+from result_cache import ResultCache, result_cache
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(simple_app, 'export_jobs_recovered', True)
+    monkeypatch.setattr(simple_app.csv_exporter, 'export_dir', str(tmp_path / 'exports'))
+    simple_app.csv_exporter.ensure_export_dir()
+    return simple_app.app.test_client()
+
+
+def _request(lead_table, max_leads):
+    return {
+        'html_content': lead_table(50),
+        'field_mappings': {'company': '.name', 'phone': '.phone', 'city': '.city'},
+        'extraction_config': {'container_selector': 'tr.lead', 'max_leads': max_leads},
+        'export_config': {}
+    }
+
+
+def test_small_export_reuses_preview_rows(client, lead_table, monkeypatch):
+    request = _request(lead_table, 1000)
+    preview = client.post('/api/extract_from_html', json=request).get_json()
+    assert preview['success'] and preview['total_count'] == 50 and len(preview['data']) == 10
+
+    def not_again(*args, **kwargs):
+        raise AssertionError("export extracted the leads again")
+
+    monkeypatch.setattr(simple_app.data_extractor, 'extract_leads', not_again)
+    hits = result_cache.hits
+    response = client.post('/api/export_from_html', json=request)
+    assert response.status_code == 200 and response.mimetype == 'text/csv'
+    assert response.get_data(as_text=True).count('\n') == 51
+    assert result_cache.hits == hits + 1
+
+
+def test_large_export_preview_extracts_only_the_sample(client, lead_table, monkeypatch):
+    request = _request(lead_table, 50000)
+
+    def no_full_extraction(*args, **kwargs):
+        raise AssertionError("preview extracted every lead")
+
+    monkeypatch.setattr(simple_app.data_extractor, 'extract_leads', no_full_extraction)
+    preview = client.post('/api/extract_from_html', json=request).get_json()
+    assert preview['success'] and preview['total_count'] == 50 and len(preview['data']) == 10
+
+
+def test_result_cache_copies_evicts_and_keys_by_field_order(monkeypatch):
+    cache = ResultCache(max_memory_bytes=500)
+    rows = [{'name': f'Lead {i}', 'phone': '2125550100'} for i in range(10)]
+    cache.put('a', rows)
+    copy = cache.get('a')
+    assert copy == rows and copy is not rows
+
+    # Over the budget, the least recently used entry goes; alone over it, nothing is stored
+    cache.put('b', rows)
+    cache.get('a')
+    cache.put('c', rows)
+    assert (cache.get('b'), cache.get('a') == rows, cache.get('c') == rows) == (None, True, True)
+    cache.put('big', rows * 100)
+    assert cache.get('big') is None
+
+    monkeypatch.setattr('time.time', lambda: 1e12)
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 1
+
+    mappings = {'name': '.name', 'phone': '.phone'}
+    assert ResultCache.make_key('<p>', mappings) == ResultCache.make_key('<p>', dict(mappings))
+    assert ResultCache.make_key('<p>', mappings) != ResultCache.make_key('<p>', dict(reversed(mappings.items())))
@@ -0,0 +1,143 @@
+import threading
+import multiprocessing
+
+import pytest
+
+from batch_processor import _extract_shard
+from scrub_csv import _scrub_rows
+
+from process_pool import (PoolUnavailable, SharedStatePool, fork_available, map_shards, parallel_workers,
+                          without_parallel_keys)
+
+pytestmark = pytest.mark.skipif(not fork_available(), reason="needs fork")
+
+
+def _squares(shared, bounds):
+    return [shared[i] ** 2 for i in range(*bounds)]
+
+
+def _failing(shared, bounds):
+    if bounds[0] >= 4:
+        raise ValueError(f"bad shard {bounds}")
+    return list(range(*bounds))
+
+
+def _unpicklable(shared, bounds):
+    return [threading.Lock()]
+
+
+def test_map_shards_keeps_order():
+    assert map_shards(_squares, list(range(10)), 10, workers=2) == [i * i for i in range(10)]
+
+
+def test_worker_errors_propagate():
+    with pytest.raises(ValueError, match="bad shard"):
+        map_shards(_failing, None, 10, workers=2)
+
+
+def test_unpicklable_results_fall_back():
+    assert map_shards(_unpicklable, None, 4, workers=2) is None
+    with pytest.raises(PoolUnavailable):
+        with SharedStatePool(None, 2) as pool:
+            pool.map(_unpicklable, [(0, 1)])
+
+
+def _unpicklable_after_two_batches(shared, bounds):
+    if bounds[0] >= 200:
+        return [threading.Lock()]
+    return _extract_shard(shared, bounds)
+
+
+def test_pooled_export_falls_back_mid_run(tmp_path, monkeypatch, lead_table, field_mappings):
+    import batch_processor
+    from batch_processor import BatchProcessor
+
+    html = lead_table(500)
+    config = {'container_selector': 'tr.lead', 'max_leads': 100000}
+    serial_path, parallel_path = str(tmp_path / 'serial.csv'), str(tmp_path / 'parallel.csv')
+    serial = BatchProcessor(100).export_large_csv(html, field_mappings, config, {}, serial_path)
+
+    monkeypatch.setattr('os.cpu_count', lambda: 4)
+    monkeypatch.setattr(batch_processor, '_extract_shard', _unpicklable_after_two_batches)
+    parallel = BatchProcessor(100).export_large_csv(
+        html, field_mappings, dict(config, parallel=True, workers=2, parallel_threshold=0), {}, parallel_path)
+    assert parallel == serial == 500
+    with open(serial_path, 'rb') as expected, open(parallel_path, 'rb') as actual:
+        assert actual.read() == expected.read()
+
+
+def _unpicklable_from_row_200(shared, rows):
+    # Only in workers: the parent's serial fallback calls this too
+    if int(rows[0][0]) >= 200 and multiprocessing.parent_process() is not None:
+        return [threading.Lock()], None
+    return _scrub_rows(shared, rows)
+
+
+def test_pooled_csv_scrub_falls_back_mid_run(tmp_path, monkeypatch):
+    import scrub_csv
+
+    source = tmp_path / 'leads.csv'
+    source.write_text('id,phone\n' + ''.join(f'{i},(212) 555-{i % 300:04d}\n' for i in range(500)))
+    config = {'filter_landlines': False, 'dedupe': True}
+    serial = scrub_csv.scrub_file(str(source), str(tmp_path / 'serial.csv'), scrub_config=dict(config),
+                                  chunk_size=100)
+
+    monkeypatch.setattr('os.cpu_count', lambda: 4)
+    monkeypatch.setattr(scrub_csv, '_scrub_rows', _unpicklable_from_row_200)
+    parallel = scrub_csv.scrub_file(str(source), str(tmp_path / 'parallel.csv'), scrub_config=dict(config),
+                                    chunk_size=100, workers=2)
+    # 300 distinct numbers; every repeat is in a later chunk than its first row
+    assert serial['clean_count'] == 300
+    assert serial['filtered_duplicates'] == 200
+    assert parallel == serial
+    assert (tmp_path / 'parallel.csv').read_bytes() == (tmp_path / 'serial.csv').read_bytes()
+
+
+def test_workers_capped_at_cpu_count(monkeypatch):
+    monkeypatch.setattr('os.cpu_count', lambda: 4)
+    config = {'parallel': True, 'workers': 20000, 'parallel_threshold': 0}
+    assert parallel_workers(config, 1000000, 100000) == 4
+    assert parallel_workers(config, 3, 100000) == 3
+
+
+def test_client_cannot_choose_workers():
+    client = {'container_selector': 'tr', 'parallel': True, 'workers': 20000, 'parallel_threshold': 0}
+    assert without_parallel_keys(client) == {'container_selector': 'tr'}
+    assert without_parallel_keys(None) == {}
+
+
+def test_no_fork_while_other_threads_run(monkeypatch):
+    monkeypatch.setattr('os.cpu_count', lambda: 4)
+    started, release = threading.Event(), threading.Event()
+    thread = threading.Thread(target=lambda: (started.set(), release.wait()))
+    thread.start()
+    started.wait()
+    try:
+        assert parallel_workers({'parallel': True, 'parallel_threshold': 0}, 100, 100000) == 0
+        with pytest.raises(PoolUnavailable, match="threads"):
+            with SharedStatePool(None, 2):
+                pass
+        assert map_shards(_squares, list(range(10)), 10, workers=2) is None
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_parallel_scrub_matches_serial_and_propagates_errors(monkeypatch):
+    from lead_scrubber import LeadScrubber
+
+    scrubber = LeadScrubber()
+    leads = [{'number': f'(212) 555-{i % 700:04d}', 'notes': 'lawsuit' if i % 7 == 0 else 'ok'} for i in range(3000)]
+    config = {'filter_litigation': True, 'filter_landlines': False, 'dedupe': True}
+    serial = scrubber.scrub_leads(leads, config)
+    parallel = scrubber.scrub_leads(leads, dict(config, parallel=True, workers=2, parallel_threshold=0))
+    assert [id(lead) for lead in parallel['clean_leads']] == [id(lead) for lead in serial['clean_leads']]
+    assert parallel['stats'] == serial['stats']
+    assert list(parallel['stats']['filter_reasons']) == list(serial['stats']['filter_reasons'])
+
+    def broken(self, *args, **kwargs):
+        raise RuntimeError("scrub bug")
+
+    monkeypatch.setattr(LeadScrubber, 'scrub_batch', broken)
+    with pytest.raises(RuntimeError, match="scrub bug"):
+        scrubber.scrub_leads(leads, dict(config, parallel=True, workers=2, parallel_threshold=0))
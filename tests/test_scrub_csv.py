@@ -0,0 +1,47 @@
+import csv
+
+from lead_scrubber import LeadScrubber
+from scrub_csv import main, scrub_file
+
+
+def _leads_csv(path, rows: int, distinct: int):
+    path.write_text('id,phone\n' + ''.join(f'{i},(212) 555-{i % distinct:04d}\n' for i in range(rows)))
+    return str(path)
+
+
+def _ids(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row[0] for row in list(csv.reader(f))[1:]]
+
+
+def test_dedupe_spans_chunks(tmp_path):
+    source = _leads_csv(tmp_path / 'leads.csv', 100, 10)
+    stats = scrub_file(source, str(tmp_path / 'clean.csv'), str(tmp_path / 'rejected.csv'),
+                       {'filter_landlines': False, 'dedupe': True}, chunk_size=20)
+    assert stats['clean_count'] == 10
+    assert stats['filtered_duplicates'] == 90
+    assert stats['filter_reasons'] == {"Duplicate: Repeated lead": 90}
+    assert _ids(tmp_path / 'clean.csv') == [str(i) for i in range(10)]
+    assert _ids(tmp_path / 'rejected.csv') == [str(i) for i in range(10, 100)]
+
+
+def test_dedupe_history_records_after_the_file_is_written(tmp_path):
+    scrubber = LeadScrubber(history_path=str(tmp_path / 'history.db'))
+    config = {'filter_landlines': False, 'dedupe': True, 'dedupe_history': True}
+    first = scrub_file(_leads_csv(tmp_path / 'first.csv', 30, 10), str(tmp_path / 'first_clean.csv'),
+                       scrub_config=config, chunk_size=7, scrubber=scrubber)
+    assert first['clean_count'] == 10
+    assert len(scrubber.deduplicator(config).history) == 10
+
+    second = scrub_file(_leads_csv(tmp_path / 'second.csv', 20, 20), str(tmp_path / 'second_clean.csv'),
+                        scrub_config=config, chunk_size=7, scrubber=scrubber)
+    assert second['clean_count'] == 10
+    assert second['filter_reasons'] == {"Duplicate: Delivered in an earlier export": 10}
+
+
+def test_cli_dedupe_flags(tmp_path):
+    source = _leads_csv(tmp_path / 'leads.csv', 40, 10)
+    output = str(tmp_path / 'clean.csv')
+    assert main([source, '-o', output, '--no-rejected', '--keep-landlines', '--keep-suppressed',
+                 '--chunk-size', '15', '--dedupe', '-q']) == 0
+    assert _ids(output) == [str(i) for i in range(10)]
@@ -0,0 +1,113 @@
+from itertools import zip_longest
+
+import pytest
+
+from batch_processor import BatchProcessor
+
+BATCH_SIZE = 40
+MAPPINGS = {'first_name': '.name', 'number': '.phone', 'city': '.city'}
+EXTRACTION_CONFIG = {'container_selector': 'tr.lead', 'max_leads': 100000}
+SCRUB_CONFIG = {'enable_scrubbing': True, 'filter_litigation': True, 'dedupe': True}
+
+
+def _phone(i):
+    if i % 11 == 0:
+        return f'(800) 555-{i:04d}'  # Toll-free
+    if i % 13 == 0:
+        return 'n/a'
+    if i % 17 == 0:
+        return f'212-555-{i:04d} x3'  # Extension
+    return f'(917) 555-{i % 90:04d}'  # Repeats every 90 rows, so later batches hold duplicates
+
+
+def _page(rows):
+    body = ''.join(
+        f'<tr class="lead"><td class="name">{"Court Clerk" if i % 19 == 0 else "Lead"} {i}</td>'
+        f'<td class="phone">{_phone(i)}</td><td class="city">{"Lawyer Ln" if i % 23 == 0 else "Albany"}</td></tr>'
+        for i in range(rows)
+    )
+    return f'<html><body><table>{body}</table></body></html>'
+
+
+@pytest.fixture(scope='module')
+def html():
+    return _page(300)
+
+
+@pytest.fixture
+def processor():
+    return BatchProcessor(BATCH_SIZE)
+
+
+@pytest.fixture
+def reference(processor, html):
+    """A single scrub_leads over every extracted lead"""
+    leads = [lead for batch in processor.process_large_dataset(html, MAPPINGS, EXTRACTION_CONFIG) for lead in batch]
+    result = processor.lead_scrubber.scrub_leads(leads, SCRUB_CONFIG)
+    stats = result['stats']
+    assert stats['filtered_landlines'] and stats['filtered_litigation'] and stats['filtered_duplicates']
+    return leads, result['clean_leads'], stats
+
+
+def _same_stats(stats, expected):
+    assert stats == expected
+    # Reasons are reported in the order a single scrub meets them
+    assert list(stats['filter_reasons']) == list(expected['filter_reasons'])
+
+
+def test_scrub_batches_match_scrub_leads(processor, reference):
+    leads, clean, expected = reference
+    scrubber = processor.lead_scrubber
+    stats = scrubber.new_stats()
+    batches = [leads[i:i + BATCH_SIZE] for i in range(0, len(leads), BATCH_SIZE)]
+    streamed = [lead for batch in scrubber.scrub_batches(batches, SCRUB_CONFIG, stats) for lead in batch]
+    assert streamed == clean
+    _same_stats(stats, expected)
+
+
+def test_merged_batch_stats_match_scrub_leads(processor, reference):
+    leads, clean, expected = reference
+    scrubber = processor.lead_scrubber
+    deduplicator = scrubber.deduplicator(SCRUB_CONFIG)
+    merged = scrubber.new_stats()
+    kept = []
+    for i in range(0, len(leads), BATCH_SIZE):
+        stats = scrubber.new_stats()
+        kept += scrubber.scrub_batch(leads[i:i + BATCH_SIZE], SCRUB_CONFIG, stats, deduplicator=deduplicator)
+        scrubber.merge_stats(merged, stats)
+    assert kept == clean
+    _same_stats(merged, expected)
+
+
+def test_export_batches_match_scrub_leads(processor, html, reference):
+    _, clean, expected = reference
+    stats, metrics = processor.lead_scrubber.new_stats(), {}
+    exported = [lead for batch, _, _ in processor.export_batches(
+        html, MAPPINGS, EXTRACTION_CONFIG, {'scrub_config': SCRUB_CONFIG}, scrub_stats=stats, metrics=metrics
+    ) for lead in batch]
+    assert exported == clean
+    _same_stats(stats, expected)
+    assert metrics['batches'] == 300 // BATCH_SIZE + 1
+    assert sum(metrics['sizes']) == 300
+
+
+def test_concurrent_exports_keep_their_own_results(processor, html, reference):
+    """One processor serves every export job, so each call's statistics stay with the caller"""
+    _, clean, expected = reference
+    scrubbed_stats, plain_stats = processor.lead_scrubber.new_stats(), processor.lead_scrubber.new_stats()
+    scrubbed_metrics, plain_metrics = {}, {}
+    scrubbed = processor.export_batches(html, MAPPINGS, EXTRACTION_CONFIG, {'scrub_config': SCRUB_CONFIG},
+                                        scrub_stats=scrubbed_stats, metrics=scrubbed_metrics)
+    plain = processor.export_batches(html, MAPPINGS, dict(EXTRACTION_CONFIG, max_leads=100), {},
+                                     scrub_stats=plain_stats, metrics=plain_metrics)
+
+    # Interleave the two runs batch by batch, as two job threads would
+    kept, extracted = [], []
+    for first, second in zip_longest(scrubbed, plain, fillvalue=([], 0, 0)):
+        kept += first[0]
+        extracted += second[0]
+
+    assert kept == clean and len(extracted) == 100
+    _same_stats(scrubbed_stats, expected)
+    assert plain_stats == processor.lead_scrubber.new_stats()
+    assert sum(scrubbed_metrics['sizes']) == 300 and sum(plain_metrics['sizes']) == 100
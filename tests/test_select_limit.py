@@ -0,0 +1,73 @@
+import logging
+
+import pytest
+
+import parser_engine
+from conftest import _profile_page
+from parser_engine import get_parser_engine
+
+ENGINES = ['lxml', 'bs4']
+
+
+def _nested_page(rows):
+    """Each ``div.lead`` holds a nested ``div.lead`` and some text, so matches overlap and chunks cut through them"""
+    body = ''.join(
+        f'<div class="lead" id="outer{i}"><span class="name">Lead {i}</span>'
+        f'<div class="lead" id="inner{i}"><span class="phone">555-01{i % 100:02d}</span></div>'
+        f'<p>{"notes " * (i % 7)}</p></div>'
+        for i in range(rows)
+    )
+    return f'<html><body><div class="list">{body}</div><footer>end</footer></body></html>'
+
+
+PAGES = {
+    'nested': (_nested_page(60), ['div.lead', 'div.lead > span', 'div.list > div.lead', 'span.phone']),
+    'table': (_profile_page('salesforce', 60), ['tr.listItem', 'td.email a', 'tr.listItem:nth-child(odd)']),
+}
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # A few hundred bytes per chunk, so the parse stops well before the end with matches left open
+    monkeypatch.setattr(parser_engine, 'INITIAL_CHUNK_SIZE', 200)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('page', list(PAGES))
+@pytest.mark.parametrize('limit', [1, 2, 7, 33, 59, 1000])
+def test_early_stop_equals_sliced_select(engine, page, limit, caplog):
+    engine = get_parser_engine(engine)
+    html, selectors = PAGES[page]
+    for selector in selectors:
+        compiled = engine.compile(selector)
+        expected = [engine.outer_html(element)
+                    for element in engine.select(engine.parse(html), compiled)[:limit]]
+        with caplog.at_level(logging.DEBUG, logger='parser_engine'):
+            caplog.clear()
+            found = engine.select_from_html(html, compiled, limit)
+        assert [engine.outer_html(element) for element in found] == expected, selector
+
+        stopped = any('Stopped parsing' in record.getMessage() for record in caplog.records)
+        if engine.name == 'lxml' and limit <= 7:
+            assert stopped, selector
+
+
+@pytest.mark.parametrize('limit', [3, 10, 25])
+def test_lxml_stop_point_leaves_a_container_open(limit, caplog):
+    """The parse stops inside a container after the ones returned, which must not come back half-parsed"""
+    engine = get_parser_engine('lxml')
+    html, _ = PAGES['nested']
+    compiled = engine.compile('div.lead')
+    with caplog.at_level(logging.DEBUG, logger='parser_engine'):
+        found = engine.select_from_html(html, compiled, limit)
+    stop = [int(record.getMessage().split()[3]) for record in caplog.records
+            if record.getMessage().startswith('Stopped parsing')]
+    assert len(stop) == 1
+    parsed = html.encode('utf-8')[:stop[0]].decode('utf-8', 'ignore')
+    # More containers were started than returned
+    assert parsed.count('class="lead"') > limit
+    # Besides div.list, some div.lead is still open at the stop point
+    assert parsed.count('<div') - parsed.count('</div>') > 1
+    assert len(found) == limit
+    assert [engine.outer_html(element) for element in found] == [
+        engine.outer_html(element) for element in engine.select(engine.parse(html), compiled)[:limit]]
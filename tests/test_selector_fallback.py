@@ -0,0 +1,26 @@
+import logging
+
+import pytest
+
+from data_extractor import DataExtractor
+from parser_engine import UnsupportedSelector, get_parser_engine
+
+PAGE = ('<table><tr class="lead"><td class="name">Ann</td><td class="phone">2125550100</td></tr>'
+        '<tr class="lead"><td class="name">Bob</td><td class="phone">2125550101</td></tr></table>')
+
+
+def test_selector_without_xpath_rendering_is_unsupported():
+    # Valid CSS identifier, but '-x' is not a valid XPath name test
+    with pytest.raises(UnsupportedSelector):
+        get_parser_engine('lxml').compile('-x')
+
+
+def test_selector_without_xpath_rendering_falls_back_to_bs4(caplog):
+    mappings = {'name': '.name', 'phone': '.phone, -x'}
+    reference = DataExtractor().extract_leads(PAGE, mappings, {'container_selector': 'tr.lead', 'parser': 'bs4'})
+    assert [lead['phone'] for lead in reference] == ['2125550100', '2125550101']
+
+    with caplog.at_level(logging.INFO, logger='data_extractor'):
+        leads = DataExtractor().extract_leads(PAGE, mappings, {'container_selector': 'tr.lead', 'parser': 'lxml'})
+    assert leads == reference
+    assert 'Falling back to BeautifulSoup parser' in caplog.text
@@ -0,0 +1,68 @@
+import pytest
+
+import simple_app
+from batch_processor import BatchProcessor
+
+BATCH_SIZE = 20
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(simple_app, 'export_jobs_recovered', True)
+    monkeypatch.setattr(simple_app, 'batch_processor', BatchProcessor(BATCH_SIZE))
+    return simple_app.app.test_client()
+
+
+def _export(client, html, field_mappings):
+    # Over the large export threshold, so the response streams
+    return client.post('/api/export_from_html', json={
+        'html_content': html,
+        'field_mappings': field_mappings,
+        'extraction_config': {'container_selector': 'tr.lead', 'max_leads': 20000},
+        'export_config': {}
+    })
+
+
+def test_streams_bom_header_and_rows_in_chunks(client, lead_table, field_mappings):
+    response = _export(client, lead_table(50), field_mappings)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=crm_leads_export.csv'
+    assert not response.is_sequence
+
+    chunks = list(response.response)
+    assert len(chunks) == 3
+    assert chunks[0].startswith('\ufeffFirst Name,Number,City\n'.encode('utf-8'))
+    lines = b''.join(chunks).decode('utf-8-sig').splitlines()
+    assert len(lines) == 51
+    assert lines[1] == 'Lead 0,(212) 555-0000,City 0'
+
+
+def test_empty_result_is_a_json_error(client, field_mappings):
+    response = _export(client, '<html><body><p>No leads here</p></body></html>', field_mappings)
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'success': False, 'message': 'No data extracted from the provided HTML'}
+
+
+def test_failure_after_first_chunk_is_marked_and_raised(client, lead_table, field_mappings, monkeypatch):
+    extract = BatchProcessor._extract_containers
+    calls = []
+
+    def failing(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("extraction failed")
+        return extract(self, *args, **kwargs)
+
+    monkeypatch.setattr(BatchProcessor, '_extract_containers', failing)
+    response = _export(client, lead_table(50), field_mappings)
+    assert response.status_code == 200
+
+    chunks = []
+    with pytest.raises(RuntimeError, match="extraction failed"):
+        for chunk in response.response:
+            chunks.append(chunk)
+    assert len(chunks) == 2
+    assert chunks[-1] == f'{simple_app.STREAM_ERROR_MARKER}: extraction failed\n'.encode('utf-8')
+    assert len(b''.join(chunks[:-1]).decode('utf-8-sig').splitlines()) == BATCH_SIZE + 1
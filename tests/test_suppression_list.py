@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pytest
+
+import suppression_list
+from lead_scrubber import SUPPRESSED_REASON, LeadScrubber
+from suppression_list import SuppressionList, load_suppression_list, parse_numbers
+
+
+@pytest.fixture(autouse=True)
+def fresh_loads(monkeypatch):
+    """Each test loads its directories from disk rather than this process's earlier loads"""
+    monkeypatch.setattr(suppression_list, '_loaded', {})
+
+
+def test_parse_numbers_skips_malformed_lines():
+    data = (b'phone,name\n'
+            b'(212) 555-0100,Ann\n'
+            b'1-212-555-0101\n'
+            b'22125550102\n'             # 11 digits without the US country code
+            b'212-555-010\n'             # too short
+            b'212 555 0103 ext 4\n'      # extension digits make it too long
+            b'\n'
+            b'x,2125550104\n'            # number outside the first field
+            b'+1 (212) 555-0105')        # no final newline
+    assert parse_numbers(data).tolist() == [2125550100, 2125550101, 2125550105]
+    assert parse_numbers(b'').tolist() == []
+
+
+def test_contains_at_both_ends_and_on_an_empty_list():
+    suppression = SuppressionList(np.array([2125550100, 2125550200, 9995550100], dtype=np.int64))
+    queries = np.array([2125550100, 9995550100, 2125550099, 9995550101, 2125550150, -1], dtype=np.int64)
+    assert suppression.contains(queries).tolist() == [True, True, False, False, False, False]
+    assert suppression.contains(np.empty(0, dtype=np.int64)).tolist() == []
+    assert SuppressionList.empty().contains(queries).tolist() == [False] * len(queries)
+
+
+def test_compiled_list_is_rebuilt_when_a_source_is_newer(tmp_path):
+    directory = tmp_path / 'suppression'
+    directory.mkdir()
+    source = directory / 'dnc.txt'
+    source.write_text('2125550100\n')
+    compiled = str(tmp_path / 'suppression.npy')
+
+    first = load_suppression_list(str(directory))
+    assert os.path.exists(compiled)
+    assert isinstance(first.numbers, np.memmap)
+    assert first.numbers.tolist() == [2125550100]
+
+    source.write_text('2125550100\n2125550101\n')
+    stamp = os.path.getmtime(compiled) + 10
+    os.utime(source, (stamp, stamp))
+    suppression_list._loaded.clear()
+    assert load_suppression_list(str(directory)).numbers.tolist() == [2125550100, 2125550101]
+
+
+def test_missing_directory_suppresses_nothing(tmp_path):
+    assert len(load_suppression_list(str(tmp_path / 'missing'))) == 0
+
+
+def test_scrub_batch_counts_suppressed(tmp_path):
+    directory = tmp_path / 'suppression'
+    directory.mkdir()
+    (directory / 'dnc.csv').write_text('number\n(212) 555-0100\n')
+    scrubber = LeadScrubber(suppression_dir=str(directory))
+    leads = [{'number': '212.555.0100'}, {'number': '(212) 555-0101'}, {'number': '+1 212 555 0100'}]
+
+    stats = scrubber.new_stats()
+    rejected = []
+    clean = scrubber.scrub_batch(leads, {'filter_landlines': False}, stats, rejected)
+    assert clean == leads[1:2]
+    assert stats['filtered_suppressed'] == 2
+    assert stats['clean_count'] == 1
+    assert rejected == [(0, SUPPRESSED_REASON), (2, SUPPRESSED_REASON)]
+    assert stats['filter_reasons'] == {SUPPRESSED_REASON: 2}
+
+    clean = scrubber.scrub_batch(leads, {'filter_landlines': False, 'filter_suppressed': False},
+                                 scrubber.new_stats())
+    assert clean == leads